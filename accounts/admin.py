@@ -57,9 +57,19 @@ admin.site.register(EmailConfirmation, ConfirmationAdmin)
 
 
 class EmailAdmin(admin.ModelAdmin):
-    list_display = ["when", "recipient_display", "subject", "sender", "ok"]
-    list_filter = ["ok", "when", ("sender", admin.RelatedOnlyFieldListFilter)]
-    readonly_fields = ["when", "email", "subject", "body", "ok"]
+    list_display = ["when", "recipient_display", "subject", "sender", "ok", "status"]
+    list_filter = ["ok", "status", "when", ("sender", admin.RelatedOnlyFieldListFilter)]
+    readonly_fields = [
+        "when",
+        "email",
+        "subject",
+        "body",
+        "ok",
+        "status",
+        "attempts",
+        "sent_time",
+        "last_error",
+    ]
     search_fields = ["subject", "body", "to"]
 
     def recipient_display(self, record):
@@ -1,3 +1,16 @@
+"""
+Disposable email blocklist.
+
+The block and allow lists are compiled into frozensets of lowercase domains
+and addresses the first time they're needed, so checking an address is a few
+set lookups: the address itself, then its domain and each parent domain, so
+that blocking ``example.com`` also blocks ``mail.example.com``.
+
+Besides the built in list and the ``EMAIL_BLOCKLIST`` and ``EMAIL_ALLOWLIST``
+settings, ``EMAIL_BLOCKLIST_FILE`` can point to a file with one domain per
+line, such as one of the large community maintained disposable domain lists.
+The lists are recompiled whenever one of these settings is replaced.
+"""
 from django.conf import settings
 
 
@@ -1258,10 +1271,69 @@ def email_allowlist():
     return getattr(settings, "EMAIL_ALLOWLIST", []) + []
 
 
-def is_blocked_email(email):
-    user_part, domain_part = email.rsplit("@", 1)
+def load_domain_file(path):
+    """
+    Reads a file with one domain or address per line, ignoring blank lines and
+    ``#`` comments.
+    """
+    entries = set()
+    with open(path, "r", encoding="utf-8") as domain_file:
+        for line in domain_file:
+            entry = line.split("#", 1)[0].strip().lower()
+            if entry:
+                entries.add(entry)
+    return entries
+
+
+class EmailLists:
+    def __init__(self, blocklist_setting, allowlist_setting, blocklist_file):
+        self.sources = (blocklist_setting, allowlist_setting, blocklist_file)
+        blocked = set(entry.lower() for entry in email_blocklist())
+        if blocklist_file:
+            blocked.update(load_domain_file(blocklist_file))
+        self.blocked = frozenset(blocked)
+        self.allowed = frozenset(entry.lower() for entry in email_allowlist())
+
+    def is_blocked(self, email):
+        """
+        Checks the address itself, its domain and every parent of that domain.
+        An allowed entry always wins over a blocked one.
+        """
+        email = email.lower()
+        allowed, blocked = self.allowed, self.blocked
+        if email in allowed:
+            return False
+        is_blocked = email in blocked
+        domain = email[email.rfind("@") + 1 :]
+        while True:
+            if domain in allowed:
+                return False
+            if domain in blocked:
+                is_blocked = True
+            dot = domain.find(".")
+            if dot < 0:
+                return is_blocked
+            domain = domain[dot + 1 :]
 
-    if domain_part not in email_allowlist() and email not in email_allowlist():
-        if domain_part in email_blocklist() or email in email_blocklist():
-            return True
-    return False
+
+_email_lists = None
+
+
+def get_email_lists():
+    global _email_lists
+    blocklist = getattr(settings, "EMAIL_BLOCKLIST", None)
+    allowlist = getattr(settings, "EMAIL_ALLOWLIST", None)
+    blocklist_file = getattr(settings, "EMAIL_BLOCKLIST_FILE", None)
+    lists = _email_lists
+    if (
+        lists is None
+        or lists.sources[0] is not blocklist
+        or lists.sources[1] is not allowlist
+        or lists.sources[2] is not blocklist_file
+    ):
+        lists = _email_lists = EmailLists(blocklist, allowlist, blocklist_file)
+    return lists
+
+
+def is_blocked_email(email):
+    return get_email_lists().is_blocked(email)
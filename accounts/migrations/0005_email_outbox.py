@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("accounts", "0004_add_email_record")]
+
+    operations = [
+        migrations.AddField(
+            model_name="emailrecord",
+            name="from_email",
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="html_body",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="status",
+            field=models.SmallIntegerField(
+                choices=[(-1, "Failed"), (0, "Queued"), (1, "Sent")], default=1
+            ),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="next_attempt",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="sent_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="emailrecord",
+            name="last_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddIndex(
+            model_name="emailrecord",
+            index=models.Index(
+                fields=["status", "next_attempt"], name="accounts_em_status_72ea11_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("accounts", "0005_email_outbox")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emailrecord",
+            index=models.Index(
+                fields=["sender", "when"], name="accounts_em_sender__64b88f_idx"
+            ),
+        )
+    ]
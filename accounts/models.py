@@ -26,15 +26,34 @@ class Account(models.Model):
     class Meta:
         ordering = ("user__username",)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Whatever was saved last is what request.user.account returns
+        user = Account.user.field.get_cached_value(self, default=None)
+        if user is not None:
+            user._account_cache = self
+
+    def delete(self, *args, **kwargs):
+        user = Account.user.field.get_cached_value(self, default=None)
+        if user is not None:
+            user.__dict__.pop("_account_cache", None)
+        return super().delete(*args, **kwargs)
+
     def setup_complete(self):
         self.has_completed_setup = True
         self.setup_completed_date = datetime.datetime.now()
         self.save()
 
     def new_confirmation_request(self):
+        confirmation_request = self.make_confirmation_request()
+        confirmation_request.save()
+        return confirmation_request
+
+    def make_confirmation_request(self):
+        " Returns a new, unsaved, EmailConfirmation for this account's user "
         valid_for = getattr(settings, "EMAIL_CONFIRMAION_EXPIRATION_DAYS", 5)
         confirmation_key = get_random_string(length=32)
-        return EmailConfirmation.objects.create(
+        return EmailConfirmation(
             user=self.user,
             email=self.user.email,
             key=confirmation_key,
@@ -59,10 +78,9 @@ class Account(models.Model):
             return False
 
     def remaining_emails_allowed(self):
-        recently_sent = EmailRecord.objects.filter(
-            sender=self.user,
-            when__gte=datetime.datetime.now() - datetime.timedelta(hours=24),
-        ).count()
+        from .quota import emails_sent
+
+        recently_sent = emails_sent(self.user_id)
         if recently_sent < settings.ALLOWED_EMAILS_PER_DAY:
             return settings.ALLOWED_EMAILS_PER_DAY - recently_sent
         else:
@@ -80,8 +98,17 @@ class Account(models.Model):
 def _getUserAccount(self):
     if not self.is_authenticated:
         return Account()
+    if "_account_cache" in self.__dict__:
+        return self._account_cache
+    # Loaded with select_related("account") or select_related("user__account")
+    account = Account.user.field.remote_field.get_cached_value(self, default=None)
+    if account is not None:
+        self._account_cache = account
+        return account
 
     profile, created = Account.objects.get_or_create(user=self)
+    profile.user = self
+    self._account_cache = profile
 
     if created:
         if self.first_name:
@@ -103,6 +130,24 @@ User.account = property(_getUserAccount)
 AnonymousUser.account = property(_getAnonAccount)
 
 
+def prefetch_accounts(users):
+    """
+    Loads the accounts of ``users``, with their badges, and caches them for
+    ``user.account`` so that listing many users doesn't query each account.
+    """
+    by_id = dict()
+    for user in users:
+        if user.id is not None and "_account_cache" not in user.__dict__:
+            by_id.setdefault(user.id, []).append(user)
+    if not by_id:
+        return
+    accounts = Account.objects.filter(user_id__in=by_id).prefetch_related("badges")
+    for account in accounts:
+        for user in by_id[account.user_id]:
+            user._account_cache = account
+            account.user = user
+
+
 class EmailConfirmation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     email = models.CharField(max_length=256)
@@ -131,9 +176,15 @@ class BadgeGrant(models.Model):
 
 class EmailRecord(models.Model):
     """
-    Model to store all the outgoing emails.
+    Model to store all the outgoing emails, including the ones still waiting
+    in the outbox to be sent by the send_queued_email command.
     """
 
+    FAILED = -1
+    QUEUED = 0
+    SENT = 1
+    STATUSES = [(FAILED, _("Failed")), (QUEUED, _("Queued")), (SENT, _("Sent"))]
+
     when = models.DateTimeField(null=False, auto_now_add=True)
     sender = models.ForeignKey(
         User,
@@ -153,3 +204,17 @@ class EmailRecord(models.Model):
     subject = models.CharField(null=False, max_length=128)
     body = models.TextField(null=False, max_length=1024)
     ok = models.BooleanField(null=False, default=True)
+
+    from_email = models.CharField(max_length=256, null=True, blank=True)
+    html_body = models.TextField(null=True, blank=True)
+    status = models.SmallIntegerField(choices=STATUSES, default=SENT)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True)
+    sent_time = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt"]),
+            models.Index(fields=["sender", "when"]),
+        ]
@@ -0,0 +1,347 @@
+"""
+Outgoing email queue.
+
+Views call ``queue_mail()``. With ``EMAIL_OUTBOX = True`` it only stores an
+``EmailRecord`` in the ``QUEUED`` state, so a request never waits on the mail
+server, and the ``send_queued_email`` management command, which has to be
+running alongside the web server, claims due records in batches and sends
+each batch over a single SMTP connection, retrying failed messages with
+exponential backoff until ``EMAIL_MAX_ATTEMPTS`` is reached. By default the
+outbox is off and the email is sent right away.
+
+Management commands that notify many people at once use a ``BulkMailer``
+instead, which renders each distinct message once, sends over one connection
+and writes the ``EmailRecord``s with ``bulk_create``. Views that send one
+message to many people, like inviting a whole team, queue it for all of them
+at once with ``queue_bulk_mail()``.
+"""
+import datetime
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import quota
+from .models import EmailRecord
+
+BATCH_SIZE = 100
+LEASE_TIME = datetime.timedelta(minutes=10)
+SEND_FIELDS = ["status", "ok", "attempts", "next_attempt", "sent_time", "last_error"]
+
+
+def queue_mail(
+    email, subject, body, html_body=None, from_email=None, sender=None, recipient=None
+):
+    """
+    Queues an email to be sent by the outbox worker. When the outbox is off,
+    as it is unless ``EMAIL_OUTBOX = True``, it is sent right away instead.
+    """
+    record = EmailRecord.objects.create(
+        sender=sender,
+        recipient=recipient,
+        email=email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email,
+        status=EmailRecord.QUEUED,
+        ok=False,
+        next_attempt=timezone.now(),
+    )
+    if sender is not None:
+        quota.count_sent(record.sender_id)
+    if not getattr(settings, "EMAIL_OUTBOX", False):
+        send_records([record])
+    return record
+
+
+def queue_bulk_mail(
+    recipients,
+    subject,
+    body,
+    html_body=None,
+    from_email=None,
+    sender=None,
+    batch_size=BATCH_SIZE,
+):
+    """
+    Queues the same email for every (email, recipient) in ``recipients``,
+    storing the records ``batch_size`` at a time. Returns the number of
+    emails queued. When the outbox is turned off they are sent right away
+    with a ``BulkMailer`` instead.
+    """
+    if not getattr(settings, "EMAIL_OUTBOX", False):
+        with BulkMailer(from_email, batch_size) as mailer:
+            for email, recipient in recipients:
+                mailer.send(email, subject, body, html_body, sender, recipient)
+        return mailer.sent + mailer.failed
+
+    now = timezone.now()
+    records = [
+        EmailRecord(
+            sender=sender,
+            recipient=recipient,
+            email=email,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            from_email=from_email,
+            status=EmailRecord.QUEUED,
+            ok=False,
+            next_attempt=now,
+        )
+        for email, recipient in recipients
+    ]
+    EmailRecord.objects.bulk_create(records, batch_size=batch_size)
+    if sender is not None and records:
+        quota.count_sent(sender.id, len(records))
+    return len(records)
+
+
+def claim_queued(batch_size=BATCH_SIZE):
+    """
+    Returns up to ``batch_size`` queued records that are due to be sent, and
+    leases them so that other workers running at the same time skip them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        records = list(
+            EmailRecord.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailRecord.QUEUED, next_attempt__lte=now)
+            .order_by("next_attempt", "id")[:batch_size]
+        )
+        EmailRecord.objects.filter(id__in=[record.id for record in records]).update(
+            next_attempt=now + LEASE_TIME
+        )
+    return records
+
+
+def get_message(record, connection):
+    message = EmailMultiAlternatives(
+        subject=record.subject,
+        body=record.body,
+        from_email=get_from_email(record.from_email),
+        to=[record.email],
+        connection=connection,
+    )
+    if record.html_body:
+        message.attach_alternative(record.html_body, "text/html")
+    return message
+
+
+def get_from_email(from_email=None):
+    return from_email or getattr(
+        settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
+    )
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` operations per second on average, in bursts of up to
+    ``burst`` at a time. A ``rate`` of None doesn't limit anything.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_update = time.monotonic()
+
+    def take(self):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.last_update) * self.rate
+        )
+        self.last_update = now
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.rate)
+            self.last_update = time.monotonic()
+            self.tokens = 1
+        self.tokens -= 1
+
+
+def get_rate_limiter(rate=None):
+    if rate is None:
+        rate = getattr(settings, "EMAIL_RATE_LIMIT", None)
+    return TokenBucket(rate, burst=getattr(settings, "EMAIL_RATE_BURST", 1))
+
+
+def set_failure(record, error):
+    """
+    Schedules another attempt at sending ``record``, or marks it as failed
+    once it has used up ``EMAIL_MAX_ATTEMPTS``.
+    """
+    max_attempts = getattr(settings, "EMAIL_MAX_ATTEMPTS", 5)
+    retry_delay = getattr(settings, "EMAIL_RETRY_DELAY", 60)  # seconds
+    record.attempts += 1
+    record.ok = False
+    record.last_error = str(error)
+    if record.attempts >= max_attempts:
+        record.status = EmailRecord.FAILED
+        record.next_attempt = None
+    else:
+        record.status = EmailRecord.QUEUED
+        delay = retry_delay * 2 ** (record.attempts - 1)
+        record.next_attempt = timezone.now() + datetime.timedelta(seconds=delay)
+
+
+def set_sent(record):
+    record.status = EmailRecord.SENT
+    record.ok = True
+    record.attempts += 1
+    record.next_attempt = None
+    record.sent_time = timezone.now()
+    record.last_error = ""
+
+
+def send_records(records, connection=None, rate=None):
+    """
+    Sends ``records`` over one connection to the mail server, sending at most
+    ``rate`` messages per second. Returns the number of (sent, failed) emails.
+    """
+    sent = failed = 0
+    if not records:
+        return sent, failed
+    bucket = get_rate_limiter(rate)
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        print("Unable to connect to the mail server: %s" % e)
+        for record in records:
+            set_failure(record, e)
+            record.save(update_fields=SEND_FIELDS)
+        return sent, len(records)
+
+    try:
+        for record in records:
+            bucket.take()
+            try:
+                get_message(record, connection).send()
+            except Exception as e:
+                print(
+                    "Failed to send email %s to %s: %s" % (record.id, record.email, e)
+                )
+                set_failure(record, e)
+                failed += 1
+            else:
+                set_sent(record)
+                sent += 1
+            record.save(update_fields=SEND_FIELDS)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_queued(batch_size=BATCH_SIZE, rate=None):
+    """
+    Sends one batch of the queued emails that are due.
+    """
+    return send_records(claim_queued(batch_size), rate=rate)
+
+
+class BulkMailer:
+    """
+    Sends a large number of emails over a single connection to the mail
+    server, ``batch_size`` at a time, and records them in bulk. Emails that
+    fail to send are left in the outbox for the ``send_queued_email`` command
+    to retry.
+
+    Use it as a context manager so that the last batch gets sent::
+
+        with BulkMailer() as mailer:
+            for attendee in attendees:
+                subject, text, html = mailer.render(
+                    attendee.event_id, subject, text_template, html_template, context
+                )
+                mailer.send(attendee.user.user.email, subject, text, html)
+    """
+
+    def __init__(self, from_email=None, batch_size=BATCH_SIZE, rate=None):
+        self.from_email = get_from_email(from_email)
+        self.batch_size = batch_size
+        self.bucket = get_rate_limiter(rate)
+        self.connection = None
+        self.sent = 0
+        self.failed = 0
+        self._rendered = dict()
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def render(self, key, subject, text_template, html_template, context):
+        """
+        Returns the (subject, text, html) of an email, rendering the templates
+        only the first time they are used with a given ``key``.
+        """
+        cache_key = (key, text_template, html_template)
+        if cache_key not in self._rendered:
+            self._rendered[cache_key] = (
+                subject,
+                render_to_string(text_template, context),
+                render_to_string(html_template, context),
+            )
+        return self._rendered[cache_key]
+
+    def send(self, email, subject, body, html_body=None, sender=None, recipient=None):
+        self._pending.append(
+            EmailRecord(
+                sender=sender,
+                recipient=recipient,
+                email=email,
+                subject=subject,
+                body=body,
+                html_body=html_body,
+                from_email=self.from_email,
+                ok=False,
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        records, self._pending = self._pending, []
+        if not records:
+            return
+        try:
+            if self.connection is None:
+                self.connection = get_connection()
+                self.connection.open()
+        except Exception as e:
+            print("Unable to connect to the mail server: %s" % e)
+            self.connection = None
+            for record in records:
+                set_failure(record, e)
+            self.failed += len(records)
+        else:
+            for record in records:
+                self.bucket.take()
+                try:
+                    get_message(record, self.connection).send()
+                except Exception as e:
+                    print("Failed to send email to %s: %s" % (record.email, e))
+                    set_failure(record, e)
+                    self.failed += 1
+                else:
+                    set_sent(record)
+                    self.sent += 1
+        EmailRecord.objects.bulk_create(records)
+        senders = Counter(record.sender_id for record in records if record.sender_id)
+        for sender_id, count in senders.items():
+            quota.count_sent(sender_id, count)
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
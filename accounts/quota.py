@@ -0,0 +1,107 @@
+"""
+Sliding window count of the emails each user has sent.
+
+Instead of counting a user's ``EmailRecord``s for the last 24 hours every time
+they invite or contact someone, the counts can be kept in a cache
+(``settings.EMAIL_QUOTA_CACHE_ALIAS``) as one counter per user and hour. The
+first check for a user loads their hourly counts from the database with a
+single grouped query on the (sender, when) index; after that sending an email
+increments the current hour's counter and checking the quota reads the last
+24 counters with one ``get_many``.
+
+That cache has to be shared by all the processes that send email, like
+memcached, redis or the database cache, or a user could send the daily quota
+from every one of them. Without it the emails are counted in the database on
+every check.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import EmailRecord
+
+WINDOW_HOURS = 24
+COUNTER_TTL = 60 * 60 * (WINDOW_HOURS + 1)  # seconds
+
+
+def get_cache():
+    alias = getattr(settings, "EMAIL_QUOTA_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def get_hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def counter_key(user_id, hour):
+    # Always in UTC, whatever the TIME_ZONE of the hours from the database
+    hour = hour.astimezone(timezone.utc)
+    return "email-quota:%s:%s" % (user_id, hour.strftime("%Y%m%d%H"))
+
+
+def loaded_key(user_id):
+    return "email-quota:%s:loaded" % user_id
+
+
+def load_counters(user_id, now):
+    start = get_hour(now) - datetime.timedelta(hours=WINDOW_HOURS - 1)
+    hourly = (
+        EmailRecord.objects.filter(sender_id=user_id, when__gte=start)
+        .annotate(hour=TruncHour("when", tzinfo=timezone.utc))
+        .values("hour")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    counters = {
+        counter_key(user_id, start + datetime.timedelta(hours=i)): 0
+        for i in range(WINDOW_HOURS)
+    }
+    for row in hourly:
+        counters[counter_key(user_id, row["hour"])] = row["count"]
+    cache = get_cache()
+    cache.set_many(counters, COUNTER_TTL)
+    cache.set(loaded_key(user_id), True, COUNTER_TTL)
+    return sum(counters.values())
+
+
+def emails_sent(user_id, now=None):
+    """
+    Returns the number of emails sent by the user in the last 24 hours.
+    """
+    if now is None:
+        now = timezone.now()
+    cache = get_cache()
+    if cache is None:
+        return EmailRecord.objects.filter(
+            sender_id=user_id, when__gt=now - datetime.timedelta(hours=WINDOW_HOURS)
+        ).count()
+    hour = get_hour(now)
+    keys = [
+        counter_key(user_id, hour - datetime.timedelta(hours=i))
+        for i in range(WINDOW_HOURS)
+    ]
+    counters = cache.get_many(keys + [loaded_key(user_id)])
+    if loaded_key(user_id) not in counters:
+        return load_counters(user_id, now)
+    return sum(counters.get(key, 0) for key in keys)
+
+
+def count_sent(user_id, count=1, now=None):
+    """
+    Adds ``count`` emails sent by the user to the current hour's counter.
+    """
+    if now is None:
+        now = timezone.now()
+    cache = get_cache()
+    if cache is None or cache.get(loaded_key(user_id)) is None:
+        return  # Counted from the database on the next check
+    key = counter_key(user_id, get_hour(now))
+    if not cache.add(key, count, COUNTER_TTL):
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, COUNTER_TTL)
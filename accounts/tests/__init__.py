@@ -1,5 +1,8 @@
 from django.test import TestCase
 
+from .outbox import *
+from .quota import *
+
 
 # Create your tests here.
 class BaseTest(TestCase):
@@ -0,0 +1,128 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+import mock
+from model_mommy import mommy
+
+from ..models import EmailRecord
+from ..outbox import BulkMailer, TokenBucket, claim_queued, queue_mail, send_queued
+
+
+@override_settings(EMAIL_OUTBOX=True)
+class OutboxTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = mommy.make(User, email="user@example.com")
+
+    def queue(self, **kwargs):
+        return queue_mail(
+            email=self.user.email,
+            subject="Hello",
+            body="Hello text",
+            html_body="<p>Hello html</p>",
+            recipient=self.user,
+            **kwargs
+        )
+
+    def test_queue_and_send(self):
+        record = self.queue()
+        assert record.status == EmailRecord.QUEUED
+        assert len(mail.outbox) == 0
+
+        assert send_queued() == (1, 0)
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ["user@example.com"]
+        assert mail.outbox[0].alternatives == [("<p>Hello html</p>", "text/html")]
+
+        record.refresh_from_db()
+        assert record.status == EmailRecord.SENT
+        assert record.ok
+        assert record.sent_time is not None
+        assert send_queued() == (0, 0)
+
+    def test_claimed_records_are_leased(self):
+        self.queue()
+        assert len(claim_queued()) == 1
+        assert claim_queued() == []
+
+    @override_settings(EMAIL_OUTBOX=False)
+    def test_send_immediately(self):
+        record = self.queue()
+        assert len(mail.outbox) == 1
+        record.refresh_from_db()
+        assert record.status == EmailRecord.SENT
+
+    @override_settings(EMAIL_MAX_ATTEMPTS=2, EMAIL_RETRY_DELAY=60)
+    def test_retry_with_backoff(self):
+        record = self.queue()
+        with mock.patch(
+            "django.core.mail.EmailMultiAlternatives.send",
+            side_effect=OSError("Connection refused"),
+        ):
+            assert send_queued() == (0, 1)
+            record.refresh_from_db()
+            assert record.status == EmailRecord.QUEUED
+            assert record.attempts == 1
+            assert record.last_error == "Connection refused"
+            assert record.next_attempt > timezone.now() + datetime.timedelta(seconds=50)
+            assert send_queued() == (0, 0)  # Not due yet
+
+            record.next_attempt = timezone.now()
+            record.save()
+            assert send_queued() == (0, 1)
+            record.refresh_from_db()
+            assert record.status == EmailRecord.FAILED
+            assert record.next_attempt is None
+        assert len(mail.outbox) == 0
+
+
+class BulkMailerTest(TestCase):
+    def test_send_in_batches(self):
+        users = mommy.make(User, email="user@example.com", _quantity=5)
+        with mock.patch(
+            "accounts.outbox.render_to_string", return_value="Body"
+        ) as render:
+            with BulkMailer(batch_size=2) as mailer:
+                for user in users:
+                    subject, text, html = mailer.render(
+                        "key", "Subject", "text.txt", "html.html", {}
+                    )
+                    mailer.send(user.email, subject, text, html, recipient=user)
+                assert EmailRecord.objects.count() == 4
+        assert render.call_count == 2
+        assert mailer.sent == 5
+        assert len(mail.outbox) == 5
+        assert EmailRecord.objects.filter(status=EmailRecord.SENT, ok=True).count() == 5
+
+    def test_failures_are_queued_for_retry(self):
+        user = mommy.make(User, email="user@example.com")
+        with mock.patch(
+            "django.core.mail.EmailMultiAlternatives.send",
+            side_effect=OSError("Connection refused"),
+        ):
+            with BulkMailer() as mailer:
+                mailer.send(user.email, "Subject", "Body", recipient=user)
+        assert mailer.failed == 1
+        record = EmailRecord.objects.get()
+        assert record.status == EmailRecord.QUEUED
+        assert record.attempts == 1
+        assert not record.ok
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        with mock.patch("accounts.outbox.time.sleep") as sleep:
+            bucket.take()
+            bucket.take()
+            assert not sleep.called
+            bucket.take()
+            assert sleep.call_count == 1
+            assert 0 < sleep.call_args[0][0] <= 0.1
+        with mock.patch("accounts.outbox.time.sleep") as sleep:
+            unlimited = TokenBucket()
+            for i in range(10):
+                unlimited.take()
+            assert not sleep.called
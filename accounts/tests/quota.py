@@ -0,0 +1,94 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from ..models import EmailRecord
+from ..outbox import queue_mail
+from ..quota import WINDOW_HOURS, emails_sent
+
+
+@override_settings(ALLOWED_EMAILS_PER_DAY=5, EMAIL_QUOTA_CACHE_ALIAS="default")
+class EmailQuotaTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = mommy.make(User)
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def send(self, count):
+        for i in range(count):
+            queue_mail(
+                email="someone@example.com",
+                subject="Hello",
+                body="Hello",
+                sender=self.user,
+            )
+
+    def test_remaining_emails(self):
+        old = mommy.make(EmailRecord, sender=self.user)
+        EmailRecord.objects.filter(id=old.id).update(
+            when=timezone.now() - datetime.timedelta(hours=25)
+        )
+        self.send(2)
+        assert self.user.account.remaining_emails_allowed() == 3
+
+        # Counted in the cache from now on
+        self.send(2)
+        with self.assertNumQueries(0):
+            assert self.user.account.remaining_emails_allowed() == 1
+        self.send(2)
+        assert self.user.account.remaining_emails_allowed() == 0
+
+    def test_window_slides(self):
+        self.send(3)
+        assert emails_sent(self.user.id) == 3
+        later = timezone.now() + datetime.timedelta(hours=WINDOW_HOURS)
+        assert emails_sent(self.user.id, now=later) == 0
+
+    @override_settings(EMAIL_QUOTA_CACHE_ALIAS=None)
+    def test_counted_in_database_without_shared_cache(self):
+        self.send(2)
+        cache.clear()  # Like a restart, or another worker
+        account = self.user.account
+        with self.assertNumQueries(1):
+            assert account.remaining_emails_allowed() == 3
+        self.send(3)
+        assert self.user.account.remaining_emails_allowed() == 0
+
+    @override_settings(TIME_ZONE="Asia/Tokyo")
+    def test_counts_loaded_in_other_time_zone(self):
+        self.send(2)
+        cache.clear()
+        assert emails_sent(self.user.id) == 2
+        with self.assertNumQueries(0):
+            assert emails_sent(self.user.id) == 2
+
+
+class TrimEmailRecordsTest(TestCase):
+    def test_trim_and_delete(self):
+        old, queued, recent = mommy.make(
+            EmailRecord, body="Body", html_body="<p>Body</p>", _quantity=3
+        )
+        EmailRecord.objects.filter(id__in=[old.id, queued.id]).update(
+            when=timezone.now() - datetime.timedelta(days=100)
+        )
+        EmailRecord.objects.filter(id=queued.id).update(status=EmailRecord.QUEUED)
+
+        call_command("trim_email_records", batch_size=1)
+        old.refresh_from_db()
+        assert old.body == "" and old.html_body is None
+        assert EmailRecord.objects.get(id=queued.id).body == "Body"
+        assert EmailRecord.objects.get(id=recent.id).body == "Body"
+
+        call_command("trim_email_records", delete=True)
+        assert not EmailRecord.objects.filter(id=old.id).exists()
+        assert EmailRecord.objects.count() == 2
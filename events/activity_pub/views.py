@@ -1,18 +1,39 @@
-from collections import Mapping, OrderedDict
+import json
+from collections import OrderedDict
 
-from django.contrib.sites.models import Site
+from django.conf import settings
 from django.db import models
-from django.shortcuts import resolve_url
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
 
 import pytz
-from events.models import Event, Place, Team
 from rest_framework import serializers
 from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 from rest_framework.utils import representation
 from rest_framework.utils.serializer_helpers import ReturnDict
 
+from events.models import Event, Place, Team
+from events.site import full_url, get_domain, get_scheme
+from events.utils import decode_cursor, encode_cursor
+
+CONTENT_TYPE = "application/activity+json"
+PAGE_SIZE = getattr(settings, "ACTIVITYPUB_PAGE_SIZE", 100)
+MAX_PAGE_SIZE = getattr(settings, "ACTIVITYPUB_MAX_PAGE_SIZE", 1000)
+
+# Formats values the same way as the serializers' fields
+COORDINATE = serializers.DecimalField(max_digits=10, decimal_places=5)
+DATETIME = serializers.DateTimeField()
+
+
+def get_coordinate(value):
+    # Serializers skip their field for a missing value and write null
+    if value is None:
+        return None
+    return COORDINATE.to_representation(value)
+
 
 def localized_time(dt, tz="UTC"):
     event_tz = pytz.timezone(tz)
@@ -28,14 +49,15 @@ class CollectionSerializer(serializers.ListSerializer):
         # Dealing with nested relationships, data can be a Manager,
         # so, first get a queryset from the Manager if needed
         iterable = data.all() if isinstance(data, models.Manager) else data
+        items = [self.child.to_representation(item) for item in iterable]
 
         repr_data = OrderedDict(
             {
                 "@context": "https://www.w3.org/ns/activitystreams",
                 "summary": self.child.verbose_name_plural,
                 "type": "Collection",
-                "totalItems": len(iterable),
-                "items": [self.child.to_representation(item) for item in iterable],
+                "totalItems": len(items),
+                "items": items,
             }
         )
         repr_data.move_to_end("@context", last=False)
@@ -70,7 +92,7 @@ class APGroupSerializer(serializers.ModelSerializer):
         del data["context"]
         data.move_to_end("@context", last=False)
 
-        data["id"] = "http://%s%s" % (Site.objects.get_current().domain, data["id"])
+        data["id"] = full_url(data["id"])
         return data
 
 
@@ -98,65 +120,139 @@ class APPlaceSerializer(serializers.ModelSerializer):
         del data["context"]
         data.move_to_end("@context", last=False)
 
-        data["id"] = "http://%s%s" % (Site.objects.get_current().domain, data["id"])
+        data["id"] = full_url(data["id"])
         return data
 
 
-class APEventSerializer(serializers.ModelSerializer):
-    verbose_name_plural = "Events"
+def get_group(team, site_url):
+    return {
+        "@context": "https://www.w3.org/ns/activitystreams",
+        "type": "Group",
+        "id": site_url + team.get_absolute_url(),
+        "name": str(team),
+        "url": team.web_url,
+    }
 
-    context = serializers.CharField(default="https://www.w3.org/ns/activitystreams")
-    type = serializers.CharField(default="Event")
-    id = serializers.CharField(source="get_absolute_url")
-    name = serializers.CharField()
-    attributedTo = APGroupSerializer(source="team")
-    location = APPlaceSerializer(source="place")
-    startTime = serializers.DateTimeField(source="start_time")
-    endTime = serializers.DateTimeField(source="end_time")
-    image = serializers.URLField(source="team.card_img_url")
-    url = serializers.URLField(source="web_url")
-    published = serializers.DateTimeField(source="created_time")
 
-    class Meta:
-        list_serializer_class = CollectionSerializer
-        model = Event
-        fields = (
-            "context",
-            "type",
-            "id",
-            "name",
-            "startTime",
-            "endTime",
-            "attributedTo",
-            "location",
-            "image",
-            "url",
-            "published",
-        )
+def get_place(place, site_url):
+    return {
+        "@context": "https://www.w3.org/ns/activitystreams",
+        "type": "Place",
+        "id": site_url + place.get_absolute_url(),
+        "name": str(place),
+        "latitude": get_coordinate(place.latitude),
+        "longitude": get_coordinate(place.longitude),
+        "url": place.place_url,
+    }
 
-    def to_representation(self, instance):
-        data = super(APEventSerializer, self).to_representation(instance)
-        data["@context"] = data["context"]
-        del data["context"]
-        data.move_to_end("@context", last=False)
 
-        if data["image"].startswith("/"):
-            data["image"] = "/".join(data["id"].split("/")[:3]) + data["image"]
+def get_event(event, site_url, team_images):
+    """
+    Builds the same item as the DRF serializers used to, from an event loaded
+    with its team and place. ``team_images`` caches the card image of each
+    team, since resolving it may check the storage for a generated image.
+    """
+    if event.team_id not in team_images:
+        image = event.team.card_img_url
+        if image.startswith("/"):
+            image = site_url + image
+        team_images[event.team_id] = image
+    return {
+        "@context": "https://www.w3.org/ns/activitystreams",
+        "type": "Event",
+        "id": site_url + event.get_absolute_url(),
+        "name": event.name,
+        "startTime": DATETIME.to_representation(event.start_time),
+        "endTime": DATETIME.to_representation(event.end_time),
+        "attributedTo": get_group(event.team, site_url),
+        "location": get_place(event.place, site_url) if event.place else None,
+        "image": team_images[event.team_id],
+        "url": event.web_url,
+        "published": DATETIME.to_representation(event.created_time),
+    }
 
-        data["id"] = "http://%s%s" % (Site.objects.get_current().domain, data["id"])
-        return data
 
+def stream_collection_page(head, items, tail):
+    """
+    Yields an ActivityStreams collection page as JSON, one item at a time,
+    with the ``tail`` properties (like ``next``) only known once all the
+    items have been written.
+    """
+    yield json.dumps(head)[:-1] + ', "orderedItems": ['
+    for i, item in enumerate(items):
+        yield (", " if i else "") + json.dumps(item)
+    yield "]"
+    for name, value in tail().items():
+        yield ", %s: %s" % (json.dumps(name), json.dumps(value))
+    yield "}"
 
-@api_view(["GET"])
+
+@require_GET
 def events_list(request):
-    serializer = APEventSerializer(
-        Event.objects.filter(end_time__gte=timezone.now(), team__access=Team.PUBLIC),
-        many=True,
+    site_url = "%s://%s" % (get_scheme(), get_domain())
+    collection_url = site_url + request.path
+    events = Event.objects.filter(
+        end_time__gte=timezone.now(), team__access=Team.PUBLIC
+    ).select_related("team", "team__organization", "team__category", "place__city")
+
+    if "page" not in request.GET and "after" not in request.GET:
+        data = {
+            "@context": "https://www.w3.org/ns/activitystreams",
+            "id": collection_url,
+            "type": "OrderedCollection",
+            "summary": "Events",
+            "totalItems": events.count(),
+            "first": collection_url + "?page=true",
+        }
+        return JsonResponse(data, content_type=CONTENT_TYPE)
+
+    try:
+        limit = min(int(request.GET.get("limit") or PAGE_SIZE), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("Invalid limit")
+        if request.GET.get("after"):
+            start_time, event_id = decode_cursor(request.GET["after"])
+            events = events.filter(
+                Q(start_time__gt=start_time)
+                | Q(start_time=start_time, id__gt=int(event_id))
+            )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    events = events.order_by("start_time", "id")[: limit + 1]
+    page = {"last": None, "more": False}
+
+    def items():
+        team_images = dict()
+        for i, event in enumerate(events.iterator()):
+            if i == limit:
+                page["more"] = True
+                break
+            page["last"] = event
+            yield get_event(event, site_url, team_images)
+
+    def tail():
+        if not page["more"]:
+            return {}
+        params = request.GET.copy()
+        params["page"] = "true"
+        params["after"] = encode_cursor(page["last"].start_time, page["last"].id)
+        return {"next": collection_url + "?" + params.urlencode()}
+
+    head = {
+        "@context": "https://www.w3.org/ns/activitystreams",
+        "id": collection_url + "?" + request.GET.urlencode(),
+        "type": "OrderedCollectionPage",
+        "partOf": collection_url,
+    }
+    return StreamingHttpResponse(
+        stream_collection_page(head, items(), tail), content_type=CONTENT_TYPE
     )
-    return Response(serializer.data)
 
 
 @api_view(["GET"])
 def places_list(request):
-    serializer = APPlaceSerializer(Place.objects.all(), many=True)
+    serializer = APPlaceSerializer(
+        Place.objects.select_related("city").all(), many=True
+    )
     return Response(serializer.data)
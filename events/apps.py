@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class EventsConfig(AppConfig):
     name = "events"
+
+    def ready(self):
+        from . import fragments  # Connects the signals that expire page fragments
+        from . import feed_tokens  # Forgets the calendar feed tokens that change
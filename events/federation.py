@@ -0,0 +1,158 @@
+"""
+Synchronizes the Searchable records published by another node.
+
+A peer's ``searchables`` feed is a paginated JSON array that can hold every
+upcoming event it knows about, so each page is parsed as a stream, one record
+at a time, and written in batches. Pages are followed through their
+``Link: <...>; rel="next"`` headers. A full sync also removes the records that peer no longer
+publishes. Passing ``since`` only asks the peer for the records that changed
+after that time, which is what ``sync_searchables(incremental=True)`` does,
+going by the newest record already imported from it.
+"""
+import codecs
+import datetime
+import json
+import urllib.parse
+import urllib.request
+
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+
+from . import geoindex
+from .models.search import (
+    Searchable,
+    SearchableSerializer,
+    delete_searchables,
+    get_searchable_origin,
+    get_searchable_values,
+    save_searchables,
+)
+
+BATCH_SIZE = 500
+READ_SIZE = 64 * 1024  # bytes
+SYNC_TIMEOUT = 30  # seconds
+SYNC_OVERLAP = datetime.timedelta(hours=1)  # Allows for clock differences
+RECORD_FIELDS = tuple(
+    field for field in SearchableSerializer.Meta.fields if field != "event_uri"
+)
+SYNC_FIELDS = RECORD_FIELDS + ("federation_node", "geo_cell")
+
+
+def iter_json_array(stream, read_size=READ_SIZE):
+    """
+    Yields the items of the JSON array in a binary ``stream`` as they are
+    read, without loading the whole document into memory.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+    while not finished:
+        chunk = stream.read(read_size)
+        buffer = buffer[pos:] + utf8.decode(chunk, final=not chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                break
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # Incomplete item, read some more
+            yield item
+        if not chunk and not finished:
+            raise ValueError("Unexpected end of JSON array")
+
+
+def get_sync_url(url, since=None):
+    if since is None or urllib.parse.urlparse(url).scheme not in ("http", "https"):
+        return url  # Files are static dumps that can't be filtered
+    separator = "&" if urllib.parse.urlparse(url).query else "?"
+    return url + separator + urllib.parse.urlencode({"since": since.isoformat()})
+
+
+def get_next_url(link_header):
+    """
+    Finds the rel="next" URL in a paginated response's Link header.
+    """
+    for link in (link_header or "").split(","):
+        parts = link.split(";")
+        if len(parts) > 1 and 'rel="next"' in [p.strip() for p in parts[1:]]:
+            return parts[0].strip().strip("<>")
+    return None
+
+
+def sync_searchables(url, since=None, incremental=False, batch_size=BATCH_SIZE):
+    """
+    Imports the searchables published at ``url``. Returns the number of
+    (created, updated, deleted) records.
+    """
+    federated = Searchable.objects.filter(federation_node=url)
+    if incremental and since is None:
+        last_change = federated.aggregate(Max("federation_time"))
+        if last_change["federation_time__max"] is not None:
+            since = last_change["federation_time__max"] - SYNC_OVERLAP
+    local_node = get_searchable_origin()[2]
+
+    created = updated = 0
+    seen = set()
+    batch = dict()
+    page_url = get_sync_url(url, since)
+    while page_url is not None:
+        with urllib.request.urlopen(page_url, timeout=SYNC_TIMEOUT) as resp:
+            page_url = get_next_url(resp.headers.get("Link"))
+            for record in iter_json_array(resp):
+                try:
+                    searchable = Searchable(event_uri=record["event_uri"])
+                    for field in RECORD_FIELDS:
+                        if field in record:
+                            setattr(searchable, field, record[field])
+                    searchable.federation_node = url
+                    searchable.geo_cell = geoindex.get_cell(
+                        searchable.latitude, searchable.longitude
+                    )
+                    get_searchable_values(searchable, SYNC_FIELDS)
+                    if searchable.start_time is None or searchable.end_time is None:
+                        raise ValidationError("Missing start or end time")
+                except (KeyError, TypeError, ValueError, ValidationError) as e:
+                    print("Skipping invalid record from %s: %s" % (url, e))
+                    continue
+                seen.add(searchable.event_uri)
+                batch[searchable.event_uri] = searchable
+                if len(batch) >= batch_size:
+                    counts = save_federated(batch, local_node, batch_size)
+                    created, updated = created + counts[0], updated + counts[1]
+                    batch = dict()
+    if batch:
+        counts = save_federated(batch, local_node, batch_size)
+        created, updated = created + counts[0], updated + counts[1]
+
+    deleted = 0
+    if since is None:
+        stale = set(federated.values_list("event_uri", flat=True)) - seen
+        deleted = delete_searchables(stale, batch_size)
+    return created, updated, deleted
+
+
+def save_federated(batch, local_node, batch_size):
+    # Never let a peer overwrite the records for this node's own events
+    local = Searchable.objects.filter(
+        event_uri__in=list(batch), federation_node=local_node
+    ).values_list("event_uri", flat=True)
+    for event_uri in local:
+        del batch[event_uri]
+    return save_searchables(batch, SYNC_FIELDS, batch_size)
@@ -0,0 +1,130 @@
+"""
+Looks up the profile a calendar feed token (``UserProfile.secret_key``)
+belongs to.
+
+Calendar apps poll the feed URLs every few minutes, so when
+``FEED_TOKEN_CACHE_ALIAS`` names a cache that all the web workers share, like
+memcached or redis, known tokens are kept there for ``FEED_TOKEN_CACHE_TTL``
+seconds, under a hash of the token rather than the token itself. Without one
+every lookup goes to the database, since a token cached in one worker's
+memory couldn't be revoked from the others. Tokens that don't belong to
+anyone, like the ones bots try at random, are remembered in memory for
+``FEED_TOKEN_NEGATIVE_CACHE_TTL`` seconds so that probing them doesn't reach
+the database either.
+
+Changing a profile's ``secret_key``, with ``UserProfile.rotate_secret_key()``
+or any other way that saves the profile, or deleting the profile forgets the
+old token once the change is committed, which revokes every feed URL made
+with it.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models.profiles import UserProfile
+from .utils import MISSING, LRUCache
+
+UNKNOWN_TOKENS = LRUCache(getattr(settings, "FEED_TOKEN_NEGATIVE_CACHE_SIZE", 10000))
+
+
+def get_cache():
+    alias = getattr(settings, "FEED_TOKEN_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def token_key(token):
+    return "feed-token:%s" % hashlib.sha256(str(token).encode("utf8")).hexdigest()
+
+
+def parse_token(token):
+    try:
+        return uuid.UUID(str(token))
+    except ValueError:
+        return None
+
+
+def get_profile_id(token):
+    """
+    Returns the id of the profile with ``token`` as its secret key, or None if
+    there isn't one.
+    """
+    token = parse_token(token)
+    if token is None:
+        return None
+    key = token_key(token)
+    if UNKNOWN_TOKENS.get(key) is not MISSING:
+        return None
+
+    cache = get_cache()
+    profile_id = cache.get(key) if cache is not None else None
+    if profile_id is None:
+        profile_id = (
+            UserProfile.objects.filter(secret_key=token)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if profile_id is None:
+            UNKNOWN_TOKENS.set(key, True, settings.FEED_TOKEN_NEGATIVE_CACHE_TTL)
+            return None
+        if cache is not None:
+            cache.set(key, profile_id, settings.FEED_TOKEN_CACHE_TTL)
+    return profile_id
+
+
+def get_profile(token):
+    """
+    Returns the profile with ``token`` as its secret key, and its user, or
+    raises ``UserProfile.DoesNotExist``.
+    """
+    profile_id = get_profile_id(token)
+    if profile_id is None:
+        raise UserProfile.DoesNotExist("Unknown feed token")
+    return UserProfile.objects.select_related("user").get(id=profile_id)
+
+
+def forget_token(token):
+    key = token_key(parse_token(token) or token)
+    cache = get_cache()
+    if cache is not None:
+        cache.delete(key)
+    UNKNOWN_TOKENS.delete(key)
+
+
+# The key each profile was loaded with, to know which token to forget when it
+# changes. Read from __dict__ so that a deferred key isn't loaded just for this.
+# The old token is only forgotten after the commit, as a feed request before
+# then would still find it in the database and cache it again.
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_secret_key(sender, instance, **kwargs):
+    instance._saved_secret_key = instance.__dict__.get("secret_key")
+
+
+@receiver(pre_save, sender=UserProfile)
+def secret_key_changing(sender, instance, **kwargs):
+    old_key = getattr(instance, "_saved_secret_key", None)
+    if old_key is not None and old_key != instance.__dict__.get("secret_key"):
+        instance._forget_secret_key = old_key
+
+
+@receiver(post_save, sender=UserProfile)
+def secret_key_saved(sender, instance, **kwargs):
+    old_key = instance.__dict__.pop("_forget_secret_key", None)
+    if old_key is not None:
+        transaction.on_commit(lambda: forget_token(old_key))
+    remember_secret_key(sender, instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def profile_deleted(sender, instance, **kwargs):
+    key = instance.__dict__.get("secret_key") or getattr(
+        instance, "_saved_secret_key", None
+    )
+    if key is not None:
+        transaction.on_commit(lambda: forget_token(key))
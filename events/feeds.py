@@ -1,18 +1,43 @@
 import datetime
+import hashlib
+import io
 
-from django.contrib.sites.models import Site
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
 
 from django_ical.views import ICalFeed
 
+from . import feed_tokens
+from .fragments import EVENT, TEAM, USER, get_cache, get_version
 from .models.events import CommonEvent, Event
-from .models.profiles import Organization, Team, UserProfile
+from .models.profiles import Organization, Team
+from .site import get_domain
 
 
 class AbstractEventCalendarFeed(ICalFeed):
+    """
+    Calendar clients poll these feeds every few minutes, so they are answered
+    with a 304 when the client already has the calendar. When there is a
+    shared cache for the page fragments (see ``events.fragments``), the
+    rendered calendar is also cached for ``ICAL_CACHE_TTL`` seconds under the
+    versions of the objects it shows, which date the Last-Modified header.
+    Otherwise the calendar is rendered every time and only has an ETag, since
+    versions kept in one worker's memory can't say when another one changed.
+    """
+
+    def get_versions(self, obj):
+        """
+        Returns the (kind, id) of the objects whose changes show up in the feed
+        of ``obj``, or None if it can't be cached.
+        """
+        return None
+
     def item_guid(self, event):
-        site = Site.objects.get(id=1)
-        return "%s@%s" % (event.id, site.domain)
+        return "%s@%s" % (event.id, get_domain())
 
     def item_link(self, event):
         return event.get_full_url()
@@ -48,8 +73,51 @@ class AbstractEventCalendarFeed(ICalFeed):
             return (latitude, longitude)
         return None
 
+    def render(self, request, obj):
+        feedgen = self.get_feed(obj, request)
+        body = io.BytesIO()
+        feedgen.write(body, "utf-8")
+        body = body.getvalue()
+        return feedgen.mime_type, body, quote_etag(hashlib.md5(body).hexdigest())
+
     def __call__(self, request, *args, **kwargs):
-        response = ICalFeed.__call__(self, request, *args, **kwargs)
+        try:
+            obj = self.get_object(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            raise Http404("Feed object does not exist.")
+
+        cache = get_cache()
+        versions = None
+        if obj is not None and cache is not None:
+            versions = self.get_versions(obj)
+        if versions is None:
+            mime_type, body, etag = self.render(request, obj)
+            last_modified = None
+        else:
+            versions = [get_version(kind, obj_id) for kind, obj_id in versions]
+            key = "ical:%s:%s:%s" % (
+                type(self).__name__,
+                obj.pk,
+                "-".join(str(version) for version in versions),
+            )
+            cached = cache.get(key)
+            if cached is None:
+                cached = self.render(request, obj)
+                cache.set(key, cached, settings.ICAL_CACHE_TTL)
+            mime_type, body, etag = cached
+            last_modified = max(versions) // 10 ** 9
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(body, content_type=mime_type)
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        filename = self._get_dynamic_attr("file_name", obj)
+        if filename:
+            response["Content-Disposition"] = 'attachment; filename="%s"' % filename
         response["Access-Control-Allow-Origin"] = "*"
         return response
 
@@ -58,12 +126,17 @@ class UserEventsCalendar(AbstractEventCalendarFeed):
     timezone = "UTC"
 
     def get_object(self, request, account_secret):
-        return UserProfile.objects.get(secret_key=account_secret)
+        return feed_tokens.get_profile(account_secret)
+
+    def get_versions(self, user):
+        return [(USER, user.id)]
 
     def items(self, user):
-        return Event.objects.filter(
-            attendees=user, end_time__gt=timezone.now()
-        ).order_by("-start_time")
+        return (
+            Event.objects.filter(attendees=user, end_time__gt=timezone.now())
+            .select_related("place__city", "team__city")
+            .order_by("-start_time")
+        )
 
 
 class TeamEventsCalendar(AbstractEventCalendarFeed):
@@ -72,9 +145,14 @@ class TeamEventsCalendar(AbstractEventCalendarFeed):
     def get_object(self, request, team_id):
         return Team.public_objects.get(id=team_id)
 
+    def get_versions(self, team):
+        return [(TEAM, team.id)]
+
     def items(self, team):
-        return Event.objects.filter(team=team, end_time__gt=timezone.now()).order_by(
-            "-start_time"
+        return (
+            Event.objects.filter(team=team, end_time__gt=timezone.now())
+            .select_related("place__city", "team__city")
+            .order_by("-start_time")
         )
 
 
@@ -82,7 +160,12 @@ class SingleEventCalendar(AbstractEventCalendarFeed):
     timezone = "UTC"
 
     def get_object(self, request, event_id, event_slug):
-        return Event.objects.get(id=event_id)
+        return Event.objects.select_related("place__city", "team__city").get(
+            id=event_id
+        )
+
+    def get_versions(self, event):
+        return [(EVENT, event.id), (TEAM, event.team_id)]
 
     def items(self, event):
         return [event]
@@ -92,13 +175,18 @@ class PrivateTeamEventsCalendar(AbstractEventCalendarFeed):
     timezone = "UTC"
 
     def get_object(self, request, team_id, account_secret):
-        request_user = UserProfile.objects.get(secret_key=account_secret)
+        request_user = feed_tokens.get_profile(account_secret)
         team = Team.objects.get(id=team_id)
         if team.access == Team.PRIVATE and not request_user.is_in_team(team):
             return None
         return team
 
+    def get_versions(self, team):
+        return [(TEAM, team.id)]
+
     def items(self, team):
-        return Event.objects.filter(team=team, end_time__gt=timezone.now()).order_by(
-            "-start_time"
+        return (
+            Event.objects.filter(team=team, end_time__gt=timezone.now())
+            .select_related("place__city", "team__city")
+            .order_by("-start_time")
         )
@@ -0,0 +1,203 @@
+"""
+Versions for the cached fragments of the public team, event and org pages, and
+for the cached calendar feeds.
+
+Templates cache the parts of a page that look the same for every viewer, like
+member and attendee lists, with ``{% fragment_cache %}`` keyed on the object's
+id, the active language and the object's current version from the
+``fragment_version`` template tag. Saving or deleting anything shown in those
+fragments, including the sponsors, profiles and badges of the people listed,
+bumps the version of the objects it belongs to, so the next request renders
+them again instead of waiting for the fragment to expire. The calendar feeds
+of teams, events and users are cached the same way (see ``events.feeds``).
+
+The versions are kept in the same cache as the fragments,
+``FRAGMENT_CACHE_ALIAS``, which has to be shared between all the web workers,
+like memcached, redis or the database cache, for a change made in one to
+show up in the others. Without it nothing is cached, as a worker keeping its
+own fragments in memory would go on showing them after another one changed
+what's in them.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import Badge, BadgeGrant
+
+from .models.events import Attendee, CommonEvent, Event, EventComment
+from .models.profiles import Member, Sponsor, Team, UserProfile
+from .models.speakers import Presentation
+
+EVENT = "event"
+TEAM = "team"
+ORG = "org"
+USER = "user"
+
+
+def get_cache():
+    """
+    Returns the cache for the page fragments and their versions, or None if
+    there isn't a shared one to keep them in.
+    """
+    alias = getattr(settings, "FRAGMENT_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def version_key(kind, obj_id):
+    return "fragment-version:%s:%s" % (kind, obj_id)
+
+
+def get_version(kind, obj_id):
+    cache = get_cache()
+    if cache is None:
+        return None
+    version = cache.get(version_key(kind, obj_id))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(version_key(kind, obj_id), version, None):
+            version = cache.get(version_key(kind, obj_id), version)
+    return version
+
+
+def bump_version(kind, obj_id):
+    cache = get_cache()
+    if cache is not None and obj_id is not None:
+        cache.set(version_key(kind, obj_id), time.time_ns(), None)
+
+
+def bump_versions(kind, obj_ids):
+    cache = get_cache()
+    if cache is None:
+        return  # Without running the query for obj_ids
+    version = time.time_ns()
+    cache.set_many({version_key(kind, obj_id): version for obj_id in obj_ids}, None)
+
+
+def bump_team(team_id, team=None):
+    """
+    Bumps the version of the team and of the organization it belongs to,
+    looking that up unless the ``team`` is already loaded.
+    """
+    if get_cache() is None:
+        return
+    bump_version(TEAM, team_id)
+    if team is not None:
+        organization_id = team.organization_id
+    else:
+        organization_id = (
+            Team.objects.filter(id=team_id)
+            .values_list("organization_id", flat=True)
+            .first()
+        )
+    bump_version(ORG, organization_id)
+
+
+def bump_profiles(profiles):
+    """
+    Bumps the versions of the events and teams that list any of ``profiles``,
+    a ``UserProfile`` queryset, with their names, avatars or badges.
+    """
+    bump_versions(
+        EVENT,
+        Attendee.objects.filter(user__in=profiles)
+        .values_list("event_id", flat=True)
+        .distinct(),
+    )
+    bump_versions(
+        EVENT,
+        Presentation.objects.filter(talk__speaker__user__in=profiles)
+        .values_list("event_id", flat=True)
+        .distinct(),
+    )
+    bump_versions(
+        TEAM,
+        Member.objects.filter(user__in=profiles)
+        .values_list("team_id", flat=True)
+        .distinct(),
+    )
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def event_changed(sender, instance, **kwargs):
+    bump_version(EVENT, instance.id)
+    bump_team(instance.team_id, Event.team.field.get_cached_value(instance, None))
+    if kwargs.get("created") is False:
+        # The event is in the calendar feeds of everyone attending it
+        bump_versions(
+            USER,
+            Attendee.objects.filter(event_id=instance.id).values_list(
+                "user_id", flat=True
+            ),
+        )
+
+
+@receiver(m2m_changed, sender=Event.sponsors.through)
+def event_sponsors_changed(sender, instance, **kwargs):
+    if isinstance(instance, Event):
+        bump_version(EVENT, instance.id)
+    else:
+        for event_id in kwargs.get("pk_set") or ():
+            bump_version(EVENT, event_id)
+
+
+@receiver(post_save, sender=Sponsor)
+@receiver(pre_delete, sender=Sponsor)
+def sponsor_changed(sender, instance, **kwargs):
+    # Before it's deleted, while it's still linked to its events
+    bump_versions(EVENT, instance.events.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Attendee)
+@receiver(post_delete, sender=Attendee)
+def attendee_changed(sender, instance, **kwargs):
+    bump_version(EVENT, instance.event_id)
+    bump_version(USER, instance.user_id)
+
+
+@receiver(post_save, sender=EventComment)
+@receiver(post_delete, sender=EventComment)
+@receiver(post_save, sender=Presentation)
+@receiver(post_delete, sender=Presentation)
+def event_detail_changed(sender, instance, **kwargs):
+    bump_version(EVENT, instance.event_id)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def member_changed(sender, instance, **kwargs):
+    bump_team(instance.team_id, Member.team.field.get_cached_value(instance, None))
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_changed(sender, instance, **kwargs):
+    bump_version(TEAM, instance.id)
+    bump_version(ORG, instance.organization_id)
+
+
+@receiver(post_save, sender=CommonEvent)
+@receiver(post_delete, sender=CommonEvent)
+def common_event_changed(sender, instance, **kwargs):
+    bump_version(ORG, instance.organization_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_profiles(UserProfile.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=BadgeGrant)
+@receiver(post_delete, sender=BadgeGrant)
+def badge_grant_changed(sender, instance, **kwargs):
+    bump_profiles(UserProfile.objects.filter(user__account=instance.account_id))
+
+
+@receiver(post_save, sender=Badge)
+@receiver(pre_delete, sender=Badge)
+def badge_changed(sender, instance, **kwargs):
+    bump_profiles(UserProfile.objects.filter(user__account__badges=instance))
@@ -0,0 +1,111 @@
+"""
+Two tier cache for IP geolocation lookups.
+
+The first tier is a small, thread-safe, in-process LRU. Misses fall through
+to a Django cache backend (``settings.GEOIP_CACHE_ALIAS``) so results survive
+restarts and are shared between workers when that backend is persistent,
+such as the database or file based caches. Both tiers expire entries, and
+failed lookups are cached too, for a shorter time, so an IP that ipstack
+can't locate doesn't cost an HTTP request on every page view.
+"""
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from .utils import MISSING, LRUCache
+
+
+class GeoIPCache:
+    """
+    Caches the raw geolocation data for an IP address. An empty dict marks a
+    lookup that failed, and is kept for ``negative_ttl`` seconds instead of
+    ``ttl``.
+    """
+
+    key_prefix = "geoip:"
+
+    def __init__(self, size=1000, ttl=86400, negative_ttl=600, cache_alias=None):
+        self.memory = LRUCache(size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache_alias = cache_alias
+        self._stats_lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ("memory_hits", "shared_hits", "misses", "negative_hits", "stores"), 0
+        )
+
+    @property
+    def shared(self):
+        if self.cache_alias is None:
+            return None
+        try:
+            return caches[self.cache_alias]
+        except InvalidCacheBackendError:
+            return None
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def get(self, ip):
+        raw = self.memory.get(ip)
+        if raw is not MISSING:
+            self._count("memory_hits")
+        else:
+            shared = self.shared
+            if shared is not None:
+                try:
+                    raw = shared.get(self.key_prefix + ip, MISSING)
+                except Exception as e:
+                    print(
+                        "Failed to read geoip result for %s from shared cache: %s"
+                        % (ip, e)
+                    )
+            if raw is MISSING:
+                self._count("misses")
+                return MISSING
+            self._count("shared_hits")
+            # The shared tier doesn't tell us how long the entry has left, so
+            # keep it locally for the shortest time it could still be valid.
+            self.memory.set(ip, raw, self.negative_ttl)
+        if not raw:
+            self._count("negative_hits")
+        return raw
+
+    def set(self, ip, raw):
+        ttl = self.ttl if raw else self.negative_ttl
+        self.memory.set(ip, raw, ttl)
+        shared = self.shared
+        if shared is not None:
+            try:
+                shared.set(self.key_prefix + ip, raw, ttl)
+            except Exception as e:
+                print(
+                    "Failed to store geoip result for %s in shared cache: %s" % (ip, e)
+                )
+        self._count("stores")
+
+    def delete(self, ip):
+        self.memory.delete(ip)
+        shared = self.shared
+        if shared is not None:
+            try:
+                shared.delete(self.key_prefix + ip)
+            except Exception as e:
+                print(
+                    "Failed to remove geoip result for %s from shared cache: %s"
+                    % (ip, e)
+                )
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["size"] = len(self.memory)
+        stats["evictions"] = self.memory.evictions
+        lookups = stats["memory_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,150 @@
+"""
+Grid based spatial index for models with a latitude/longitude pair.
+
+Every indexed row stores the id of the fixed-size lat/lng cell it falls in
+(its ``geo_cell`` column). Proximity queries first narrow the candidates down
+to the handful of cells that cover the search radius using the database index
+on that column, then let the database order what is left by distance, so only
+the rows that are actually returned get loaded into Python.
+"""
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Cast, Least
+
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320  # At the equator
+
+CELL_SIZE = 1.0  # degrees, roughly 111km north to south
+LAT_CELLS = int(180 / CELL_SIZE)
+LNG_CELLS = int(360 / CELL_SIZE)
+MAX_QUERY_CELLS = 500  # Above this, scanning by distance is cheaper than IN (...)
+MAX_RING_DISTANCE = 2000  # km, after which nearest() searches everything
+
+
+def _lat_row(latitude):
+    return min(max(int(math.floor((latitude + 90) / CELL_SIZE)), 0), LAT_CELLS - 1)
+
+
+def _lng_col(longitude):
+    return int(math.floor((longitude + 180) / CELL_SIZE)) % LNG_CELLS
+
+
+def get_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return _lat_row(float(latitude)) * LNG_CELLS + _lng_col(float(longitude))
+
+
+def get_bounding_box(center, radius):
+    """
+    Returns the (minlat, maxlat, minlng, maxlng) box around ``center`` that
+    contains everything within ``radius`` km of it, also used by
+    ``events.location``. The longitudes may run past -180 or 180.
+    """
+    lat_delta = radius / KM_PER_DEGREE_LAT
+    lng_scale = KM_PER_DEGREE_LNG * math.cos(math.radians(center[0]))
+    if lng_scale > 0:
+        lng_delta = min(radius / lng_scale, 180)
+    else:
+        lng_delta = 180
+    return (
+        center[0] - lat_delta,
+        center[0] + lat_delta,
+        center[1] - lng_delta,
+        center[1] + lng_delta,
+    )
+
+
+def _lng_ranges(minlng, maxlng):
+    """
+    Splits a longitude range that crosses the antimeridian into the parts on
+    either side of it, each within -180 to 180.
+    """
+    if maxlng - minlng >= 360:
+        return [(-180, 180)]
+    width = maxlng - minlng
+    minlng = (minlng + 180) % 360 - 180
+    maxlng = minlng + width
+    if maxlng > 180:
+        return [(minlng, 180), (-180, maxlng - 360)]
+    return [(minlng, maxlng)]
+
+
+def get_cells(minlat, maxlat, minlng, maxlng):
+    """
+    Returns the ids of every cell that overlaps the given bounding box,
+    or None if the box is so large that filtering by cell is pointless.
+    """
+    rows = range(_lat_row(max(minlat, -90)), _lat_row(min(maxlat, 90)) + 1)
+    cols = set()
+    for west, east in _lng_ranges(minlng, maxlng):
+        last_col = min(int(math.floor((east + 180) / CELL_SIZE)), LNG_CELLS - 1)
+        cols.update(range(_lng_col(west), last_col + 1))
+    if len(rows) * len(cols) > MAX_QUERY_CELLS:
+        return None
+    return [row * LNG_CELLS + col for row in rows for col in cols]
+
+
+def distance_expression(ll, prefix=""):
+    """
+    Squared equirectangular distance in km from ``ll``, the same approximation
+    used by ``events.location.distance``, expressed as a database expression.
+    """
+    latitude = Cast(F(prefix + "latitude"), FloatField())
+    longitude = Cast(F(prefix + "longitude"), FloatField())
+    lng_scale = KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0]))
+    dlat = (latitude - Value(float(ll[0]))) * Value(KM_PER_DEGREE_LAT)
+    # The short way around, for points on the other side of the antimeridian
+    dlng = Abs(longitude - Value(float(ll[1])))
+    dlng = Least(dlng, Value(360.0) - dlng) * Value(lng_scale)
+    return dlat * dlat + dlng * dlng
+
+
+def within(queryset, ll, radius, prefix=""):
+    """
+    Filters a queryset down to rows within ``radius`` km of ``ll``, ordered
+    nearest first. ``prefix`` points at a related model holding the location,
+    for example ``"city__"`` for Teams.
+    """
+    cells = get_cells(*get_bounding_box(ll, radius))
+    if cells is not None:
+        queryset = queryset.filter(**{prefix + "geo_cell__in": cells})
+    else:
+        queryset = queryset.filter(**{prefix + "geo_cell__isnull": False})
+    return (
+        queryset.annotate(geo_distance_sq=distance_expression(ll, prefix))
+        .filter(geo_distance_sq__lte=radius * radius)
+        .order_by("geo_distance_sq")
+    )
+
+
+def nearest(queryset, ll, k=None, radius=None, prefix=""):
+    """
+    Returns a list of the ``k`` rows closest to ``ll``, nearest first.
+
+    With a ``radius`` only rows within that many km are considered, and every
+    one of them is returned if ``k`` is None. Without one, the search starts
+    at a single cell and widens until ``k`` rows have been found.
+    """
+    if ll is None or ll[0] is None or ll[1] is None:
+        return []
+    if radius is not None:
+        results = within(queryset, ll, radius, prefix)
+        if k is not None:
+            results = results[:k]
+        return list(results)
+
+    if k is None:
+        raise ValueError("nearest() needs either k or radius")
+    search_radius = CELL_SIZE * KM_PER_DEGREE_LAT
+    while search_radius <= MAX_RING_DISTANCE:
+        results = list(within(queryset, ll, search_radius, prefix)[:k])
+        if len(results) >= k:
+            return results
+        search_radius *= 2
+    return list(
+        queryset.filter(**{prefix + "geo_cell__isnull": False})
+        .annotate(geo_distance_sq=distance_expression(ll, prefix))
+        .order_by("geo_distance_sq")[:k]
+    )
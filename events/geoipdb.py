@@ -0,0 +1,163 @@
+"""
+Offline IP geolocation from a local range database.
+
+The database is a single binary file built from a CSV of IP ranges by the
+``build_geoip_db`` management command. It holds a header, a table of fixed
+size range records sorted by their first address, and a table of the
+location strings those records point at. IPv4 addresses are stored as
+IPv4-mapped IPv6 addresses so both families share one 16 byte key space.
+
+The file is memory-mapped read-only, so every worker process shares the same
+pages and a lookup is a binary search over the records without loading the
+table into Python objects.
+"""
+import ipaddress
+import mmap
+import struct
+import threading
+
+from django.conf import settings
+
+from .ipstack import IPStackResult
+
+MAGIC = b"GTGEOIP\x01"
+HEADER = struct.Struct(">8sII")  # magic, record count, strings offset
+RECORD = struct.Struct(">16s16sddIH")  # first, last, lat, lng, place offset, length
+KEY_SIZE = 16
+PLACE_FIELDS = ("city", "region", "country_name", "country_code")
+IPV4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+
+class GeoIPDatabaseError(Exception):
+    pass
+
+
+def ip_key(ip):
+    address = ipaddress.ip_address(ip)
+    if address.version == 4:
+        return IPV4_MAPPED_PREFIX + address.packed
+    return address.packed
+
+
+def key_ip(key):
+    if key.startswith(IPV4_MAPPED_PREFIX):
+        return ipaddress.IPv4Address(key[len(IPV4_MAPPED_PREFIX) :])
+    return ipaddress.IPv6Address(key)
+
+
+def network_keys(network):
+    network = ipaddress.ip_network(network, strict=False)
+    return ip_key(network[0]), ip_key(network[-1])
+
+
+def write_database(ranges, out_file):
+    """
+    Writes ``ranges``, an iterable of ``(first_key, last_key, latitude,
+    longitude, place)`` tuples where ``place`` is a dict of PLACE_FIELDS, to a
+    binary database file. Overlapping ranges are dropped, keeping the one that
+    starts first. Returns the number of records written.
+    """
+    places = dict()
+    strings = bytearray()
+    records = []
+    for first, last, latitude, longitude, place in sorted(ranges, key=lambda r: r[:2]):
+        if records and first <= records[-1][1]:
+            print(
+                "Skipping range %s-%s, it overlaps the previous one"
+                % (key_ip(first), key_ip(last))
+            )
+            continue
+        encoded = "\t".join(place.get(field) or "" for field in PLACE_FIELDS)
+        encoded = encoded.encode("utf-8")
+        if encoded not in places:
+            places[encoded] = len(strings)
+            strings.extend(encoded)
+        records.append(
+            (first, last, latitude, longitude, places[encoded], len(encoded))
+        )
+
+    strings_offset = HEADER.size + len(records) * RECORD.size
+    out_file.write(HEADER.pack(MAGIC, len(records), strings_offset))
+    for record in records:
+        out_file.write(RECORD.pack(*record))
+    out_file.write(strings)
+    return len(records)
+
+
+class GeoIPDatabase:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as db_file:
+            self._map = mmap.mmap(db_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise GeoIPDatabaseError("%s is not a geoip database" % path)
+        magic, self.count, self.strings_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise GeoIPDatabaseError("%s is not a geoip database" % path)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+
+    def _first_key(self, index):
+        offset = HEADER.size + index * RECORD.size
+        return self._map[offset : offset + KEY_SIZE]
+
+    def lookup(self, ip):
+        """
+        Returns the raw location data for ``ip`` in the same shape ipstack.com
+        uses, or an empty dict if it isn't in any range.
+        """
+        try:
+            key = ip_key(ip)
+        except ValueError:
+            return {}
+        # Find the last range starting at or before the address
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return {}
+        record = RECORD.unpack_from(self._map, HEADER.size + (low - 1) * RECORD.size)
+        first, last, latitude, longitude, place_offset, place_length = record
+        if key > last:
+            return {}
+        start = self.strings_offset + place_offset
+        place = self._map[start : start + place_length].decode("utf-8").split("\t")
+        raw = {"ip": ip, "latitude": latitude, "longitude": longitude}
+        for field, value in zip(PLACE_FIELDS, place):
+            if value:
+                raw[field] = value
+        return raw
+
+
+_DATABASE = None
+_DATABASE_LOCK = threading.Lock()
+
+
+def get_database():
+    global _DATABASE
+    if _DATABASE is None:
+        with _DATABASE_LOCK:
+            if _DATABASE is None:
+                path = getattr(settings, "GEOIP_DATABASE", None)
+                if path is None:
+                    raise GeoIPDatabaseError(
+                        "You must define GEOIP_DATABASE in your settings to use the local geoip database"
+                    )
+                _DATABASE = GeoIPDatabase(path)
+    return _DATABASE
+
+
+def get_geoipdb_geocoder(ip):
+    try:
+        return IPStackResult(get_database().lookup(ip))
+    except (GeoIPDatabaseError, OSError, ValueError) as e:
+        print("Geoip database lookup for %s failed: %s" % (ip, e))
+        return IPStackResult({})
@@ -0,0 +1,144 @@
+"""
+Streaming bulk importer for GeoNames dump files.
+
+Rows are parsed lazily, one line at a time, and compared against the keys
+already in the database, which are loaded into memory once up front. New and
+changed rows are then written with ``bulk_create`` and ``bulk_update`` in
+large batches, each batch in its own transaction, instead of one
+``update_or_create`` per line.
+"""
+import time
+
+from django.db import transaction
+
+BATCH_SIZE = 5000
+PROGRESS_EVERY = 50000  # rows
+
+
+def read_rows(path, columns):
+    """
+    Yields the tab separated fields of every line in a GeoNames file that has
+    exactly ``columns`` of them, skipping comments.
+    """
+    with open(path, "r", encoding="utf-8") as geonames_file:
+        for line in geonames_file:
+            if line.startswith("#"):
+                continue
+            row = line.rstrip("\n").split("\t")
+            if len(row) == columns:
+                yield row
+            else:
+                print("Short line (%s): %s" % (len(row), line.rstrip("\n")))
+
+
+class BulkLoader:
+    """
+    Creates or updates instances of ``model`` identified by ``key_fields``,
+    setting ``update_fields`` from the values passed to ``add()``. Later rows
+    for a key override earlier ones, the same as calling ``update_or_create``
+    for every row would.
+    """
+
+    def __init__(self, model, key_fields, update_fields=(), batch_size=BATCH_SIZE):
+        self.model = model
+        self.key_fields = tuple(key_fields)
+        self.update_fields = tuple(update_fields)
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rows = 0
+        self._to_create = dict()
+        self._to_update = dict()
+        self._started = time.monotonic()
+        self._existing = dict()
+        fields = ("pk",) + self.key_fields + self.update_fields
+        for values in model.objects.order_by().values_list(*fields).iterator():
+            key = values[1 : len(self.key_fields) + 1]
+            self._existing[key] = (values[0], values[len(self.key_fields) + 1 :])
+
+    def add(self, key, **values):
+        self.rows += 1
+        key = tuple(key)
+        current = tuple(values.get(field) for field in self.update_fields)
+        if key in self._to_create:
+            self._set(self._to_create[key], values)
+        elif key in self._existing:
+            pk, stored = self._existing[key]
+            if stored == current:
+                self.unchanged += 1
+            else:
+                instance = self._to_update.get(pk)
+                if instance is None:
+                    instance = self.model(pk=pk, **dict(zip(self.key_fields, key)))
+                    self._to_update[pk] = instance
+                self._set(instance, values)
+                self._existing[key] = (pk, current)
+        else:
+            instance = self.model(**dict(zip(self.key_fields, key)))
+            self._set(instance, values)
+            self._to_create[key] = instance
+
+        if len(self._to_create) + len(self._to_update) >= self.batch_size:
+            self.flush()
+        if self.rows % PROGRESS_EVERY == 0:
+            self.report()
+
+    def _set(self, instance, values):
+        for field, value in values.items():
+            setattr(instance, field, value)
+
+    def flush(self):
+        with transaction.atomic():
+            if self._to_create:
+                self.model.objects.bulk_create(
+                    self._to_create.values(), batch_size=self.batch_size
+                )
+                self._fetch_created_pks()
+            if self._to_update:
+                self.model.objects.bulk_update(
+                    self._to_update.values(),
+                    self.update_fields,
+                    batch_size=self.batch_size,
+                )
+        for key, instance in self._to_create.items():
+            self._existing[key] = (
+                instance.pk,
+                tuple(getattr(instance, field) for field in self.update_fields),
+            )
+        self.created += len(self._to_create)
+        self.updated += len(self._to_update)
+        self._to_create = dict()
+        self._to_update = dict()
+
+    def _fetch_created_pks(self):
+        """
+        Looks up the primary keys that ``bulk_create`` didn't set, which it
+        doesn't on every database, so that a later row for one of these keys
+        updates it instead of being lost.
+        """
+        missing = set(
+            key for key, instance in self._to_create.items() if instance.pk is None
+        )
+        if not missing:
+            return
+        lookup = {"%s__in" % self.key_fields[0]: set(key[0] for key in missing)}
+        for values in (
+            self.model.objects.filter(**lookup)
+            .order_by()
+            .values_list("pk", *self.key_fields)
+        ):
+            if values[1:] in missing:
+                self._to_create[values[1:]].pk = values[0]
+
+    def report(self):
+        elapsed = time.monotonic() - self._started
+        rate = self.rows / elapsed if elapsed > 0 else 0
+        print(
+            "%s rows, %s created, %s updated, %s unchanged (%d rows/sec)"
+            % (self.rows, self.created, self.updated, self.unchanged, rate)
+        )
+
+    def finish(self):
+        self.flush()
+        self.report()
@@ -1,13 +1,19 @@
-from collections import OrderedDict
-
 from django.conf import settings
 
 import requests
 from geocoder.base import MultipleResultsQuery, OneResult
 
+from .geocache import GeoIPCache
+from .utils import MISSING
+
 IPSTACK_URL = "http://api.ipstack.com/{0}?access_key={1}&format=json&legacy=1"
-RESULT_CACHE = OrderedDict()
-CACHE_SIZE = getattr(settings, "IPSTACK_CACHE_SIZE", 1000)
+IPSTACK_TIMEOUT = getattr(settings, "IPSTACK_TIMEOUT", 2)  # seconds
+RESULT_CACHE = GeoIPCache(
+    size=getattr(settings, "IPSTACK_CACHE_SIZE", 1000),
+    ttl=getattr(settings, "GEOIP_CACHE_TTL", 60 * 60 * 24),
+    negative_ttl=getattr(settings, "GEOIP_NEGATIVE_CACHE_TTL", 60 * 10),
+    cache_alias=getattr(settings, "GEOIP_CACHE_ALIAS", "default"),
+)
 
 
 class IPStackResult(OneResult):
@@ -102,8 +108,9 @@ class IPStackResult(OneResult):
 
 
 def get_ipstack_geocoder(ip):
-    if ip in RESULT_CACHE:
-        return RESULT_CACHE[ip]
+    raw = RESULT_CACHE.get(ip)
+    if raw is not MISSING:
+        return IPStackResult(raw)
     ipstack_key = getattr(settings, "IPSTACK_ACCESS_KEY", None)
     if ipstack_key is None:
         print(
@@ -112,14 +119,19 @@ def get_ipstack_geocoder(ip):
         return IPStackResult({})
     call_url = IPSTACK_URL.format(ip, ipstack_key)
 
-    response = requests.get(call_url)
-
-    if response.status_code != 200:
-        raise Exception(
-            "Call to ipstack.com returned status code {0}".format(response.status_code)
-        )
-    result = IPStackResult(response.json())
-    RESULT_CACHE[ip] = result
-    if len(RESULT_CACHE) > CACHE_SIZE:
-        RESULT_CACHE.popitem(last=False)  # Discard the oldest entry
+    try:
+        response = requests.get(call_url, timeout=IPSTACK_TIMEOUT)
+        if response.status_code != 200:
+            raise Exception(
+                "Call to ipstack.com returned status code {0}".format(
+                    response.status_code
+                )
+            )
+        result = IPStackResult(response.json())
+    except Exception as e:
+        print("Geoip lookup for %s failed: %s" % (ip, e))
+        result = IPStackResult({})
+
+    # Only cache what we need, and an empty dict if the lookup failed
+    RESULT_CACHE.set(ip, result.raw if result.ok else {})
     return result
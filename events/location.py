@@ -6,11 +6,12 @@ from django.utils import timezone
 import geocoder
 import pytz
 
+from . import geoindex
+from .geoindex import KM_PER_DEGREE_LAT, KM_PER_DEGREE_LNG, get_bounding_box
+from .geoipdb import get_geoipdb_geocoder
 from .ipstack import get_ipstack_geocoder
 from .models.locale import City
 
-KM_PER_DEGREE_LAT = 110.574
-KM_PER_DEGREE_LNG = 111.320  # At the equator
 DEFAULT_NEAR_DISTANCE = 100  # kilometeres
 
 
@@ -38,28 +39,20 @@ def get_geoip(request):
         else:
             raise Exception("Client is localhost")
 
-    g = get_ipstack_geocoder(client_ip)
+    if getattr(settings, "GEOIP_PROVIDER", "ipstack") == "database":
+        g = get_geoipdb_geocoder(client_ip)
+    else:
+        g = get_ipstack_geocoder(client_ip)
     return g
 
 
-def get_bounding_box(center, radius):
-    minlat = center[0] - (radius / KM_PER_DEGREE_LAT)
-    maxlat = center[0] + (radius / KM_PER_DEGREE_LAT)
-    minlng = center[1] - (
-        radius / (KM_PER_DEGREE_LNG * math.cos(math.radians(center[0])))
-    )
-    maxlng = center[1] + (
-        radius / (KM_PER_DEGREE_LNG * math.cos(math.radians(center[0])))
-    )
-    return (minlat, maxlat, minlng, maxlng)
-
-
 def distance(center1, center2):
     avglat = (center2[0] + center1[0]) / 2
     dlat = (center2[0] - center1[0]) * KM_PER_DEGREE_LAT
-    dlng = (center2[1] - center1[1]) * (
-        KM_PER_DEGREE_LNG * math.cos(math.radians(avglat))
-    )
+    dlng = abs(center2[1] - center1[1])
+    if dlng > 180:
+        dlng = 360 - dlng
+    dlng = dlng * (KM_PER_DEGREE_LNG * math.cos(math.radians(avglat)))
     dkm = math.sqrt((dlat * dlat) + (dlng * dlng))
     return dkm
 
@@ -109,27 +102,8 @@ def searchable_distance_from(ll, searchable):
 def get_nearest_city(ll, max_distance=100):
     if ll is None:
         return None
-    city = None
-    city_distance = 1  # km
-    while city is None and city_distance <= max_distance:
-        minlat = ll[0] - (city_distance / KM_PER_DEGREE_LAT)
-        maxlat = ll[0] + (city_distance / KM_PER_DEGREE_LAT)
-        minlng = ll[1] - (
-            city_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
-        )
-        maxlng = ll[1] + (
-            city_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
-        )
-        nearby_cities = City.objects.filter(
-            latitude__gte=minlat,
-            latitude__lte=maxlat,
-            longitude__gte=minlng,
-            longitude__lte=maxlng,
-        )
-        if len(nearby_cities) == 0:
-            city_distance += 1
-        else:
-            return sorted(nearby_cities, key=lambda city: city_distance_from(ll, city))[
-                0
-            ]
-    return city
+    cities = City.objects.select_related("spr__country")
+    nearby_cities = geoindex.nearest(cities, ll, k=1, radius=max_distance)
+    if nearby_cities:
+        return nearby_cities[0]
+    return None
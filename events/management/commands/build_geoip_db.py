@@ -0,0 +1,41 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.geoipdb import PLACE_FIELDS, ip_key, network_keys, write_database
+
+
+class Command(BaseCommand):
+    help = "Builds the local geoip database from a CSV file of IP ranges"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file",
+            type=str,
+            help="CSV file with a header row and either a 'network' (CIDR) column or 'first_ip' and 'last_ip' columns, plus 'latitude', 'longitude' and optionally %s"
+            % ", ".join(PLACE_FIELDS),
+        )
+        parser.add_argument("output", type=str, help="Database file to write")
+
+    def read_ranges(self, csv_file):
+        for row in csv.DictReader(csv_file):
+            try:
+                if row.get("network"):
+                    first, last = network_keys(row["network"])
+                else:
+                    first, last = ip_key(row["first_ip"]), ip_key(row["last_ip"])
+                latitude = float(row["latitude"])
+                longitude = float(row["longitude"])
+            except (KeyError, TypeError, ValueError) as e:
+                print("Skipping row %s: %s" % (row, e))
+                continue
+            yield first, last, latitude, longitude, row
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["file"], "r", newline="") as csv_file:
+                with open(options["output"], "wb") as out_file:
+                    count = write_database(self.read_ranges(csv_file), out_file)
+        except OSError as e:
+            raise CommandError(e)
+        print("Wrote %s ranges to %s" % (count, options["output"]))
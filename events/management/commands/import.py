@@ -1,11 +1,8 @@
-import datetime
-import urllib
-
 from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from rest_framework.parsers import JSONParser
-
-from events.models.search import Searchable, SearchableSerializer
+from events.federation import sync_searchables
 
 
 class Command(BaseCommand):
@@ -13,17 +10,36 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("url", type=str)
+        parser.add_argument(
+            "--since",
+            dest="since",
+            type=str,
+            default=None,
+            help="Only import records changed after this time (ISO 8601)",
+        )
+        parser.add_argument(
+            "--incremental",
+            dest="incremental",
+            action="store_true",
+            default=False,
+            help="Only import records changed since the last import from this node",
+        )
 
     def handle(self, *args, **options):
         if "url" in options:
-            resp = urllib.request.urlopen(options["url"])
-            json_data = JSONParser().parse(resp)
-            for record in json_data:
-                record["federation_node"] = options["url"]
-                record["federation_time"] = datetime.datetime.now()
-                Searchable.objects.update_or_create(
-                    defaults=record, event_uri=record["event_uri"]
-                )
-
+            since = None
+            if options.get("since"):
+                since = parse_datetime(options["since"])
+                if since is None:
+                    raise CommandError("Invalid --since time: %s" % options["since"])
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since, timezone.utc)
+            created, updated, deleted = sync_searchables(
+                options["url"], since=since, incremental=options["incremental"]
+            )
+            print(
+                "Created %s, updated %s and deleted %s searchables from %s"
+                % (created, updated, deleted, options["url"])
+            )
         else:
             print("No URL in options!")
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 
-from events.models.locale import SPR, City, Country
+from events import geoindex
+from events.geonames import BulkLoader, read_rows
+from events.models.locale import SPR, City
 
 # Fields from geoname table, from http://download.geonames.org/export/dump/readme.txt
 GEONAMEID = 0
@@ -23,9 +25,6 @@ DIGITAL_ELEVATION = 16
 TIMEZONE = 17
 MODIFICATION_DATE = 18
 
-COUNTRY_CACHE = dict()
-SPR_CACHE = dict()
-
 
 class Command(BaseCommand):
     help = "Loads city data from GeoNames database file"
@@ -35,39 +34,37 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         if "file" in options:
-            # Preload country cache
-            for country in Country.objects.all():
-                COUNTRY_CACHE[country.code] = country
-            for spr in SPR.objects.all():
-                SPR_CACHE["%s.%s" % (spr.country.code, spr.code)] = spr
-            with open(options["file"], "r") as cities_file:
-                for city_line in cities_file.readlines():
-                    city = city_line.split("\t")
-                    if len(city) == 19:
-                        if city[FEATURE_CODE].startswith("PPL"):
-                            country = COUNTRY_CACHE.get(city[COUNTRY_CODE])
-                            spr = SPR_CACHE.get(
-                                "%s.%s" % (city[COUNTRY_CODE], city[ADMIN1])
-                            )
-                            if country is not None and spr is not None:
-                                try:
-                                    City.objects.update_or_create(
-                                        name=city[NAME],
-                                        spr=spr,
-                                        defaults={
-                                            "tz": city[TIMEZONE],
-                                            "population": city[POPULATION],
-                                            "longitude": city[LONGITUDE],
-                                            "latitude": city[LATITUDE],
-                                        },
-                                    )
-                                except Exception as e:
-                                    print(
-                                        "Warning: Failed to load city %s for %s (%s)"
-                                        % (city[NAME], spr, e)
-                                    )
-                    else:
-                        print("Short line (%s): %s" % (len(city), city_line))
-
+            spr_ids = dict()
+            for spr_id, spr_code, country_code in SPR.objects.order_by().values_list(
+                "id", "code", "country__code"
+            ):
+                spr_ids["%s.%s" % (country_code, spr_code)] = spr_id
+            loader = BulkLoader(
+                City,
+                key_fields=("name", "spr_id"),
+                update_fields=("tz", "population", "longitude", "latitude", "geo_cell"),
+            )
+            for city in read_rows(options["file"], 19):
+                if not city[FEATURE_CODE].startswith("PPL"):
+                    continue
+                spr_id = spr_ids.get("%s.%s" % (city[COUNTRY_CODE], city[ADMIN1]))
+                if spr_id is None:
+                    continue
+                try:
+                    latitude = float(city[LATITUDE])
+                    longitude = float(city[LONGITUDE])
+                    population = int(city[POPULATION] or 0)
+                except ValueError as e:
+                    print("Warning: Failed to load city %s (%s)" % (city[NAME], e))
+                    continue
+                loader.add(
+                    (city[NAME], spr_id),
+                    tz=city[TIMEZONE],
+                    population=population,
+                    longitude=longitude,
+                    latitude=latitude,
+                    geo_cell=geoindex.get_cell(latitude, longitude),
+                )
+            loader.finish()
         else:
             print("No File in options!")
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 
+from events.geonames import BulkLoader, read_rows
 from events.models.locale import Country
 
 # Fields from geoname table, from http://download.geonames.org/export/dump/readme.txt
@@ -32,17 +33,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         if "file" in options:
-            with open(options["file"], "r") as countries_file:
-                for country_line in countries_file.readlines():
-                    if country_line.startswith("#"):
-                        continue
-                    country = country_line.split("\t")
-                    if len(country) == 19:
-                        # print("%s - %s" % (country[ISO], country[COUNTRY]))
-                        Country.objects.get_or_create(
-                            name=country[COUNTRY], code=country[ISO]
-                        )
-                    else:
-                        print("Short line (%s): %s" % (len(country), country_line))
+            loader = BulkLoader(Country, key_fields=("name", "code"))
+            for country in read_rows(options["file"], 19):
+                loader.add((country[COUNTRY], country[ISO]))
+            loader.finish()
         else:
             print("No File in options!")
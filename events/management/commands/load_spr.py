@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import BaseCommand
 
-from events.models.locale import SPR, City, Country
+from events.geonames import BulkLoader, read_rows
+from events.models.locale import SPR, Country
 
 # Fields from geoname table, from http://download.geonames.org/export/dump/readme.txt
 COMBINED_CODE = 0
@@ -8,8 +9,6 @@ NAME = 1
 ASCIINAME = 2
 GEONAMEID = 3
 
-COUNTRY_CACHE = dict()
-
 
 class Command(BaseCommand):
     help = "Loads spr data from GeoNames database file"
@@ -19,23 +18,13 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         if "file" in options:
-            # Preload country cache
-            for country in Country.objects.all():
-                COUNTRY_CACHE[country.code] = country
-            with open(options["file"], "r") as spr_file:
-                for spr_line in spr_file.readlines():
-                    if spr_line.startswith("#"):
-                        continue
-                    spr = spr_line.split("\t")
-                    if len(spr) == 4:
-                        COUNTRY_CODE, SPR_CODE = spr[COMBINED_CODE].split(".")
-                        country = COUNTRY_CACHE.get(COUNTRY_CODE)
-                        if country is not None:
-                            # print("%s - %s, %s" % (SPR_CODE, spr[NAME], country.name))
-                            SPR.objects.get_or_create(
-                                name=spr[NAME], code=SPR_CODE, country=country
-                            )
-                    else:
-                        print("Short line (%s): %s" % (len(spr), spr_line))
+            country_ids = dict(Country.objects.values_list("code", "id"))
+            loader = BulkLoader(SPR, key_fields=("name", "code", "country_id"))
+            for spr in read_rows(options["file"], 4):
+                COUNTRY_CODE, _, SPR_CODE = spr[COMBINED_CODE].partition(".")
+                country_id = country_ids.get(COUNTRY_CODE)
+                if country_id is not None:
+                    loader.add((spr[NAME], SPR_CODE, country_id))
+            loader.finish()
         else:
             print("No File in options!")
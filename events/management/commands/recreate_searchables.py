@@ -1,14 +1,46 @@
 import datetime
-import urllib
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
-from events.models.events import Event, update_event_searchable
+from events.models.events import Event, rebuild_event_searchables
 
 
 class Command(BaseCommand):
     help = "Regenerated Searchable records from this node"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            dest="since",
+            type=str,
+            default=None,
+            help="Only rebuild events created or ending after this date (YYYY-MM-DD)",
+        )
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=1000)
+
     def handle(self, *args, **options):
-        for event in Event.objects.all():
-            update_event_searchable(event)
+        events = Event.objects.all()
+        since = options.get("since")
+        if since:
+            since_time = parse_datetime(since)
+            if since_time is None:
+                since_date = parse_date(since)
+                if since_date is None:
+                    raise CommandError("Invalid --since date: %s" % since)
+                since_time = datetime.datetime.combine(since_date, datetime.time())
+            if timezone.is_naive(since_time):
+                since_time = timezone.make_aware(since_time, timezone.utc)
+            events = events.filter(
+                Q(created_time__gte=since_time) | Q(end_time__gte=since_time)
+            )
+
+        created, updated, deleted = rebuild_event_searchables(
+            events, full=not since, batch_size=options["batch_size"]
+        )
+        print(
+            "Created %s, updated %s and deleted %s searchables"
+            % (created, updated, deleted)
+        )
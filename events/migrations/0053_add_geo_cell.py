@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+from events import geoindex
+
+
+def populate_geo_cells(apps, schema_editor):
+    City = apps.get_model("events", "City")
+    Searchable = apps.get_model("events", "Searchable")
+    for model in (City, Searchable):
+        located = model.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).only("pk", "latitude", "longitude")
+        batch = []
+        for obj in located.iterator():
+            obj.geo_cell = geoindex.get_cell(obj.latitude, obj.longitude)
+            batch.append(obj)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ["geo_cell"])
+                batch = []
+        model.objects.bulk_update(batch, ["geo_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("events", "0052_auto_20200412_2030")]
+
+    operations = [
+        migrations.AddField(
+            model_name="city",
+            name="geo_cell",
+            field=models.IntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="searchable",
+            name="geo_cell",
+            field=models.IntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            populate_geo_cells, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,16 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("events", "0053_add_geo_cell")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="secret_key",
+            field=models.UUIDField(default=uuid.uuid4, editable=True, unique=True),
+        )
+    ]
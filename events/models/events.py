@@ -4,7 +4,6 @@ import re
 
 from django.conf import settings
 from django.contrib.auth.models import Group, User
-from django.contrib.sites.models import Site
 from django.db import models
 from django.shortcuts import reverse
 from django.utils import timezone
@@ -18,6 +17,7 @@ from recurrence.fields import RecurrenceField
 from rest_framework import serializers
 
 from .. import location
+from ..site import full_url
 from ..utils import slugify
 from .locale import *
 from .profiles import *
@@ -212,14 +212,36 @@ class Event(models.Model):
             event_tz = pytz.timezone(self.tz)
             return timezone.make_naive(self.end_time.astimezone(event_tz), event_tz)
 
+    def contactable_attendees(self):
+        """
+        Returns the attendees who have confirmed their email address, with their
+        profiles and users.
+        """
+        return Attendee.objects.filter(
+            event=self, user__user__account__is_email_confirmed=True
+        ).select_related("user", "user__user")
+
+    def invitable_members(self):
+        """
+        Returns the members of the event's team who have confirmed their email
+        address and haven't responded to the event yet, with their profiles and
+        users, in a single query.
+        """
+        return (
+            Member.objects.filter(
+                team_id=self.team_id, user__user__account__is_email_confirmed=True
+            )
+            .exclude(user_id__in=Attendee.objects.filter(event=self).values("user_id"))
+            .select_related("user", "user__user")
+        )
+
     def get_absolute_url(self):
         return reverse(
             "show-event", kwargs={"event_id": self.id, "event_slug": self.slug}
         )
 
     def get_full_url(self):
-        site = Site.objects.get(id=1)
-        return "https://%s%s" % (site.domain, self.get_absolute_url())
+        return full_url(self.get_absolute_url())
 
     @property
     def slug(self):
@@ -566,12 +588,7 @@ class EventSeries(models.Model):
         )
 
     def get_full_url(self):
-        site = Site.objects.get(id=1)
-        if settings.DEBUG:
-            schema = "http"
-        else:
-            schema = "https"
-        return "%s://%s%s" % (schema, site.domain, self.get_absolute_url())
+        return full_url(self.get_absolute_url())
 
     @property
     def slug(self):
@@ -4,6 +4,8 @@ from django.utils.translation import ugettext_lazy as _
 import pytz
 from rest_framework import serializers
 
+from .. import geoindex
+
 
 class Language(models.Model):
     class Meta:
@@ -107,6 +109,7 @@ class City(models.Model):
     population = models.IntegerField(
         help_text=_("Population"), null=False, blank=False, default=0
     )
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
 
     @property
     def short_name(self):
@@ -118,6 +121,10 @@ class City(models.Model):
     def __str__(self):
         return u"%s, %s, %s" % (self.name, self.spr.name, self.spr.country.name)
 
+    def save(self, *args, **kwargs):
+        self.geo_cell = geoindex.get_cell(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
     @property
     def slug(self):
         if self.name is not None:
@@ -7,6 +7,8 @@ from django.contrib.auth.models import AnonymousUser, Group, User
 from django.contrib.sites.models import Site
 from django.templatetags.static import static
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -17,11 +19,17 @@ from imagekit.processors import Adjust, ColorOverlay, ResizeToFill, ResizeToFit
 from rest_framework import serializers
 
 from .. import location
+from ..site import full_url
 from ..utils import slugify
 from .locale import *
 from .search import delete_event_searchable, update_event_searchable
 
 
+# Bumped whenever a Member is saved or deleted, so that team roles cached by
+# UserProfile.team_roles are reloaded after a change
+_membership_generation = 0
+
+
 class UserProfile(models.Model):
     " Store profile information about a user "
 
@@ -63,7 +71,7 @@ class UserProfile(models.Model):
     )
     do_not_track = models.BooleanField(verbose_name=_("Do not track"), default=False)
 
-    secret_key = models.UUIDField(default=uuid.uuid4, editable=True)
+    secret_key = models.UUIDField(default=uuid.uuid4, editable=True, unique=True)
 
     categories = models.ManyToManyField("Category", blank=True)
     topics = models.ManyToManyField("Topic", blank=True)
@@ -79,6 +87,27 @@ class UserProfile(models.Model):
         except:
             return _("Unknown Profile")
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Whatever was saved last is what request.user.profile returns
+        user = UserProfile.user.field.get_cached_value(self, default=None)
+        if user is not None:
+            user._profile_cache = self
+
+    def delete(self, *args, **kwargs):
+        user = UserProfile.user.field.get_cached_value(self, default=None)
+        if user is not None:
+            user.__dict__.pop("_profile_cache", None)
+        return super().delete(*args, **kwargs)
+
+    def rotate_secret_key(self):
+        """
+        Replaces the key in the profile's calendar feed URLs, so the old URLs
+        stop working (see ``events.feed_tokens``).
+        """
+        self.secret_key = uuid.uuid4()
+        self.save(update_fields=["secret_key"])
+
     @property
     def personal_team(self):
         teams = Team.objects.filter(access=Team.PERSONAL, owner_profile=self)
@@ -177,6 +206,33 @@ class UserProfile(models.Model):
             ).order_by("team__name")
         ]
 
+    @property
+    def team_roles(self):
+        """
+        Maps the id of every team this profile is a member of to its role.
+        Loaded with a single query, and kept on the request's User object so
+        that every permission check made while handling it can share it.
+        """
+        holder = UserProfile.user.field.get_cached_value(self, default=None) or self
+        cached = getattr(holder, "_team_roles", None)
+        if cached is None or cached[0] != _membership_generation:
+            roles = dict()
+            if self.id is not None:
+                members = Member.objects.filter(user_id=self.id)
+                roles = dict(members.values_list("team_id", "role"))
+            cached = (_membership_generation, roles)
+            holder._team_roles = cached
+        return cached[1]
+
+    def is_moderator_of(self, team):
+        return self.team_roles.get(team.id) in (Member.ADMIN, Member.MODERATOR)
+
+    def is_admin_of(self, team):
+        return self.team_roles.get(team.id) == Member.ADMIN
+
+    def is_profile(self, profile_id):
+        return self.id is not None and profile_id == self.id
+
     def can_create_event(self, team):
         try:
             if self.user.is_superuser:
@@ -185,9 +241,9 @@ class UserProfile(models.Model):
             return False
         if not self.user_id:
             return False
-        if team.owner_profile == self:
+        if self.is_profile(team.owner_profile_id):
             return True
-        if self in team.moderators:
+        if self.is_moderator_of(team):
             return True
         return False
 
@@ -197,11 +253,11 @@ class UserProfile(models.Model):
                 return True
         except:
             return False
-        if series.created_by == self:
+        if self.is_profile(series.created_by_id):
             return True
-        if series.team.owner_profile == self:
+        if self.is_profile(series.team.owner_profile_id):
             return True
-        if self in series.team.moderators:
+        if self.is_moderator_of(series.team):
             return True
         return False
 
@@ -211,11 +267,11 @@ class UserProfile(models.Model):
                 return True
         except:
             return False
-        if event.created_by == self:
+        if self.is_profile(event.created_by_id):
             return True
-        if event.team.owner_profile == self:
+        if self.is_profile(event.team.owner_profile_id):
             return True
-        if self in event.team.moderators:
+        if self.is_moderator_of(event.team):
             return True
         return False
 
@@ -227,7 +283,7 @@ class UserProfile(models.Model):
             return False
         if not self.user_id:
             return False
-        if org.owner_profile == self:
+        if self.is_profile(org.owner_profile_id):
             return True
         return False
 
@@ -239,7 +295,7 @@ class UserProfile(models.Model):
             return False
         if not self.user_id:
             return False
-        if org.owner_profile == self:
+        if self.is_profile(org.owner_profile_id):
             return True
         return False
 
@@ -249,16 +305,16 @@ class UserProfile(models.Model):
                 return True
         except:
             return False
-        if team.owner_profile == self:
+        if self.is_profile(team.owner_profile_id):
             return True
-        if self in team.administrators:
+        if self.is_admin_of(team):
             return True
         return False
 
     def is_in_team(self, team):
         if self.can_edit_team(team):
             return True
-        return Member.objects.filter(team=team, user=self).count() > 0
+        return team.id in self.team_roles
 
 
 def get_user_timezone(username):
@@ -269,8 +325,12 @@ def get_user_timezone(username):
 def _getUserProfile(self):
     if not self.is_authenticated:
         return UserProfile()
+    if "_profile_cache" in self.__dict__:
+        return self._profile_cache
 
     profile, created = UserProfile.objects.get_or_create(user=self)
+    profile.user = self  # Shares per-request caches, like team_roles, with the User
+    self._profile_cache = profile
 
     if created:
         profile.tz = get_user_timezone(self.username)
@@ -531,11 +591,7 @@ class Team(models.Model):
 
     @property
     def full_img_url(self):
-        if self.card_img_url.startswith("http"):
-            return self.card_img_url
-        else:
-            site = Site.objects.get(id=1)
-            return "https://%s%s" % (site.domain, self.card_img_url)
+        return full_url(self.card_img_url)
 
     @property
     def location_name(self):
@@ -580,8 +636,7 @@ class Team(models.Model):
         return reverse("show-team", kwargs={"team_id": self.id})
 
     def get_full_url(self):
-        site = Site.objects.get(id=1)
-        return "https://%s%s" % (site.domain, self.get_absolute_url())
+        return full_url(self.get_absolute_url())
 
     def __str__(self):
         return u"%s" % (self.name)
@@ -693,6 +748,13 @@ class Member(models.Model):
         return "%s in %s" % (self.user, self.team)
 
 
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_team_roles(sender, **kwargs):
+    global _membership_generation
+    _membership_generation += 1
+
+
 class Category(models.Model):
     name = models.CharField(max_length=256)
     description = models.TextField()
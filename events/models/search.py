@@ -1,9 +1,9 @@
 import datetime
+import decimal
 import hashlib
 
 from django.conf import settings
-from django.contrib.sites.models import Site
-from django.db import models
+from django.db import models, transaction
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -11,7 +11,8 @@ from django.utils.translation import ugettext_lazy as _
 import pytz
 from rest_framework import serializers
 
-from .. import location
+from .. import geoindex, location
+from ..site import get_domain, get_scheme
 
 
 # Provides a searchable index of events that may belong to this site or a federated site
@@ -31,6 +32,7 @@ class Searchable(models.Model):
     latitude = models.DecimalField(
         max_digits=12, decimal_places=8, null=True, blank=True
     )
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     tz = models.CharField(
@@ -52,6 +54,10 @@ class Searchable(models.Model):
     def __str__(self):
         return u"%s" % (self.event_url)
 
+    def save(self, *args, **kwargs):
+        self.geo_cell = geoindex.get_cell(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
     @property
     def local_start_time(self, val=None):
         if val is not None:
@@ -94,43 +100,55 @@ class SearchableSerializer(serializers.ModelSerializer):
         )
 
 
-def update_event_searchable(event):
-    site = Site.objects.get(id=1)
-    if settings.DEBUG:
-        schema = "http"
-    else:
-        schema = "https"
+def serialize_searchables(searchables):
+    """
+    Returns the same data as SearchableSerializer(searchables, many=True), but
+    reads plain values from the database instead of model instances and skips
+    DRF's per-field overhead.
+    """
+    fields = SearchableSerializer.Meta.fields
+    current_tz = timezone.get_current_timezone()
+    data = []
+    for values in searchables.values_list(*fields):
+        record = dict(zip(fields, values))
+        for name in ("start_time", "end_time"):
+            value = record[name].astimezone(current_tz).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            record[name] = value
+        for name in ("longitude", "latitude"):
+            if record[name] is not None:
+                places = Searchable._meta.get_field(name).decimal_places
+                value = record[name].quantize(decimal.Decimal(1).scaleb(-places))
+                record[name] = "{:f}".format(value)
+        data.append(record)
+    return data
 
-    event_url = "%s://%s%s" % (schema, site.domain, event.get_absolute_url())
-    origin_url = "%s://%s%s" % (schema, site.domain, reverse("searchables"))
 
+def get_searchable_origin():
+    schema, domain = get_scheme(), get_domain()
+    origin_url = "%s://%s%s" % (schema, domain, reverse("searchables"))
+    return schema, domain, origin_url
+
+
+def get_event_uri(event_url):
     md5 = hashlib.md5()
     federation_url = event_url.split("/")
     federation_node = "/".join(federation_url[:3])
     federation_id = "/".join(federation_url[:5])
     md5.update(bytes(federation_id, "utf8"))
-    event_uri = federation_node + "/" + md5.hexdigest()
+    return federation_node + "/" + md5.hexdigest()
 
-    try:
-        searchable = Searchable.objects.get(event_uri=event_uri)
-    except:
-        searchable = Searchable(event_uri)
-        searchable.origin_node = origin_url
-        searchable.federation_node = origin_url
-        searchable.federation_time = timezone.now()
 
-    searchable.event_url = event_url
+def fill_event_searchable(searchable, event, schema, domain):
+    searchable.event_url = "%s://%s%s" % (schema, domain, event.get_absolute_url())
 
     if event.team.card_img_url.startswith(
         "http:"
     ) or event.team.card_img_url.startswith("https:"):
         searchable.img_url = event.team.card_img_url
     else:
-        searchable.img_url = "%s://%s%s" % (
-            schema,
-            site.domain,
-            event.team.card_img_url,
-        )
+        searchable.img_url = "%s://%s%s" % (schema, domain, event.team.card_img_url)
 
     searchable.event_title = event.name
     searchable.group_name = event.team.name
@@ -156,28 +174,161 @@ def update_event_searchable(event):
     ):
         searchable.longitude = event.team.city.longitude
         searchable.latitude = event.team.city.latitude
+    searchable.geo_cell = geoindex.get_cell(searchable.latitude, searchable.longitude)
+
+
+def update_event_searchable(event):
+    schema, domain, origin_url = get_searchable_origin()
+    event_url = "%s://%s%s" % (schema, domain, event.get_absolute_url())
+    event_uri = get_event_uri(event_url)
+
+    try:
+        searchable = Searchable.objects.get(event_uri=event_uri)
+    except:
+        searchable = Searchable(event_uri)
+        searchable.origin_node = origin_url
+        searchable.federation_node = origin_url
+        searchable.federation_time = timezone.now()
 
+    fill_event_searchable(searchable, event, schema, domain)
+    searchable.federation_time = timezone.now()
     searchable.save()
 
 
 def delete_event_searchable(event):
-    site = Site.objects.get(id=1)
-    if settings.DEBUG:
-        schema = "http"
-    else:
-        schema = "https"
-    event_url = "%s://%s%s" % (schema, site.domain, event.get_absolute_url())
-    origin_url = "%s://%s%s" % (schema, site.domain, reverse("searchables"))
-
-    md5 = hashlib.md5()
-    federation_url = event_url.split("/")
-    federation_node = "/".join(federation_url[:3])
-    federation_id = "/".join(federation_url[:5])
-    md5.update(bytes(federation_id, "utf8"))
-    event_uri = federation_node + "/" + md5.hexdigest()
+    schema, domain, origin_url = get_searchable_origin()
+    event_url = "%s://%s%s" % (schema, domain, event.get_absolute_url())
+    event_uri = get_event_uri(event_url)
 
     try:
         searchable = Searchable.objects.get(event_uri=event_uri)
         searchable.delete()
     except:
         pass
+
+
+SEARCHABLE_UPDATE_FIELDS = (
+    "event_url",
+    "event_title",
+    "img_url",
+    "location_name",
+    "group_name",
+    "venue_name",
+    "longitude",
+    "latitude",
+    "geo_cell",
+    "start_time",
+    "end_time",
+    "tz",
+    "cost",
+    "tags",
+)
+
+
+def get_searchable_values(searchable, fields):
+    """
+    Converts ``fields`` of an unsaved Searchable to the types the database
+    hands back, so they can be compared with a stored row.
+    """
+    values = []
+    for name in fields:
+        field = Searchable._meta.get_field(name)
+        value = field.to_python(getattr(searchable, name))
+        if isinstance(value, decimal.Decimal):
+            value = value.quantize(decimal.Decimal(1).scaleb(-field.decimal_places))
+        setattr(searchable, name, value)
+        values.append(value)
+    return tuple(values)
+
+
+def save_searchables(batch, update_fields, batch_size=1000):
+    """
+    Creates or updates a dict of unsaved Searchables keyed by event_uri, in one
+    transaction. Existing rows are only written, and their federation_time
+    bumped, if one of ``update_fields`` changed. Returns the number of
+    (created, updated) records.
+    """
+    existing = Searchable.objects.in_bulk(list(batch))
+    new = []
+    changed = []
+    for event_uri, searchable in batch.items():
+        current = existing.get(event_uri)
+        if current is None:
+            get_searchable_values(searchable, update_fields)
+            searchable.federation_time = timezone.now()
+            new.append(searchable)
+        elif get_searchable_values(searchable, update_fields) != tuple(
+            getattr(current, name) for name in update_fields
+        ):
+            searchable.federation_time = timezone.now()
+            changed.append(searchable)
+    with transaction.atomic():
+        Searchable.objects.bulk_create(new, batch_size=batch_size)
+        Searchable.objects.bulk_update(
+            changed, update_fields + ("federation_time",), batch_size=batch_size
+        )
+    return len(new), len(changed)
+
+
+def delete_searchables(event_uris, batch_size=1000):
+    event_uris = list(event_uris)
+    deleted = 0
+    for start in range(0, len(event_uris), batch_size):
+        deleted += Searchable.objects.filter(
+            event_uri__in=event_uris[start : start + batch_size]
+        ).delete()[0]
+    return deleted
+
+
+def rebuild_event_searchables(events, full=True, batch_size=1000):
+    """
+    Recreates the Searchable records for a queryset of local events, in
+    batches, skipping the ones that Event.save() wouldn't index. With ``full``
+    the queryset is taken to be every event on this node, and searchables
+    from this node that no longer match any of them are deleted too.
+    Returns the number of (created, updated, deleted) records.
+    """
+    schema, domain, origin_url = get_searchable_origin()
+    created = updated = 0
+    indexed = set()
+    skipped = set()
+
+    events = events.select_related(
+        "team__city__spr__country",
+        "team__spr__country",
+        "team__country",
+        "team__organization",
+        "team__category",
+        "place__city__spr__country",
+    )
+    batch = dict()
+    for event in events.iterator(chunk_size=batch_size):
+        event_url = "%s://%s%s" % (schema, domain, event.get_absolute_url())
+        event_uri = get_event_uri(event_url)
+        if event.team.access == event.team.PRIVATE or event.status <= event.CANCELED:
+            skipped.add(event_uri)
+            continue
+        searchable = Searchable(
+            event_uri=event_uri,
+            origin_node=origin_url,
+            federation_node=origin_url,
+            federation_time=timezone.now(),
+        )
+        fill_event_searchable(searchable, event, schema, domain)
+        batch[event_uri] = searchable
+        indexed.add(event_uri)
+        if len(batch) >= batch_size:
+            counts = save_searchables(batch, SEARCHABLE_UPDATE_FIELDS, batch_size)
+            created, updated = created + counts[0], updated + counts[1]
+            batch = dict()
+    if batch:
+        counts = save_searchables(batch, SEARCHABLE_UPDATE_FIELDS, batch_size)
+        created, updated = created + counts[0], updated + counts[1]
+
+    if full:
+        local = Searchable.objects.filter(origin_node=origin_url)
+        stale = set(local.values_list("event_uri", flat=True)) - indexed
+    else:
+        stale = skipped - indexed
+    deleted = delete_searchables(stale, batch_size)
+    return created, updated, deleted
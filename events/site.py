@@ -0,0 +1,31 @@
+"""
+The scheme and domain of this site, for building the full URLs used in emails,
+calendar feeds and federation.
+
+The ``Site`` is looked up once per process with ``Site.objects.get_current()``,
+which Django caches and clears whenever a ``Site`` is saved or deleted, so
+building a URL doesn't query the database.
+"""
+from django.conf import settings
+from django.contrib.sites.models import Site
+
+
+def get_site():
+    return Site.objects.get_current()
+
+
+def get_scheme():
+    return "http" if settings.DEBUG else "https"
+
+
+def get_domain():
+    return get_site().domain
+
+
+def full_url(path):
+    """
+    Returns ``path`` as a full URL on this site, unless it already is one.
+    """
+    if path.startswith("http:") or path.startswith("https:"):
+        return path
+    return "%s://%s%s" % (get_scheme(), get_domain(), path)
@@ -1,6 +1,15 @@
 from django.test import TestCase
 
+from .activity_pub import *
 from .federation import *
+from .feed_tokens import *
+from .feeds import *
+from .geocache import *
+from .geoindex import *
+from .geoipdb import *
+from .geonames import *
+from .profiles import *
+from .site import *
 
 
 # Create your tests here.
@@ -0,0 +1,111 @@
+import datetime
+import json
+
+from django.contrib.sites.models import Site
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from ..models.events import Event, Place
+from ..models.profiles import Team
+
+
+class ActivityPubEventsTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = mommy.make(Team, access=Team.PUBLIC)
+        self.place = mommy.make(Place, latitude=1.5, longitude=-2.25)
+        start = timezone.now() + datetime.timedelta(days=1)
+        self.events = [
+            mommy.make(
+                Event,
+                team=self.team,
+                place=self.place,
+                start_time=start + datetime.timedelta(hours=i),
+                end_time=start + datetime.timedelta(hours=i + 1),
+            )
+            for i in range(5)
+        ]
+        mommy.make(
+            Event,
+            team=mommy.make(Team, access=Team.PRIVATE),
+            start_time=start,
+            end_time=start + datetime.timedelta(hours=1),
+        )
+        mommy.make(
+            Event,
+            team=self.team,
+            start_time=start - datetime.timedelta(days=2),
+            end_time=start - datetime.timedelta(days=2, hours=-1),
+        )
+
+    def get_json(self, url):
+        response = Client().get(url)
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/activity+json"
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_collection(self):
+        data = self.get_json(reverse("ap-events-list"))
+        assert data["type"] == "OrderedCollection"
+        assert data["totalItems"] == 5
+        assert data["first"].endswith("?page=true")
+
+    def test_pages(self):
+        url = reverse("ap-events-list") + "?page=true&limit=2"
+        ids = []
+        while url:
+            page = self.get_json(url)
+            assert page["type"] == "OrderedCollectionPage"
+            assert len(page["orderedItems"]) <= 2
+            ids += [item["id"] for item in page["orderedItems"]]
+            url = page.get("next")
+        assert ids == [
+            "https://example.com%s" % event.get_absolute_url() for event in self.events
+        ]
+
+    def test_page_id(self):
+        url = reverse("ap-events-list") + "?page=true&limit=2"
+        page = self.get_json(url)
+        assert page["id"] == "https://example.com" + url
+        assert page["partOf"] == "https://example.com" + reverse("ap-events-list")
+
+    def test_only_get(self):
+        response = Client().post(reverse("ap-events-list"))
+        assert response.status_code == 405
+
+    def test_item(self):
+        page = self.get_json(reverse("ap-events-list") + "?page=true")
+        item = page["orderedItems"][0]
+        event = self.events[0]
+        assert item["type"] == "Event"
+        assert item["name"] == event.name
+        assert item["attributedTo"]["name"] == self.team.name
+        assert item["location"]["name"] == str(self.place)
+        assert item["location"]["latitude"] == "1.50000"
+        assert item["image"].startswith("https://example.com/")
+        assert item["startTime"].endswith("Z")
+
+    def test_item_without_coordinates(self):
+        self.place.latitude = self.place.longitude = None
+        self.place.save()
+        page = self.get_json(reverse("ap-events-list") + "?page=true")
+        location = page["orderedItems"][0]["location"]
+        assert location["name"] == str(self.place)
+        assert location["latitude"] is None
+        assert location["longitude"] is None
+
+    def test_page_queries(self):
+        url = reverse("ap-events-list") + "?page=true"
+        Site.objects.clear_cache()
+        # The current site and the events with their teams and places
+        with self.assertNumQueries(2):
+            self.get_json(url)
+
+    def test_invalid_cursor(self):
+        response = Client().get(reverse("ap-events-list") + "?after=invalid")
+        assert response.status_code == 400
@@ -1,10 +1,22 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
 
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+import mock
 from model_mommy import mommy
 
+from ..federation import get_next_url, iter_json_array, sync_searchables
 from ..models.events import Event, delete_event_searchable
 from ..models.profiles import Category, Team
-from ..models.search import Searchable
+from ..models.search import Searchable, SearchableSerializer, serialize_searchables
 
 
 # Create your tests here.
@@ -76,3 +88,199 @@ class SearchableCreationTest(TestCase):
         searchables = Searchable.objects.all()
         assert searchables.count() == 1
         assert searchables[0].img_url == "http://test.com/img/bar.png"
+
+    def test_recreate_searchables(self):
+        public = mommy.make(Team, access=Team.PUBLIC)
+        private = mommy.make(Team, access=Team.PRIVATE)
+        event = mommy.make(Event, team=public, name="Old Title")
+        canceled = mommy.make(Event, team=public)
+        mommy.make(Event, team=private)
+        new = mommy.make(Event, team=public)
+        Event.objects.filter(id=event.id).update(name="New Title")
+        Event.objects.filter(id=canceled.id).update(status=Event.CANCELED)
+        remote = mommy.make(Searchable, origin_node="https://other.example.com/")
+
+        assert Searchable.objects.count() == 4
+        call_command("recreate_searchables")
+
+        searchables = Searchable.objects.exclude(event_uri=remote.event_uri)
+        assert searchables.count() == 2
+        assert set(searchables.values_list("event_title", flat=True)) == set(
+            ["New Title", new.name]
+        )
+        assert Searchable.objects.filter(event_uri=remote.event_uri).exists()
+
+
+def peer_record(number, **values):
+    record = {
+        "event_uri": "https://peer.example.com/%s" % number,
+        "event_url": "https://peer.example.com/events/%s/" % number,
+        "event_title": "Peer event %s" % number,
+        "img_url": "https://peer.example.com/img.png",
+        "location_name": "Pittsburgh, PA",
+        "group_name": "Peer team",
+        "venue_name": "",
+        "longitude": "-80.00000000",
+        "latitude": "40.44000000",
+        "start_time": "2099-01-01T18:00:00Z",
+        "end_time": "2099-01-01T20:00:00Z",
+        "cost": 0,
+        "tags": None,
+        "origin_node": "https://peer.example.com/searchables/",
+    }
+    record.update(values)
+    return record
+
+
+class FederationSyncTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.feed = os.path.join(self.tmp_dir.name, "searchables.json")
+        self.url = "file://" + self.feed
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def publish(self, *records):
+        with open(self.feed, "w") as feed:
+            json.dump(list(records), feed)
+
+    def test_iter_json_array(self):
+        records = [peer_record(n, event_title="Caf\u00e9 %s" % n) for n in range(20)]
+        stream = io.BytesIO(json.dumps(records, indent=2).encode("utf-8"))
+        assert list(iter_json_array(stream, read_size=7)) == records
+        assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.BytesIO(b'[{"a": 1}, {"b"')))
+
+    def test_sync(self):
+        self.publish(peer_record(1), peer_record(2), peer_record(3, start_time=None))
+        assert sync_searchables(self.url) == (2, 0, 0)
+        searchable = Searchable.objects.get(event_uri="https://peer.example.com/1")
+        assert searchable.federation_node == self.url
+        assert searchable.geo_cell is not None
+
+        self.publish(peer_record(1, event_title="Renamed"), peer_record(4))
+        assert sync_searchables(self.url) == (1, 1, 1)
+        titles = set(Searchable.objects.values_list("event_title", flat=True))
+        assert titles == set(["Renamed", "Peer event 4"])
+
+        # An incremental sync never deletes
+        self.publish(peer_record(5))
+        assert sync_searchables(self.url, incremental=True) == (1, 0, 0)
+        assert Searchable.objects.count() == 3
+
+    def test_sync_keeps_local_events(self):
+        event = mommy.make(Event)
+        local = Searchable.objects.get()
+        self.publish(peer_record(1, event_uri=local.event_uri))
+        assert sync_searchables(self.url) == (0, 0, 0)
+        local.refresh_from_db()
+        assert local.event_title == event.name
+
+    def test_searchable_list_since(self):
+        end_time = timezone.now() + datetime.timedelta(days=1)
+        mommy.make(
+            Searchable,
+            location_name="Here",
+            end_time=end_time,
+            federation_time=timezone.now() - datetime.timedelta(days=2),
+        )
+        new = mommy.make(
+            Searchable,
+            location_name="Here",
+            end_time=end_time,
+            federation_time=timezone.now(),
+        )
+        client = Client()
+        since = (timezone.now() - datetime.timedelta(days=1)).isoformat()
+        response = client.get("/searchables/", {"since": since})
+        assert [s["event_uri"] for s in response.json()] == [new.event_uri]
+
+        response = client.get("/searchables/", {"since": "yesterday"})
+        assert response.status_code == 400
+
+
+class SearchablesApiTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        start = timezone.now() + datetime.timedelta(days=1)
+        for number in range(5):
+            mommy.make(
+                Searchable,
+                event_uri="https://example.com/%s" % number,
+                group_name="Team %s" % (number % 2),
+                location_name="Pittsburgh, PA",
+                latitude=40.4 + number,
+                longitude=-80.0,
+                start_time=start + datetime.timedelta(hours=number),
+                end_time=start + datetime.timedelta(hours=number + 1),
+            )
+
+    def test_fast_serialization(self):
+        searchables = Searchable.objects.order_by("start_time")
+        data = SearchableSerializer(searchables, many=True).data
+        assert serialize_searchables(searchables) == [dict(item) for item in data]
+
+    def test_pagination(self):
+        uris = []
+        url = "/searchables/?limit=2"
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == 200
+            assert len(response.json()) <= 2
+            uris.extend(s["event_uri"] for s in response.json())
+            url = get_next_url(response.get("Link"))
+        assert uris == ["https://example.com/%s" % number for number in range(5)]
+
+        response = self.client.get("/searchables/", {"after": "garbage"})
+        assert response.status_code == 400
+
+    def test_unpaginated_list_is_complete(self):
+        with mock.patch("events.views.SEARCHABLES_PAGE_SIZE", 2):
+            response = self.client.get("/searchables/")
+        assert len(response.json()) == 5
+        assert "Link" not in response
+
+    def test_filters(self):
+        response = self.client.get("/searchables/", {"bbox": "40,-81,42,-79"})
+        assert len(response.json()) == 2
+
+        response = self.client.get("/searchables/", {"near": "40.4,-80", "radius": 50})
+        assert [s["event_uri"] for s in response.json()] == ["https://example.com/0"]
+
+        start_before = timezone.now() + datetime.timedelta(days=1, hours=1, minutes=30)
+        response = self.client.get(
+            "/searchables/", {"start_before": start_before.isoformat()}
+        )
+        assert len(response.json()) == 2
+
+    def test_conditional_get(self):
+        response = self.client.get("/searchables/")
+        etag = response["ETag"]
+        response = self.client.get("/searchables/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        Searchable.objects.filter(event_uri="https://example.com/0").delete()
+        response = self.client.get("/searchables/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_deleting_an_older_record_is_modified(self):
+        response = self.client.get("/searchables/")
+        assert "Last-Modified" not in response
+        since = http_date(time.time() + 60)
+        Searchable.objects.filter(event_uri="https://example.com/0").delete()
+        response = self.client.get("/searchables/", HTTP_IF_MODIFIED_SINCE=since)
+        assert response.status_code == 200
+        assert len(response.json()) == 4
+
+    def test_upcoming_events_first_per_group(self):
+        response = self.client.get("/api/upcoming_events/")
+        assert [s["event_uri"] for s in response.json()] == [
+            "https://example.com/0",
+            "https://example.com/1",
+        ]
@@ -0,0 +1,120 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from ..feed_tokens import UNKNOWN_TOKENS, get_profile_id, token_key
+from ..models.events import Event
+from ..models.profiles import Team, UserProfile
+
+
+@override_settings(FEED_TOKEN_CACHE_ALIAS="default")
+class FeedTokenTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        UNKNOWN_TOKENS.clear()
+        self.profile = mommy.make(UserProfile)
+
+    def tearDown(self):
+        cache.clear()
+        UNKNOWN_TOKENS.clear()
+        super().tearDown()
+
+    def test_known_token_is_cached(self):
+        with self.assertNumQueries(1):
+            assert get_profile_id(self.profile.secret_key) == self.profile.id
+        with self.assertNumQueries(0):
+            assert get_profile_id(str(self.profile.secret_key)) == self.profile.id
+
+    @override_settings(FEED_TOKEN_CACHE_ALIAS=None)
+    def test_known_token_is_not_cached_without_shared_cache(self):
+        for i in range(2):
+            with self.assertNumQueries(1):
+                assert get_profile_id(self.profile.secret_key) == self.profile.id
+
+    def test_unknown_token_is_remembered(self):
+        token = uuid.uuid4()
+        with self.assertNumQueries(1):
+            assert get_profile_id(token) is None
+        with self.assertNumQueries(0):
+            assert get_profile_id(token) is None
+
+    def test_invalid_token(self):
+        with self.assertNumQueries(0):
+            assert get_profile_id("not-a-token") is None
+        url = reverse("user-event-ical", kwargs={"account_secret": "not-a-token"})
+        assert Client().get(url).status_code == 404
+
+    def test_rotate_secret_key(self):
+        old_url = reverse(
+            "user-event-ical", kwargs={"account_secret": self.profile.secret_key}
+        )
+        c = Client()
+        assert c.get(old_url).status_code == 200
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.rotate_secret_key()
+        assert c.get(old_url).status_code == 404
+        new_url = reverse(
+            "user-event-ical", kwargs={"account_secret": self.profile.secret_key}
+        )
+        assert c.get(new_url).status_code == 200
+
+    def test_changed_secret_key(self):
+        old_key = self.profile.secret_key
+        assert get_profile_id(old_key) == self.profile.id
+
+        # Like editing the key in the admin
+        profile = UserProfile.objects.get(id=self.profile.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.secret_key = uuid.uuid4()
+            profile.save()
+        assert get_profile_id(old_key) is None
+        assert get_profile_id(profile.secret_key) == profile.id
+
+    def test_deleted_profile(self):
+        key = self.profile.secret_key
+        assert get_profile_id(key) == self.profile.id
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.get(id=self.profile.id).delete()
+        assert get_profile_id(key) is None
+
+    def test_poll_before_commit_is_forgotten(self):
+        old_key = self.profile.secret_key
+        profile = UserProfile.objects.get(id=self.profile.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.secret_key = uuid.uuid4()
+            profile.save()
+            # Another worker polls the old URL before the change is committed,
+            # still finds the old key in the database and caches it
+            cache.set(token_key(old_key), profile.id)
+        assert get_profile_id(old_key) is None
+
+    def test_private_team_feed(self):
+        owner = mommy.make(User).profile
+        admin = mommy.make(User, is_superuser=True).profile
+        team = mommy.make(Team, access=Team.PRIVATE, owner_profile=owner)
+        start = timezone.now() + datetime.timedelta(days=1)
+        mommy.make(
+            Event,
+            name="Private Event",
+            team=team,
+            start_time=start,
+            end_time=start + datetime.timedelta(hours=2),
+        )
+
+        c = Client()
+        for profile, can_see in ((owner, True), (admin, True), (self.profile, False)):
+            url = reverse(
+                "private-team-event-ical",
+                kwargs={"team_id": team.id, "account_secret": profile.secret_key},
+            )
+            response = c.get(url)
+            assert (b"Private Event" in response.content) == can_see
@@ -0,0 +1,92 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import mock
+from model_mommy import mommy
+
+from ..models.events import Attendee, Event
+from ..models.profiles import Team, UserProfile
+
+
+@override_settings(FRAGMENT_CACHE_ALIAS="default")
+class CalendarFeedTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.team = mommy.make(Team, access=Team.PUBLIC)
+        self.event = self.make_event("First Event")
+        self.url = reverse("team-event-ical", kwargs={"team_id": self.team.id})
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def make_event(self, name):
+        start = timezone.now() + datetime.timedelta(days=1)
+        return mommy.make(
+            Event,
+            name=name,
+            team=self.team,
+            start_time=start,
+            end_time=start + datetime.timedelta(hours=2),
+        )
+
+    def test_not_modified(self):
+        c = Client()
+        response = c.get(self.url)
+        assert response.status_code == 200
+        assert b"First Event" in response.content
+        assert response["Access-Control-Allow-Origin"] == "*"
+
+        response = c.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 304
+
+    def test_cached_feed(self):
+        c = Client()
+        response = c.get(self.url)
+        with self.assertNumQueries(1):
+            cached = c.get(self.url)
+        assert cached.content == response.content
+
+    def test_without_shared_cache(self):
+        c = Client()
+        with mock.patch("events.feeds.get_cache", return_value=None):
+            response = c.get(self.url)
+            assert "Last-Modified" not in response
+            etag = response["ETag"]
+            assert c.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+            self.make_event("Second Event")
+            response = c.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert b"Second Event" in response.content
+
+    def test_new_event_changes_feed(self):
+        c = Client()
+        etag = c.get(self.url)["ETag"]
+
+        self.make_event("Second Event")
+        response = c.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert b"Second Event" in response.content
+
+    def test_attending_changes_user_feed(self):
+        profile = mommy.make(UserProfile)
+        url = reverse("user-event-ical", kwargs={"account_secret": profile.secret_key})
+        c = Client()
+        response = c.get(url)
+        assert b"First Event" not in response.content
+
+        mommy.make(Attendee, event=self.event, user=profile, status=Attendee.YES)
+        response = c.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 200
+        assert b"First Event" in response.content
+
+        self.event.name = "Renamed Event"
+        self.event.save()
+        assert b"Renamed Event" in c.get(url).content
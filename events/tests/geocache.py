@@ -0,0 +1,97 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+import mock
+
+from .. import ipstack
+from ..geocache import GeoIPCache
+from ..utils import MISSING, LRUCache
+
+
+def mock_response(status_code=200, data=None):
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = data or {}
+    return response
+
+
+LOCATED = {"ip": "8.8.8.8", "latitude": 37.4, "longitude": -122.1, "city": "MV"}
+
+
+class GeoCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.cache = GeoIPCache(size=2, cache_alias="default")
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(size=2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        assert lru.get("a") == 1
+        lru.set("c", 3, 60)
+        assert lru.get("b") is MISSING
+        assert lru.get("a") == 1
+        assert lru.evictions == 1
+
+    def test_lru_expires_entries(self):
+        lru = LRUCache(size=2)
+        lru.set("a", 1, 0)
+        assert lru.get("a") is MISSING
+        assert len(lru) == 0
+
+    def test_shared_tier_survives_restart(self):
+        self.cache.set("8.8.8.8", LOCATED)
+        restarted = GeoIPCache(size=2, cache_alias="default")
+        assert restarted.get("8.8.8.8") == LOCATED
+        assert restarted.get("8.8.8.8") == LOCATED
+        stats = restarted.stats()
+        assert stats["shared_hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["hit_rate"] == 1.0
+
+    def test_negative_results(self):
+        self.cache.set("10.0.0.1", {})
+        assert self.cache.get("10.0.0.1") == {}
+        assert self.cache.get("10.0.0.2") is MISSING
+        stats = self.cache.stats()
+        assert stats["negative_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_without_shared_tier(self):
+        cache = GeoIPCache(size=2, cache_alias="does-not-exist")
+        cache.set("8.8.8.8", LOCATED)
+        assert cache.get("8.8.8.8") == LOCATED
+        cache.clear()
+        assert cache.get("8.8.8.8") is MISSING
+
+
+@override_settings(IPSTACK_ACCESS_KEY="gettogether-testing")
+class IPStackCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        ipstack.RESULT_CACHE.clear()
+
+    @mock.patch("events.ipstack.requests.get")
+    def test_result_is_cached(self, get):
+        get.return_value = mock_response(data=LOCATED)
+        result = ipstack.get_ipstack_geocoder("8.8.8.8")
+        assert result.ok
+        assert result.latlng == [37.4, -122.1]
+
+        result = ipstack.get_ipstack_geocoder("8.8.8.8")
+        assert result.latlng == [37.4, -122.1]
+        assert get.call_count == 1
+        assert get.call_args[1]["timeout"] == ipstack.IPSTACK_TIMEOUT
+
+    @mock.patch("events.ipstack.requests.get")
+    def test_failures_are_cached(self, get):
+        get.return_value = mock_response(status_code=500)
+        assert not ipstack.get_ipstack_geocoder("10.0.0.1").ok
+        assert not ipstack.get_ipstack_geocoder("10.0.0.1").ok
+        assert get.call_count == 1
+
+        get.side_effect = Exception("Timed out")
+        assert not ipstack.get_ipstack_geocoder("10.0.0.2").ok
+        assert not ipstack.get_ipstack_geocoder("10.0.0.2").ok
+        assert get.call_count == 2
@@ -0,0 +1,100 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from .. import geoindex, location
+from ..models.locale import City
+from ..models.profiles import Team
+from ..models.search import Searchable
+
+
+class GeoIndexTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ll = (40.0, -80.0)
+
+    def make_searchable(self, title, latitude, longitude):
+        return mommy.make(
+            Searchable,
+            event_title=title,
+            latitude=latitude,
+            longitude=longitude,
+            end_time=timezone.now() + datetime.timedelta(days=1),
+        )
+
+    def test_cell_is_set_on_save(self):
+        searchable = self.make_searchable("Here", 40.5, -79.5)
+        assert searchable.geo_cell == geoindex.get_cell(40.5, -79.5)
+
+        searchable.latitude = None
+        searchable.save()
+        assert searchable.geo_cell is None
+
+    def test_cells_cover_bounding_box(self):
+        cells = geoindex.get_cells(*geoindex.get_bounding_box(self.ll, 100))
+        assert geoindex.get_cell(40.5, -79.5) in cells
+        assert geoindex.get_cell(39.5, -80.5) in cells
+        assert geoindex.get_cell(45.0, -80.0) not in cells
+
+    def test_cells_wrap_around_date_line(self):
+        cells = geoindex.get_cells(*geoindex.get_bounding_box((0.0, 179.9), 50))
+        assert geoindex.get_cell(0.0, -179.9) in cells
+        assert geoindex.get_cell(0.0, 179.9) in cells
+        assert geoindex.get_cell(0.0, 0.0) not in cells
+
+    def test_nearest_across_date_line(self):
+        self.make_searchable("Across", 0.0, -179.9)
+        self.make_searchable("Same side", 0.0, 179.0)
+        self.make_searchable("Far", 0.0, 170.0)
+
+        results = geoindex.nearest(Searchable.objects.all(), (0.0, 179.9), radius=150)
+        assert [s.event_title for s in results] == ["Across", "Same side"]
+        assert location.distance((0.0, 179.9), (0.0, -179.9)) < 25
+
+    def test_nearest_within_radius_is_ordered(self):
+        far = self.make_searchable("Far", 40.6, -80.0)
+        near = self.make_searchable("Near", 40.1, -80.0)
+        self.make_searchable("Too far", 42.0, -80.0)
+        self.make_searchable("Nowhere", None, None)
+
+        results = geoindex.nearest(Searchable.objects.all(), self.ll, radius=100)
+        assert [s.event_title for s in results] == ["Near", "Far"]
+
+    def test_nearest_k_widens_search(self):
+        self.make_searchable("Near", 40.1, -80.0)
+        self.make_searchable("Other side of the world", -40.0, 100.0)
+        self.make_searchable("Next state over", 44.0, -80.0)
+        self.make_searchable("Nowhere", None, None)
+
+        results = geoindex.nearest(Searchable.objects.all(), self.ll, k=2)
+        assert [s.event_title for s in results] == ["Near", "Next state over"]
+
+        results = geoindex.nearest(Searchable.objects.all(), self.ll, k=5)
+        assert len(results) == 3
+        assert results[-1].event_title == "Other side of the world"
+
+    def test_nearest_through_related_city(self):
+        near_city = mommy.make(City, latitude=40.2, longitude=-80.1)
+        far_city = mommy.make(City, latitude=41.0, longitude=-80.0)
+        mommy.make(Team, name="Far team", city=far_city)
+        mommy.make(Team, name="Near team", city=near_city)
+
+        results = geoindex.nearest(
+            Team.objects.all(), self.ll, radius=200, prefix="city__"
+        )
+        assert [team.name for team in results] == ["Near team", "Far team"]
+
+    def test_get_nearest_city(self):
+        mommy.make(City, name="Farville", latitude=40.5, longitude=-80.0)
+        mommy.make(City, name="Nearville", latitude=40.05, longitude=-80.05)
+
+        with self.assertNumQueries(1):
+            city = location.get_nearest_city(self.ll)
+            assert city.name == "Nearville"
+            assert str(city)
+
+        assert location.get_nearest_city((0.0, 0.0)) is None
+        assert location.get_nearest_city(None) is None
@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+import mock
+
+from .. import geoipdb, location
+
+RANGES_CSV = """network,latitude,longitude,city,region,country_name,country_code
+8.8.8.0/24,37.4,-122.1,Mountain View,California,United States,US
+1.0.0.0/8,-27.5,153.0,,Queensland,Australia,AU
+1.1.0.0/16,0,0,Overlaps the one above,,,
+2001:db8::/32,52.5,13.4,Berlin,,Germany,DE
+bogus,1,1,,,,
+"""
+
+
+class GeoIPDatabaseTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        csv_path = os.path.join(self.tmp_dir.name, "ranges.csv")
+        self.db_path = os.path.join(self.tmp_dir.name, "geoip.db")
+        with open(csv_path, "w") as csv_file:
+            csv_file.write(RANGES_CSV)
+        call_command("build_geoip_db", csv_path, self.db_path)
+        self.db = geoipdb.GeoIPDatabase(self.db_path)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+        geoipdb._DATABASE = None
+        super().tearDown()
+
+    def test_lookup(self):
+        assert len(self.db) == 3
+        raw = self.db.lookup("8.8.8.8")
+        assert raw["latitude"] == 37.4
+        assert raw["longitude"] == -122.1
+        assert raw["city"] == "Mountain View"
+        assert raw["country_code"] == "US"
+
+        raw = self.db.lookup("1.1.1.1")
+        assert raw["country_name"] == "Australia"
+        assert "city" not in raw
+
+        assert self.db.lookup("2001:db8::1")["city"] == "Berlin"
+
+    def test_lookup_misses(self):
+        assert self.db.lookup("0.0.0.1") == {}
+        assert self.db.lookup("8.8.9.1") == {}
+        assert self.db.lookup("255.255.255.255") == {}
+        assert self.db.lookup("not an ip") == {}
+
+    def test_provider_setting(self):
+        request = mock.Mock(META={"REMOTE_ADDR": "8.8.8.8"})
+        with override_settings(GEOIP_PROVIDER="database", GEOIP_DATABASE=self.db_path):
+            g = location.get_geoip(request)
+        assert g.ok
+        assert g.latlng == [37.4, -122.1]
+        assert g.city == "Mountain View"
+        assert g.country == "United States"
+
+    def test_missing_database(self):
+        with override_settings(GEOIP_DATABASE=None):
+            assert not geoipdb.get_geoipdb_geocoder("8.8.8.8").ok
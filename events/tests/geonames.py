@@ -0,0 +1,124 @@
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from model_mommy import mommy
+
+from .. import geoindex
+from ..geonames import BulkLoader
+from ..models.locale import SPR, City, Country
+
+
+def geonames_line(*fields):
+    return "\t".join(str(field) for field in fields) + "\n"
+
+
+def country_line(code, name):
+    return geonames_line(code, "", "", "", name, *([""] * 14))
+
+
+def city_line(name, feature_code, country_code, admin1, lat, lng, population, tz):
+    return geonames_line(
+        0,
+        name,
+        name,
+        "",
+        lat,
+        lng,
+        "P",
+        feature_code,
+        country_code,
+        "",
+        admin1,
+        "",
+        "",
+        "",
+        population,
+        "",
+        "",
+        tz,
+        "2020-01-01",
+    )
+
+
+class GeoNamesImportTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def write_file(self, name, *lines):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as geonames_file:
+            geonames_file.writelines(lines)
+        return path
+
+    def test_load_all(self):
+        countries = self.write_file(
+            "countryInfo.txt",
+            "# ISO\tISO3\n",
+            country_line("US", "United States"),
+            country_line("DE", "Germany"),
+        )
+        call_command("load_countries", countries)
+        call_command("load_countries", countries)
+        assert Country.objects.count() == 2
+
+        sprs = self.write_file(
+            "admin1CodesASCII.txt",
+            geonames_line("US.PA", "Pennsylvania", "Pennsylvania", 1),
+            geonames_line("DE.16", "Berlin", "Berlin", 2),
+            geonames_line("XX.01", "Nowhere", "Nowhere", 3),
+        )
+        call_command("load_spr", sprs)
+        assert SPR.objects.count() == 2
+
+        cities = self.write_file(
+            "cities1000.txt",
+            city_line("Pittsburgh", "PPL", "US", "PA", 40.44, -80.0, 300000, "UTC"),
+            city_line("Berlin", "PPLC", "DE", "16", 52.52, 13.4, 3000000, "UTC"),
+            city_line("A Park", "PRK", "US", "PA", 40.4, -80.1, 0, "UTC"),
+            "short\tline\n",
+        )
+        call_command("load_cities", cities)
+        assert City.objects.count() == 2
+        pittsburgh = City.objects.get(name="Pittsburgh")
+        assert pittsburgh.spr.name == "Pennsylvania"
+        assert pittsburgh.population == 300000
+        assert pittsburgh.geo_cell == geoindex.get_cell(40.44, -80.0)
+
+        cities = self.write_file(
+            "cities1000.txt",
+            city_line(
+                "Pittsburgh", "PPL", "US", "PA", 40.44, -80.0, 302000, "US/Eastern"
+            ),
+            city_line("Berlin", "PPLC", "DE", "16", 52.52, 13.4, 3000000, "UTC"),
+            city_line("Erie", "PPL", "US", "PA", 42.1, -80.1, 100000, "US/Eastern"),
+        )
+        with self.assertNumQueries(7):
+            # Load SPRs and existing cities, then one transaction for the batch
+            # which looks up the primary keys sqlite doesn't return
+            call_command("load_cities", cities)
+        assert City.objects.count() == 3
+        pittsburgh.refresh_from_db()
+        assert pittsburgh.population == 302000
+        assert pittsburgh.tz == "US/Eastern"
+
+    def test_update_row_created_by_earlier_batch(self):
+        spr = mommy.make(SPR)
+        loader = BulkLoader(
+            City,
+            key_fields=("name", "spr_id"),
+            update_fields=("population",),
+            batch_size=1,
+        )
+        loader.add(("Pittsburgh", spr.id), population=300000)
+        loader.add(("Pittsburgh", spr.id), population=302000)
+        loader.finish()
+        assert (loader.created, loader.updated, loader.unchanged) == (1, 1, 0)
+        assert City.objects.get(name="Pittsburgh").population == 302000
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from model_mommy import mommy
+
+from ..models.events import Event
+from ..models.profiles import Member, Team, UserProfile
+
+
+class PermissionTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = mommy.make(User)
+        self.profile = self.user.profile
+        self.team = mommy.make(Team)
+        self.other_team = mommy.make(Team)
+        self.event = mommy.make(Event, team=self.team)
+
+    def test_roles(self):
+        assert not self.profile.is_in_team(self.team)
+
+        member = mommy.make(Member, team=self.team, user=self.profile)
+        assert self.profile.is_in_team(self.team)
+        assert not self.profile.can_create_event(self.team)
+
+        member.role = Member.MODERATOR
+        member.save()
+        assert self.profile.can_create_event(self.team)
+        assert self.profile.can_edit_event(self.event)
+        assert not self.profile.can_edit_team(self.team)
+
+        member.role = Member.ADMIN
+        member.save()
+        assert self.profile.can_edit_team(self.team)
+        assert not self.profile.can_edit_team(self.other_team)
+
+        Member.objects.filter(team=self.team, user=self.profile).delete()
+        assert not self.profile.is_in_team(self.team)
+        assert not UserProfile().is_in_team(self.team)
+
+    def test_roles_are_loaded_once(self):
+        mommy.make(Member, team=self.team, user=self.profile, role=Member.ADMIN)
+        self.profile.is_in_team(self.team)
+
+        # Every profile loaded from this User shares the cached roles
+        profile = self.user.profile
+        with self.assertNumQueries(0):
+            assert profile.can_edit_event(self.event)
+            assert profile.can_edit_team(self.team)
+            assert profile.can_create_event(self.team)
+            assert not profile.is_in_team(self.other_team)
+
+
+class ProfileCacheTest(TestCase):
+    def test_profile_is_loaded_once(self):
+        user = mommy.make(User)
+        profile = user.profile
+        account = user.account
+        with self.assertNumQueries(0):
+            assert user.profile is profile
+            assert user.account is account
+
+    def test_saved_profile_replaces_cached_one(self):
+        user = mommy.make(User)
+        user.profile
+        other = UserProfile.objects.get(user=user)
+        other.user = user
+        other.realname = "Changed"
+        other.save()
+        assert user.profile.realname == "Changed"
+
+        other.delete()
+        assert user.profile.id != other.id
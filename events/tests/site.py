@@ -0,0 +1,39 @@
+from django.contrib.sites.models import Site
+from django.test import TestCase
+
+from model_mommy import mommy
+
+from ..models.events import Event
+from ..site import full_url, get_domain
+
+
+class SiteUrlTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        Site.objects.clear_cache()
+
+    def tearDown(self):
+        Site.objects.clear_cache()
+        super().tearDown()
+
+    def test_full_url(self):
+        assert full_url("/events/") == "https://example.com/events/"
+        assert full_url("https://other.example.com/a") == "https://other.example.com/a"
+        assert full_url("http://other.example.com/a") == "http://other.example.com/a"
+
+    def test_domain_is_cached(self):
+        event = mommy.make(Event)
+        get_domain()
+        with self.assertNumQueries(0):
+            assert event.get_full_url() == "https://example.com%s" % (
+                event.get_absolute_url()
+            )
+            assert event.team.get_full_url().startswith("https://example.com/")
+
+    def test_site_change_clears_cache(self):
+        assert get_domain() == "example.com"
+        site = Site.objects.get(id=1)
+        site.domain = "gettogether.example.com"
+        site.save()
+        assert get_domain() == "gettogether.example.com"
+        assert full_url("/") == "https://gettogether.example.com/"
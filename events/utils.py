@@ -1,9 +1,15 @@
+import base64
 import re
+import threading
+import time
 import unicodedata
+from collections import OrderedDict
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.middleware.csrf import _compare_masked_tokens, _sanitize_token
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 SLUG_OK = "-_~"
 
@@ -40,3 +46,81 @@ def verify_csrf(token_key="csrftoken"):
         return check_csrf_token
 
     return wrap_view
+
+
+def parse_time(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError("Invalid date: %s" % value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def encode_cursor(start_time, key):
+    """
+    Returns an opaque cursor for paging through records ordered by their start
+    time and then ``key``, like an event's URI or id.
+    """
+    cursor = "%s|%s" % (start_time.isoformat(), key)
+    return base64.urlsafe_b64encode(cursor.encode("utf8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (start_time, key) of a cursor from ``encode_cursor()``, with
+    the key as a string, or raises ValueError.
+    """
+    try:
+        cursor = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf8")
+        start_time, key = cursor.split("|", 1)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    return parse_time(start_time), key
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    In-process least recently used cache where every entry has its own
+    expiry time. Safe to share between the threads of a WSGI worker.
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                return MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)  # Discard the least recently used
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
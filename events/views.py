@@ -1,15 +1,20 @@
 import datetime
+import hashlib
 
+from django.conf import settings
 from django.contrib import messages
+from django.db.models import Count, Max, OuterRef, Q, Subquery
 from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import condition
 
 import simplejson
 from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 
+from . import geoindex, location
 from .forms import EventCommentForm
 from .models.events import Attendee, Event, EventComment, Place, PlaceSerializer
 from .models.locale import (
@@ -29,19 +34,116 @@ from .models.profiles import (
     TeamSerializer,
     UserProfile,
 )
-from .models.search import Searchable, SearchableSerializer
-from .utils import verify_csrf
+from .models.search import Searchable, SearchableSerializer, serialize_searchables
+from .utils import decode_cursor, encode_cursor, parse_time, verify_csrf
+
+SEARCHABLES_PAGE_SIZE = getattr(settings, "SEARCHABLES_PAGE_SIZE", 500)
+SEARCHABLES_MAX_PAGE_SIZE = getattr(settings, "SEARCHABLES_MAX_PAGE_SIZE", 1000)
+
+
+def upcoming_searchables():
+    return Searchable.objects.exclude(location_name="").filter(
+        end_time__gte=timezone.now()
+    )
+
+
+def searchables_etag(request, *args, **kwargs):
+    # The count changes when a record is deleted or expires, which the latest
+    # federation_time doesn't, so there's no Last-Modified to go with this
+    state = upcoming_searchables().aggregate(
+        last_change=Max("federation_time"), count=Count("event_uri")
+    )
+    key = "%s?%s|%s|%s" % (
+        request.path,
+        request.GET.urlencode(),
+        state["last_change"],
+        state["count"],
+    )
+    return hashlib.md5(key.encode("utf8")).hexdigest()
+
+
+def parse_floats(value, count):
+    values = [float(v) for v in value.split(",")]
+    if len(values) != count:
+        raise ValueError("Expected %s numbers: %s" % (count, value))
+    return values
+
+
+def filter_searchables(searchables, params):
+    """
+    Applies the optional query filters of the searchables API:
+
+    since: only records changed after this time
+    start_after, start_before: only events starting in this window
+    bbox: minlat,minlng,maxlat,maxlng
+    near, radius: lat,lng and a distance in km (default 100)
+    """
+    if params.get("since"):
+        searchables = searchables.filter(
+            federation_time__gt=parse_time(params["since"])
+        )
+    if params.get("start_after"):
+        searchables = searchables.filter(
+            start_time__gte=parse_time(params["start_after"])
+        )
+    if params.get("start_before"):
+        searchables = searchables.filter(
+            start_time__lt=parse_time(params["start_before"])
+        )
+    if params.get("bbox"):
+        minlat, minlng, maxlat, maxlng = parse_floats(params["bbox"], 4)
+        cells = geoindex.get_cells(minlat, maxlat, minlng, maxlng)
+        if cells is not None:
+            searchables = searchables.filter(geo_cell__in=cells)
+        searchables = searchables.filter(
+            latitude__gte=minlat,
+            latitude__lte=maxlat,
+            longitude__gte=minlng,
+            longitude__lte=maxlng,
+        )
+    if params.get("near"):
+        ll = parse_floats(params["near"], 2)
+        radius = float(params.get("radius") or location.DEFAULT_NEAR_DISTANCE)
+        searchables = geoindex.within(searchables, ll, radius)
+    return searchables
 
 
 # Create your views here.
+@condition(etag_func=searchables_etag)
 def searchable_list(request, *args, **kwargs):
-    searchables = (
-        Searchable.objects.exclude(location_name="")
-        .filter(end_time__gte=timezone.now())
-        .order_by("start_time")
-    )
-    serializer = SearchableSerializer(searchables, many=True)
-    return JsonResponse(serializer.data, safe=False)
+    try:
+        searchables = filter_searchables(upcoming_searchables(), request.GET)
+        # Older peers fetch the whole list at once and don't follow the Link
+        paginate = bool(request.GET.get("limit") or request.GET.get("after"))
+        limit = min(
+            int(request.GET.get("limit") or SEARCHABLES_PAGE_SIZE),
+            SEARCHABLES_MAX_PAGE_SIZE,
+        )
+        if limit < 1:
+            raise ValueError("Invalid limit")
+        if request.GET.get("after"):
+            start_time, event_uri = decode_cursor(request.GET["after"])
+            searchables = searchables.filter(
+                Q(start_time__gt=start_time)
+                | Q(start_time=start_time, event_uri__gt=event_uri)
+            )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    searchables = searchables.order_by("start_time", "event_uri")
+    if not paginate:
+        return JsonResponse(serialize_searchables(searchables), safe=False)
+    data = serialize_searchables(searchables[: limit + 1])
+    response = JsonResponse(data[:limit], safe=False)
+    if len(data) > limit:
+        last = data[limit - 1]
+        params = request.GET.copy()
+        params["after"] = encode_cursor(
+            parse_time(last["start_time"]), last["event_uri"]
+        )
+        next_url = request.build_absolute_uri(request.path + "?" + params.urlencode())
+        response["Link"] = '<%s>; rel="next"' % next_url
+    return response
 
 
 def events_list(request, *args, **kwargs):
@@ -50,18 +152,19 @@ def events_list(request, *args, **kwargs):
     return render(request, "events/event_list.html", context)
 
 
+@condition(etag_func=searchables_etag)
 def upcoming_events(request):
-    searchables = (
-        Searchable.objects.exclude(location_name="")
-        .filter(end_time__gte=timezone.now())
-        .order_by("start_time")
+    searchables = upcoming_searchables()
+    # The first upcoming event of every group
+    first_in_group = (
+        searchables.filter(group_name=OuterRef("group_name"))
+        .order_by("start_time", "event_uri")
+        .values("event_uri")[:1]
+    )
+    searchables = searchables.filter(event_uri=Subquery(first_in_group)).order_by(
+        "start_time", "event_uri"
     )
-    unique_events = dict()
-    for event in searchables:
-        if event.group_name not in unique_events:
-            unique_events[event.group_name] = event
-    serializer = SearchableSerializer(unique_events.values(), many=True)
-    return JsonResponse(serializer.data, safe=False)
+    return JsonResponse(serialize_searchables(searchables), safe=False)
 
 
 @api_view(["GET"])
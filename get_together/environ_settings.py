@@ -26,6 +26,8 @@ EMAIL_HOST = os.environ.get("EMAIL_HOST", "you.smtp.host.com")
 EMAIL_PORT = os.environ.get("EMAIL_PORT", 587)
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", None)
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", None)
+# Queue emails for a `manage.py send_queued_email --loop` worker to send
+EMAIL_OUTBOX = os.environ.get("EMAIL_OUTBOX", False) == "True"
 
 SOCIAL_AUTH_GITHUB_KEY = os.environ.get("SOCIAL_AUTH_GITHUB_KEY", None)
 SOCIAL_AUTH_GITHUB_SECRET = os.environ.get("SOCIAL_AUTH_GITHUB_SECRET", None)
@@ -52,3 +54,7 @@ GOOGLE_ANALYTICS_ID = os.environ.get("GOOGLE_ANALYTICS_ID", None)
 
 # Free Geoip lookup from ipstack.com still requires an access token
 IPSTACK_ACCESS_KEY = os.environ.get("IPSTACK_ACCESS_KEY", None)
+
+# Or look visitors up in a local database built with build_geoip_db
+GEOIP_PROVIDER = os.environ.get("GEOIP_PROVIDER", "ipstack")
+GEOIP_DATABASE = os.environ.get("GEOIP_DATABASE", None)
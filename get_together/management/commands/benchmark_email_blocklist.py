@@ -0,0 +1,34 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.email_lists import get_email_lists, is_blocked_email
+
+SAMPLE_EMAILS = [
+    "someone@gmail.com",
+    "someone@yopmail.com",
+    "someone@mail.subdomain.example.org",
+    "someone@mailinator.com",
+]
+
+
+class Command(BaseCommand):
+    help = "Measures how long it takes to check an email against the blocklist"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--number", type=int, default=100000)
+
+    def handle(self, *args, **options):
+        lists = get_email_lists()
+        print(
+            "%s blocked and %s allowed entries"
+            % (len(lists.blocked), len(lists.allowed))
+        )
+        for email in SAMPLE_EMAILS:
+            elapsed = timeit.timeit(
+                lambda: is_blocked_email(email), number=options["number"]
+            )
+            print(
+                "%s: %.3f usec per lookup (blocked: %s)"
+                % (email, elapsed * 1e6 / options["number"], is_blocked_email(email))
+            )
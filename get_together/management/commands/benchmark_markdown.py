@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Template
+
+import markdown as md
+
+from get_together.templatetags import markup
+
+PARAGRAPH = (
+    "Join us for an evening of **lightning talks** and _pizza_. Bring a "
+    "laptop if you want to follow along, and see [the wiki]"
+    "(https://example.com/wiki) for directions and parking.\n\n"
+)
+AGENDA = "".join("* %s:00 - Talk number %s\n" % (18 + i % 4, i) for i in range(12))
+SUMMARY = "# About this event\n\n" + PARAGRAPH * 10 + "## Agenda\n\n" + AGENDA
+ABSTRACT = "A talk about `code`, with some *emphasis*.\n\n" + PARAGRAPH * 2
+
+PAGE = Template(
+    "{% load markup %}"
+    "{{ summary|markdown }}{{ description|markdown }}"
+    "{% for abstract in abstracts %}{{ abstract|markdown }}{% endfor %}"
+)
+
+
+class Command(BaseCommand):
+    help = "Measures rendering the Markdown on a long event page"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--number", type=int, default=200)
+
+    def handle(self, *args, **options):
+        context = Context(
+            {
+                "summary": SUMMARY,
+                "description": PARAGRAPH * 3,
+                "abstracts": [ABSTRACT + str(i) for i in range(10)],
+            }
+        )
+        texts = [SUMMARY, PARAGRAPH * 3] + context["abstracts"]
+        print(
+            "%s Markdown texts, %s characters per page"
+            % (len(texts), sum(len(text) for text in texts))
+        )
+
+        started = time.perf_counter()
+        for i in range(options["number"]):
+            for text in texts:
+                md.markdown(text)
+        report("markdown.markdown() for every text", started, options["number"])
+
+        markup.RENDERED.clear()
+        started = time.perf_counter()
+        PAGE.render(context)
+        report("First render, uncached", started, 1)
+
+        started = time.perf_counter()
+        for i in range(options["number"]):
+            PAGE.render(context)
+        report("Cached renders", started, options["number"])
+
+
+def report(label, started, number):
+    elapsed = time.perf_counter() - started
+    print("%s: %.3f ms per page" % (label, elapsed * 1000 / number))
@@ -1,83 +1,78 @@
 import datetime
+from collections import OrderedDict
 
-from django.conf import settings
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand, CommandError
-from django.template.loader import get_template, render_to_string
-from django.urls import reverse
 from django.utils import timezone
 
-from accounts.models import EmailRecord
-from events.models import Attendee, Event
+from accounts.outbox import BulkMailer
+from events.models import Attendee
+from events.site import get_site
 
 
 class Command(BaseCommand):
     help = "Sends email to event hosts about new attendees"
 
     def handle(self, *args, **options):
-        # Attendees who recently joined
-        attendees = Attendee.objects.filter(
-            role=Attendee.NORMAL,
-            joined_date__gte=timezone.now() - datetime.timedelta(days=1),
-        ).order_by("event")
+        digests = get_attendee_digests(timezone.now() - datetime.timedelta(days=1))
+        if not digests:
+            return
+        site = get_site()
+        with BulkMailer() as mailer:
+            for host, updates in digests.values():
+                send_new_attendees(mailer, site, host, updates)
 
-        current_event = None
-        new_attendees = []
-        for attendee in attendees:
 
-            if attendee.event != current_event:
-                send_new_attendees(current_event, new_attendees)
-                current_event = attendee.event
-                new_attendees = []
-
-            new_attendees.append(attendee)
-        if current_event is not None:
-            send_new_attendees(current_event, new_attendees)
+def get_attendee_digests(since):
+    """
+    Groups the attendees who joined after ``since`` by event, and the events by
+    the hosts who should hear about them. Returns a dict of
+    ``{user_id: (user, [(event, attendees), ...])}``.
+    """
+    # Attendees who recently joined
+    attendees = (
+        Attendee.objects.filter(role=Attendee.NORMAL, joined_date__gte=since)
+        .select_related("event", "user__user")
+        .order_by("event_id", "joined_date")
+    )
+    new_attendees = OrderedDict()
+    for attendee in attendees:
+        event, event_attendees = new_attendees.setdefault(
+            attendee.event_id, (attendee.event, [])
+        )
+        event_attendees.append(attendee)
+    if not new_attendees:
+        return dict()
 
+    hosts = (
+        Attendee.objects.filter(
+            event_id__in=list(new_attendees),
+            role=Attendee.HOST,
+            user__user__account__is_email_confirmed=True,
+        )
+        .exclude(user__user__email="")
+        .select_related("user__user")
+        .order_by("event_id")
+    )
+    digests = OrderedDict()
+    for host in hosts:
+        user = host.user.user
+        digests.setdefault(user.id, (user, []))[1].append(new_attendees[host.event_id])
+    return digests
 
-def send_new_attendees(event, new_attendees):
-    if len(new_attendees) < 1:
-        return
-    hosts = [
-        attendee.user.user
-        for attendee in Attendee.objects.filter(event=event, role=Attendee.HOST)
-        if attendee.user.user.account.is_email_confirmed
-    ]
-    if len(hosts) < 1:
-        return
-    context = {
-        "event": event,
-        "attendees": new_attendees,
-        "site": Site.objects.get(id=1),
-    }
 
-    email_subject = "New event attendees"
-    email_body_text = render_to_string(
-        "get_together/emails/events/new_event_attendees.txt", context
+def send_new_attendees(mailer, site, host, updates):
+    context = {"updates": updates, "site": site}
+    email_subject, email_body_text, email_body_html = mailer.render(
+        tuple(event.id for event, attendees in updates),
+        "New event attendees",
+        "get_together/emails/events/new_event_attendees.txt",
+        "get_together/emails/events/new_event_attendees.html",
+        context,
     )
-    email_body_html = render_to_string(
-        "get_together/emails/events/new_event_attendees.html", context
-    )
-    email_recipients = [host.email for host in hosts]
-    email_from = getattr(
-        settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
-    )
-
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
+    mailer.send(
+        recipient=host,
+        email=host.email,
         subject=email_subject,
+        body=email_body_text,
+        html_body=email_body_html,
     )
-
-    for host in hosts:
-        EmailRecord.objects.create(
-            sender=None,
-            recipient=host,
-            email=host.email,
-            subject=email_subject,
-            body=email_body_text,
-            ok=success,
-        )
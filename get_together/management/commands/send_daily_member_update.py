@@ -1,80 +1,81 @@
 import datetime
+from collections import OrderedDict
 
-from django.conf import settings
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand, CommandError
-from django.template.loader import get_template, render_to_string
-from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import strip_tags
 
-from accounts.models import EmailRecord
-from events.models import Event, Member
+from accounts.outbox import BulkMailer
+from events.models import Member
+from events.site import get_site
 
 
 class Command(BaseCommand):
     help = "Sends email to team admins about new members"
 
     def handle(self, *args, **options):
-        # members who recently joined
-        members = Member.objects.filter(
-            role=Member.NORMAL,
-            joined_date__gte=timezone.now() - datetime.timedelta(days=1),
-        ).order_by("team")
+        digests = get_member_digests(timezone.now() - datetime.timedelta(days=1))
+        if not digests:
+            return
+        site = get_site()
+        with BulkMailer() as mailer:
+            for admin, updates in digests.values():
+                send_new_members(mailer, site, admin, updates)
 
-        current_team = None
-        new_members = []
-        for member in members:
 
-            if member.team != current_team:
-                send_new_members(current_team, new_members)
-                current_team = member.team
-                new_members = []
-
-            new_members.append(member)
-        if current_team is not None:
-            send_new_members(current_team, new_members)
+def get_member_digests(since):
+    """
+    Groups the members who joined after ``since`` by team, and the teams by the
+    admins who should hear about them. Returns a dict of
+    ``{user_id: (user, [(team, members), ...])}``.
+    """
+    # members who recently joined
+    members = (
+        Member.objects.filter(role=Member.NORMAL, joined_date__gte=since)
+        .select_related("team", "user__user")
+        .order_by("team_id", "joined_date")
+    )
+    new_members = OrderedDict()
+    for member in members:
+        team, team_members = new_members.setdefault(member.team_id, (member.team, []))
+        team_members.append(member)
+    if not new_members:
+        return dict()
 
+    admins = (
+        Member.objects.filter(
+            team_id__in=list(new_members),
+            role=Member.ADMIN,
+            user__user__account__is_email_confirmed=True,
+        )
+        .exclude(user__user__email="")
+        .select_related("user__user")
+        .order_by("team_id")
+    )
+    digests = OrderedDict()
+    for admin in admins:
+        user = admin.user.user
+        digests.setdefault(user.id, (user, []))[1].append(new_members[admin.team_id])
+    return digests
 
-def send_new_members(team, new_members):
-    if len(new_members) < 1:
-        return
-    admins = [
-        member.user.user
-        for member in Member.objects.filter(team=team, role=Member.ADMIN)
-        if member.user.user.account.is_email_confirmed
-    ]
-    if len(admins) < 1:
-        return
-    context = {"team": team, "members": new_members, "site": Site.objects.get(id=1)}
 
-    email_subject = "New members joined team %s" % strip_tags(team.name)
-    email_body_text = render_to_string(
-        "get_together/emails/teams/new_team_members.txt", context
-    )
-    email_body_html = render_to_string(
-        "get_together/emails/teams/new_team_members.html", context
+def send_new_members(mailer, site, admin, updates):
+    if len(updates) == 1:
+        email_subject = "New members joined team %s" % strip_tags(updates[0][0].name)
+    else:
+        email_subject = "New members joined your teams"
+    context = {"updates": updates, "site": site}
+    email_subject, email_body_text, email_body_html = mailer.render(
+        tuple(team.id for team, members in updates),
+        email_subject,
+        "get_together/emails/teams/new_team_members.txt",
+        "get_together/emails/teams/new_team_members.html",
+        context,
     )
-    email_recipients = [admin.email for admin in admins]
-    email_from = getattr(
-        settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
-    )
-
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
+    mailer.send(
+        recipient=admin,
+        email=admin.email,
         subject=email_subject,
+        body=email_body_text,
+        html_body=email_body_html,
     )
-
-    for admin in admins:
-        EmailRecord.objects.create(
-            sender=None,
-            recipient=admin,
-            email=admin.email,
-            subject=email_subject,
-            body=email_body_text,
-            ok=success,
-        )
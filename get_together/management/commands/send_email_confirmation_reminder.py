@@ -1,15 +1,30 @@
 import datetime
 import time
-import urllib
 
-from django.conf import settings
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand, CommandError
-from django.template.loader import get_template, render_to_string
+from django.db.models import Exists, OuterRef
+from django.template.loader import get_template
 from django.urls import reverse
 
-from accounts.models import Account, EmailConfirmation, EmailRecord
+from accounts.models import Account, EmailConfirmation
+from accounts.outbox import BATCH_SIZE, BulkMailer
+from events.site import full_url
+
+PROGRESS_EVERY = 10000  # accounts
+
+
+def get_unconfirmed_accounts():
+    """
+    Returns the unconfirmed accounts with an email address that don't have a
+    confirmation request pending.
+    """
+    pending = EmailConfirmation.objects.filter(user_id=OuterRef("user_id"))
+    return (
+        Account.objects.filter(is_email_confirmed=False)
+        .exclude(user__email="")
+        .annotate(pending=Exists(pending))
+        .filter(pending=False)
+    )
 
 
 class Command(BaseCommand):
@@ -19,71 +34,65 @@ class Command(BaseCommand):
         parser.add_argument(
             "-d", "--days-since-last", dest="days", type=int, default=None
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of accounts to handle at a time",
+        )
 
     def handle(self, *args, **options):
-        site = Site.objects.get(id=1)
-        accounts = Account.objects.filter(is_email_confirmed=False)
-        for account in accounts:
-            if not account.user.email:
-                break  # Skip accounts without an email
-            confirmation_request = EmailConfirmation.objects.filter(user=account.user)
-
-            if "days" in options and options.get("days", None):
-                discard_before = datetime.datetime.now(
-                    tz=datetime.timezone.utc
-                ) - datetime.timedelta(days=options.get("days"))
-                for request in confirmation_request.filter(expires__lte=discard_before):
-                    request.delete()
+        started = time.monotonic()
+        if options.get("days", None):
+            discard_before = datetime.datetime.now(
+                tz=datetime.timezone.utc
+            ) - datetime.timedelta(days=options.get("days"))
+            deleted, _ = EmailConfirmation.objects.filter(
+                expires__lte=discard_before, user__account__is_email_confirmed=False
+            ).delete()
+            print("Removed %s expired confirmation requests" % deleted)
 
-            if confirmation_request.count() > 0:
-                print(
-                    "Confirmation request pending for %s <%s>"
-                    % (account.user.username, account.user.email)
-                )
-                break
+        text_template = get_template("get_together/emails/users/confirm_email.txt")
+        html_template = get_template("get_together/emails/users/confirm_email.html")
+        accounts = get_unconfirmed_accounts().select_related("user").order_by("id")
+        count = 0
+        last_id = 0
+        with BulkMailer(batch_size=options["batch_size"]) as mailer:
+            while True:
+                batch = list(accounts.filter(id__gt=last_id)[: options["batch_size"]])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                requests = [account.make_confirmation_request() for account in batch]
+                EmailConfirmation.objects.bulk_create(requests)
 
-            print(
-                "Sending confirmation email to %s <%s>"
-                % (account.user.username, account.user.email)
-            )
-            confirmation_request = account.new_confirmation_request()
-            confirmation_url = "https://%s%s" % (
-                site.domain,
-                reverse(
-                    "confirm-email",
-                    kwargs={"confirmation_key": confirmation_request.key},
-                ),
-            )
+                for account, confirmation_request in zip(batch, requests):
+                    confirmation_url = full_url(
+                        reverse(
+                            "confirm-email",
+                            kwargs={"confirmation_key": confirmation_request.key},
+                        )
+                    )
+                    context = {
+                        "confirmation": confirmation_request,
+                        "confirmation_url": confirmation_url,
+                    }
+                    mailer.send(
+                        recipient=account.user,
+                        email=account.user.email,
+                        subject="Email confirmation reminder",
+                        body=text_template.render(context),
+                        html_body=html_template.render(context),
+                    )
+                    count += 1
+                    if count % PROGRESS_EVERY == 0:
+                        elapsed = time.monotonic() - started
+                        print(
+                            "%s confirmation emails sent (%d/sec)"
+                            % (count, count / elapsed if elapsed > 0 else 0)
+                        )
 
-            context = {
-                "confirmation": confirmation_request,
-                "confirmation_url": confirmation_url,
-            }
-            email_subject = "Email confirmation reminder"
-            email_body_text = render_to_string(
-                "get_together/emails/users/confirm_email.txt", context
-            )
-            email_body_html = render_to_string(
-                "get_together/emails/users/confirm_email.html", context
-            )
-            email_recipients = [account.user.email]
-            email_from = getattr(
-                settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
-            )
-            success = send_mail(
-                subject=email_subject,
-                message=email_body_text,
-                from_email=email_from,
-                recipient_list=email_recipients,
-                html_message=email_body_html,
-            )
-
-            EmailRecord.objects.create(
-                sender=None,
-                recipient=account.user,
-                email=account.user.email,
-                subject=email_subject,
-                body=email_body_text,
-                ok=success,
-            )
-            time.sleep(0.1)
+        print(
+            "Sent %s confirmation emails, %s failed (%.2fs)"
+            % (mailer.sent, mailer.failed, time.monotonic() - started)
+        )
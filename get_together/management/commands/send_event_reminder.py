@@ -1,79 +1,101 @@
 import datetime
 import time
-import urllib
 
-from django.conf import settings
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Q
-from django.template.loader import get_template, render_to_string
-from django.urls import reverse
 from django.utils import timezone
 
-from accounts.models import EmailRecord
-from events.models import Attendee, Event
+from accounts.outbox import BATCH_SIZE, BulkMailer
+from events.models import Attendee
 
 
-class Command(BaseCommand):
-    help = "Sends upcomming event notifications to attendees."
-
-    def handle(self, *args, **options):
-        site = Site.objects.get(id=1)
-
-        # Events that start within a day.
-        query = Q(
+def get_reminder_candidates(now=None):
+    """
+    Returns the attendees who should be reminded of an event starting within
+    the next day: those who said yes, want notifications, have an email address
+    and haven't been reminded in the last day.
+    """
+    if now is None:
+        now = timezone.now()
+    return (
+        Attendee.objects.filter(
             status=Attendee.YES,
-            event__start_time__gt=timezone.now(),
-            event__start_time__lt=timezone.now() + datetime.timedelta(days=1),
+            event__start_time__gt=now,
+            event__start_time__lt=now + datetime.timedelta(days=1),
+            user__send_notifications=True,
         )
+        .filter(
+            Q(last_reminded__isnull=True)
+            | Q(last_reminded__lte=now - datetime.timedelta(days=1))
+        )
+        .exclude(Q(user__user__email__isnull=True) | Q(user__user__email=""))
+    )
 
-        attendees = Attendee.objects.filter(query)
-
-        for attendee in attendees:
 
-            # Skip people who don't want notificiations or have no email address.
-            if not attendee.user.send_notifications or not attendee.user.user.email:
-                continue
+class Command(BaseCommand):
+    help = "Sends upcomming event notifications to attendees."
 
-            # Skip people who have been reminded in the last day.
-            if (
-                attendee.last_reminded
-                and timezone.now() - datetime.timedelta(days=1) < attendee.last_reminded
-            ):
-                continue
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the reminders that would be sent without sending them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of reminders to send before marking them as reminded",
+        )
 
-            context = {"event": attendee.event}
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+        candidates = get_reminder_candidates(now)
 
-            email_subject = "Upcoming event reminder"
-            email_body_text = render_to_string(
-                "get_together/emails/events/reminder.txt", context
-            )
-            email_body_html = render_to_string(
-                "get_together/emails/events/reminder.html", context
-            )
-            email_recipients = [attendee.user.user.email]
-            email_from = getattr(
-                settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
+        if options["dry_run"]:
+            count = candidates.count()
+            events = candidates.values("event_id").distinct().count()
+            print(
+                "Would send %s reminders for %s events (%.2fs)"
+                % (count, events, time.monotonic() - started)
             )
+            return
 
-            success = send_mail(
-                from_email=email_from,
-                html_message=email_body_html,
-                message=email_body_text,
-                recipient_list=email_recipients,
-                subject=email_subject,
-            )
+        attendees = candidates.select_related(
+            "event", "event__team", "event__place", "user__user"
+        ).order_by("event_id", "id")
+        reminded = []
+        with BulkMailer(batch_size=options["batch_size"]) as mailer:
+            for attendee in attendees.iterator():
+                email_subject, email_body_text, email_body_html = mailer.render(
+                    attendee.event_id,
+                    "Upcoming event reminder",
+                    "get_together/emails/events/reminder.txt",
+                    "get_together/emails/events/reminder.html",
+                    {"event": attendee.event},
+                )
+                mailer.send(
+                    recipient=attendee.user.user,
+                    email=attendee.user.user.email,
+                    subject=email_subject,
+                    body=email_body_text,
+                    html_body=email_body_html,
+                )
+                reminded.append(attendee.id)
+                if len(reminded) >= options["batch_size"]:
+                    mark_reminded(mailer, reminded, now)
+                    reminded = []
+            mark_reminded(mailer, reminded, now)
+
+        print(
+            "Sent %s reminders, %s failed (%.2fs)"
+            % (mailer.sent, mailer.failed, time.monotonic() - started)
+        )
 
-            attendee.last_reminded = timezone.now()
-            attendee.save()
 
-            EmailRecord.objects.create(
-                sender=None,
-                recipient=attendee.user.user,
-                email=attendee.user.user.email,
-                subject=email_subject,
-                body=email_body_text,
-                ok=success,
-            )
-            time.sleep(0.1)
+def mark_reminded(mailer, attendee_ids, now):
+    # Send what's pending first, so that a crash never marks unsent reminders
+    mailer.flush()
+    if attendee_ids:
+        Attendee.objects.filter(id__in=attendee_ids).update(last_reminded=now)
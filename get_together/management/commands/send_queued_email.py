@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import BATCH_SIZE, send_queued
+
+
+class Command(BaseCommand):
+    help = "Sends the emails waiting in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of emails to send over each connection",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="Maximum number of emails to send per second",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, checking the outbox every --interval seconds",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options["batch_size"], rate=options["rate"])
+            if sent or failed:
+                print("Sent %s emails, %s failed" % (sent, failed))
+            if not options["loop"]:
+                break
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
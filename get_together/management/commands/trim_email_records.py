@@ -0,0 +1,59 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import EmailRecord
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Removes the bodies of old email records, or deletes the records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "EMAIL_RECORD_RETENTION_DAYS", 90),
+            help="Keep the bodies of emails sent within this many days",
+        )
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Delete the old records instead of only trimming their bodies",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        before = timezone.now() - datetime.timedelta(days=options["days"])
+        # Queued emails still need their bodies, however old they are
+        old_records = EmailRecord.objects.filter(when__lt=before).exclude(
+            status=EmailRecord.QUEUED
+        )
+        if not options["delete"]:
+            old_records = old_records.exclude(body="", html_body__isnull=True)
+
+        total = 0
+        while True:
+            ids = list(
+                old_records.order_by("id").values_list("id", flat=True)[
+                    : options["batch_size"]
+                ]
+            )
+            if not ids:
+                break
+            batch = EmailRecord.objects.filter(id__in=ids)
+            if options["delete"]:
+                batch.delete()
+            else:
+                batch.update(body="", html_body=None)
+            total += len(ids)
+
+        if options["delete"]:
+            print("Deleted %s email records older than %s" % (total, before))
+        else:
+            print("Trimmed %s email records older than %s" % (total, before))
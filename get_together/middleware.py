@@ -0,0 +1,15 @@
+from django.utils.deprecation import MiddlewareMixin
+
+
+class UserProfileMiddleware(MiddlewareMixin):
+    """
+    Loads the signed in user's profile and account once, up front, so that
+    every later use of ``request.user.profile`` and ``request.user.account``
+    in views, templates and permission checks reuses the same objects.
+    """
+
+    def process_request(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            user.profile
+            user.account
@@ -33,6 +33,16 @@ ALLOWED_HOSTS = []
 SITE_ID = 1
 ADMINS = ["mhall119"]
 ALLOWED_EMAILS_PER_DAY = 100
+EMAIL_OUTBOX = False  # Queue emails for the send_queued_email command
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+EMAIL_RATE_LIMIT = None  # emails per second
+EMAIL_RATE_BURST = 1  # emails sent without waiting for the rate limit
+EMAIL_QUOTA_CACHE_ALIAS = None  # A cache shared by all workers, see local_settings
+EMAIL_RECORD_RETENTION_DAYS = 90  # See the trim_email_records command
+EMAIL_BLOCKLIST = []  # Added to the built in disposable email domains
+EMAIL_ALLOWLIST = []
+EMAIL_BLOCKLIST_FILE = None  # A file with one blocked domain per line
 
 
 # Application definition
@@ -81,6 +91,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "get_together.middleware.UserProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.contrib.flatpages.middleware.FlatpageFallbackMiddleware",
@@ -169,7 +180,23 @@ MEDIA_URL = "/media/"
 MATOMO_HOST = None
 MATOMO_SITE_ID = None
 
+FRAGMENT_CACHE_ALIAS = None  # A cache shared by all workers, see local_settings
+FRAGMENT_CACHE_TTL = 60 * 10  # seconds, for the cached parts of public pages
+ICAL_CACHE_TTL = 60 * 10  # seconds, for the rendered calendar feeds
+FEED_TOKEN_CACHE_ALIAS = None  # A cache shared by all workers, see local_settings
+FEED_TOKEN_CACHE_TTL = 60 * 60  # seconds
+FEED_TOKEN_NEGATIVE_CACHE_SIZE = 10000  # unknown feed tokens kept in memory
+FEED_TOKEN_NEGATIVE_CACHE_TTL = 60 * 10  # seconds
+MARKDOWN_CACHE_SIZE = 1000  # rendered Markdown texts kept in memory
+MARKDOWN_CACHE_TTL = 60 * 60 * 24  # seconds
+
+GEOIP_PROVIDER = "ipstack"  # or "database" to use GEOIP_DATABASE
+GEOIP_DATABASE = None
 IPSTACK_ACCESS_KEY = None
+IPSTACK_TIMEOUT = 2  # seconds
+GEOIP_CACHE_ALIAS = "default"
+GEOIP_CACHE_TTL = 60 * 60 * 24  # seconds
+GEOIP_NEGATIVE_CACHE_TTL = 60 * 10  # seconds
 GOOGLE_ANALYTICS_ID = None
 GOOGLE_MAPS_API_KEY = None
 SOCIAL_AUTH_GITHUB_KEY = None
@@ -201,6 +228,7 @@ SETTINGS_EXPORT = [
     "IPSTACK_ACCESS_KEY",
     "MATOMO_SITE_ID",
     "MATOMO_HOST",
+    "FRAGMENT_CACHE_TTL",
 ]
 
 
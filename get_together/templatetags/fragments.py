@@ -0,0 +1,62 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from events.fragments import get_cache, get_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment_version(kind, obj_id):
+    """
+    Returns the current version of an object's cached fragments, to vary
+    ``{% fragment_cache %}`` on along with the active language::
+
+        {% fragment_version "event" event.id as version %}
+        {% get_current_language as LANGUAGE_CODE %}
+        {% fragment_cache 600 event_sponsors event.id version LANGUAGE_CODE %}
+            ...
+        {% endfragment_cache %}
+    """
+    return get_version(kind, obj_id)
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        cache = get_cache()
+        if cache is None:
+            return self.nodelist.render(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        value = cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, int(self.expire_time.resolve(context)))
+        return value
+
+
+@register.tag
+def fragment_cache(parser, token):
+    """
+    Like ``{% cache %}``, but kept in the shared fragment cache from
+    ``events.fragments``, and rendered every time when there isn't one.
+    """
+    nodelist = parser.parse(("endfragment_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            "%r tag requires at least 2 arguments." % tokens[0]
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -12,6 +12,8 @@ markup syntaxes to HTML; currently there is support for:
 
     * reStructuredText, which requires docutils from http://docutils.sf.net/
 """
+import hashlib
+import threading
 
 from django import template
 from django.conf import settings
@@ -20,8 +22,32 @@ from django.utils.safestring import mark_safe
 
 import markdown as md
 
+from events.utils import MISSING, LRUCache
+
 register = template.Library()
 
+# Rendered HTML keyed by a hash of the Markdown source, so the same text is
+# only converted once however many pages and requests show it.
+RENDERED = LRUCache(getattr(settings, "MARKDOWN_CACHE_SIZE", 1000))
+RENDERED_TTL = getattr(settings, "MARKDOWN_CACHE_TTL", 60 * 60 * 24)  # seconds
+
+_markdown = md.Markdown()
+_markdown_lock = threading.Lock()
+
+
+def render_markdown(value):
+    """
+    Converts ``value`` with a shared Markdown instance, or returns the HTML
+    from the last time it was converted.
+    """
+    key = hashlib.sha1(value.encode("utf-8")).digest()
+    html = RENDERED.get(key)
+    if html is MISSING:
+        with _markdown_lock:
+            html = _markdown.reset().convert(value)
+        RENDERED.set(key, html, RENDERED_TTL)
+    return html
+
 
 @register.filter
 @stringfilter
@@ -42,7 +68,7 @@ def markdown(value, arg=""):
     they will be silently ignored.
 
     """
-    return mark_safe(md.markdown(value))
+    return mark_safe(render_markdown(value))
 
 
 @register.filter
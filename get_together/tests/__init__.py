@@ -1,7 +1,12 @@
 from django.test import TestCase
 
+from .attendee_emails import *
+from .confirmation_reminder import *
+from .daily_updates import *
 from .event_reminder import *
 from .events import *
+from .fragments import *
+from .markup import *
 from .speakers import *
 from .teams import *
 from .users import *
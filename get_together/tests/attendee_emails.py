@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from model_mommy import mommy
+
+from accounts.models import EmailRecord
+from events.models.events import Attendee, Event
+from events.models.profiles import Member, Team
+
+
+@override_settings(EMAIL_OUTBOX=True)
+class AttendeeEmailTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = mommy.make(Team)
+        self.event = mommy.make(Event, team=self.team)
+        self.host = self.make_user("host@gettogether.community")
+        mommy.make(Member, team=self.team, user=self.host.profile, role=Member.ADMIN)
+        self.client = Client()
+        self.client.force_login(self.host)
+
+    def make_user(self, email, confirmed=True):
+        user = mommy.make(User, email=email)
+        account = user.account
+        account.is_email_confirmed = confirmed
+        account.save()
+        return user
+
+    def add_members(self, count):
+        users = []
+        for i in range(count):
+            user = self.make_user("member%s-%s@gettogether.community" % (count, i))
+            mommy.make(Member, team=self.team, user=user.profile)
+            users.append(user)
+        return users
+
+    def test_invitable_members(self):
+        invited, attending = self.add_members(2)
+        mommy.make(Attendee, event=self.event, user=attending.profile)
+        unconfirmed = self.make_user("unconfirmed@gettogether.community", False)
+        mommy.make(Member, team=self.team, user=unconfirmed.profile)
+
+        with self.assertNumQueries(1):
+            members = list(self.event.invitable_members())
+        assert {member.user.user for member in members} == {self.host, invited}
+
+    def invite_all(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("invite-attendees", kwargs={"event_id": self.event.id}),
+                {"form": "team", "member": "all"},
+            )
+        assert response.status_code == 302
+        return len(queries)
+
+    def test_invite_all_members(self):
+        self.add_members(2)
+        queries = self.invite_all()
+        assert EmailRecord.objects.filter(status=EmailRecord.QUEUED).count() == 3
+
+        EmailRecord.objects.all().delete()
+        self.add_members(8)
+        assert self.invite_all() == queries
+        assert EmailRecord.objects.filter(status=EmailRecord.QUEUED).count() == 11
+
+    def test_contact_all_attendees(self):
+        for user in self.add_members(3):
+            mommy.make(Attendee, event=self.event, user=user.profile)
+        unconfirmed = self.make_user("unconfirmed@gettogether.community", False)
+        mommy.make(Attendee, event=self.event, user=unconfirmed.profile)
+
+        response = self.client.post(
+            reverse("manage-attendees", kwargs={"event_id": self.event.id}),
+            {"to": "all", "body": "See you there"},
+        )
+        assert response.status_code == 302
+        records = EmailRecord.objects.filter(status=EmailRecord.QUEUED)
+        assert records.count() == 3
+        assert not records.filter(email="unconfirmed@gettogether.community").exists()
+        assert all("See you there" in record.body for record in records)
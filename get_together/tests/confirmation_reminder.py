@@ -0,0 +1,54 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+
+from model_mommy import mommy
+
+from accounts.models import EmailConfirmation
+
+
+class EmailConfirmationReminderTest(TestCase):
+    def make_user(self, email):
+        user = mommy.make(User, email=email)
+        user.account  # Creates the unconfirmed account
+        return user
+
+    def test_reminders(self):
+        self.make_user("")
+        pending = self.make_user("pending@gettogether.community")
+        pending.account.new_confirmation_request()
+        confirmed = self.make_user("confirmed@gettogether.community")
+        confirmed.account.is_email_confirmed = True
+        confirmed.account.save()
+        unconfirmed = [
+            self.make_user("user%s@gettogether.community" % i) for i in range(3)
+        ]
+
+        # An account without an email or with a pending request used to stop
+        # the whole run
+        call_command("send_email_confirmation_reminder", batch_size=2)
+        self.assertEquals(len(mail.outbox), 3)
+        self.assertEquals(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(user.email for user in unconfirmed),
+        )
+        bodies = "".join(message.body for message in mail.outbox)
+        for user in unconfirmed:
+            confirmation = EmailConfirmation.objects.get(user=user)
+            self.assertIn(confirmation.key, bodies)
+
+        call_command("send_email_confirmation_reminder")
+        self.assertEquals(len(mail.outbox), 3)
+
+    def test_expired_requests_are_replaced(self):
+        user = self.make_user("user@gettogether.community")
+        confirmation = user.account.new_confirmation_request()
+        confirmation.expires = datetime.datetime.now() - datetime.timedelta(days=10)
+        confirmation.save()
+
+        call_command("send_email_confirmation_reminder", days=5)
+        self.assertEquals(len(mail.outbox), 1)
+        self.assertFalse(EmailConfirmation.objects.filter(id=confirmation.id).exists())
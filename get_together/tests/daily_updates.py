@@ -0,0 +1,78 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from events.models.events import Attendee, Event
+from events.models.profiles import Member, Team, UserProfile
+
+
+class DailyUpdateTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.host = mommy.make(User, email="host@gettogether.community")
+        self.host.account.is_email_confirmed = True
+        self.host.account.save()
+
+    def make_profile(self, email=""):
+        return mommy.make(UserProfile, user=mommy.make(User, email=email))
+
+    def test_attendee_digest(self):
+        events = mommy.make(Event, _quantity=3)
+        for event in events:
+            mommy.make(
+                Attendee, event=event, user=self.host.profile, role=Attendee.HOST
+            )
+            for i in range(2):
+                mommy.make(
+                    Attendee,
+                    event=event,
+                    user=self.make_profile(),
+                    role=Attendee.NORMAL,
+                    joined_date=timezone.now(),
+                )
+        unconfirmed = self.make_profile("unconfirmed@gettogether.community")
+        mommy.make(Attendee, event=events[0], user=unconfirmed, role=Attendee.HOST)
+
+        Site.objects.clear_cache()
+        with self.assertNumQueries(4):
+            # Attendees, hosts, the site and the email records, however many
+            # attendees and events there are
+            call_command("send_daily_attendee_update")
+        self.assertEquals(len(mail.outbox), 1)
+        self.assertEquals(mail.outbox[0].to, ["host@gettogether.community"])
+        for event in events:
+            self.assertIn(event.name, mail.outbox[0].body)
+
+    def test_no_new_attendees(self):
+        event = mommy.make(Event)
+        mommy.make(Attendee, event=event, user=self.host.profile, role=Attendee.HOST)
+        mommy.make(
+            Attendee,
+            event=event,
+            user=self.make_profile(),
+            role=Attendee.NORMAL,
+            joined_date=timezone.now() - datetime.timedelta(days=2),
+        )
+
+        with self.assertNumQueries(1):
+            call_command("send_daily_attendee_update")
+        self.assertEquals(len(mail.outbox), 0)
+
+    def test_member_digest(self):
+        teams = mommy.make(Team, _quantity=2)
+        for team in teams:
+            mommy.make(Member, team=team, user=self.host.profile, role=Member.ADMIN)
+            mommy.make(Member, team=team, user=self.make_profile(), role=Member.NORMAL)
+
+        call_command("send_daily_member_update")
+        self.assertEquals(len(mail.outbox), 1)
+        self.assertEquals(mail.outbox[0].subject, "New members joined your teams")
+        for team in teams:
+            self.assertIn(team.name, mail.outbox[0].body)
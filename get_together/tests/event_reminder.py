@@ -1,6 +1,7 @@
 import datetime
 
 from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
 from django.core import mail
 from django.core.management import call_command
 from django.test import TestCase
@@ -89,3 +90,51 @@ class UpcommingEventReminderTest(TestCase):
 
         call_command("send_event_reminder")
         self.assertEquals(len(mail.outbox), 1)
+
+    def test_reminders_skip_ineligible_attendees(self):
+        mommy.make(
+            Attendee, event=self.event, user=self.userProfile, status=Attendee.NO
+        )
+        quiet = mommy.make(
+            UserProfile,
+            user=mommy.make(User, email="quiet@gettogether.community"),
+            send_notifications=False,
+        )
+        mommy.make(Attendee, event=self.event, user=quiet, status=Attendee.YES)
+        no_email = mommy.make(
+            UserProfile, user=mommy.make(User, email=""), send_notifications=True
+        )
+        mommy.make(Attendee, event=self.event, user=no_email, status=Attendee.YES)
+
+        call_command("send_event_reminder")
+        self.assertEquals(len(mail.outbox), 0)
+
+    def test_reminder_queries_do_not_grow_with_attendees(self):
+        for i in range(5):
+            profile = mommy.make(
+                UserProfile,
+                user=mommy.make(User, email="user%s@gettogether.community" % i),
+                send_notifications=True,
+            )
+            mommy.make(Attendee, event=self.event, user=profile, status=Attendee.YES)
+
+        # Select the attendees, look up the Site for the reminder's URLs,
+        # record the emails and mark them as reminded
+        Site.objects.clear_cache()
+        with self.assertNumQueries(4):
+            call_command("send_event_reminder")
+        self.assertEquals(len(mail.outbox), 5)
+        self.assertEquals(
+            Attendee.objects.filter(last_reminded__isnull=True).count(), 0
+        )
+
+    def test_dry_run(self):
+        attendee = mommy.make(
+            Attendee, event=self.event, user=self.userProfile, status=Attendee.YES
+        )
+
+        call_command("send_event_reminder", dry_run=True)
+
+        self.assertEquals(len(mail.outbox), 0)
+        attendee.refresh_from_db()
+        self.assertIsNone(attendee.last_reminded)
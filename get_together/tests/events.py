@@ -2,14 +2,30 @@ import datetime
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.shortcuts import resolve_url
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
 import mock
+from accounts.models import Badge, BadgeGrant
 from events.ipstack import IPStackResult
-from events.models import Attendee, City, Event, Member, Place, Team, UserProfile
+from events.models import (
+    Attendee,
+    City,
+    Event,
+    EventComment,
+    Member,
+    Place,
+    Presentation,
+    Sponsor,
+    Talk,
+    Team,
+    UserProfile,
+)
 from model_mommy import mommy
 
 # Create your tests here.
@@ -100,6 +116,76 @@ class EventDisplayTests(TestCase):
         response = c.get(event.get_absolute_url())
         assert response.status_code == 200
 
+    def add_event_details(self, event, count):
+        badge = mommy.make(Badge)
+        for i in range(count):
+            user = mommy.make(User)
+            mommy.make(BadgeGrant, badge=badge, account=user.account)
+            mommy.make(Attendee, event=event, user=user.profile, status=Attendee.YES)
+            comment = EventComment.objects.create(
+                event=event, author=user.profile, body="Comment"
+            )
+            EventComment.objects.create(
+                event=event, author=user.profile, body="Reply", parent=comment
+            )
+            talk = mommy.make(Talk, speaker__user=user.profile)
+            mommy.make(
+                Presentation, event=event, talk=talk, status=Presentation.ACCEPTED
+            )
+            event.sponsors.add(mommy.make(Sponsor, logo=""))
+
+    def count_show_event_queries(self, client, event):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(event.get_absolute_url())
+        assert response.status_code == 200
+        return len(queries)
+
+    def test_show_event_queries_dont_grow_with_attendees(self):
+        event = mommy.make(Event, enable_comments=True, enable_presentations=True)
+        user = mommy.make(User)
+        mommy.make(Attendee, event=event, user=user.profile, status=Attendee.NO)
+        c = Client()
+        c.force_login(user)
+        c.get(event.get_absolute_url())  # Sets up the viewer's account
+
+        self.add_event_details(event, 1)
+        queries = self.count_show_event_queries(c, event)
+        self.add_event_details(event, 5)
+        assert self.count_show_event_queries(c, event) == queries
+
+    @override_settings(FRAGMENT_CACHE_ALIAS="default")
+    def test_cached_fragments_skip_their_queries(self):
+        event = mommy.make(Event, enable_presentations=True)
+        self.add_event_details(event, 2)
+        cache.clear()
+        c = Client()
+        c.get(event.get_absolute_url())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = c.get(event.get_absolute_url())
+        assert response.status_code == 200
+        assert response.context["sponsor_count"] == 2
+        for query in queries.captured_queries:
+            for table in (Attendee, Presentation, Sponsor):
+                assert 'FROM "%s"' % table._meta.db_table not in query["sql"]
+
+    def test_show_event_attendance(self):
+        event = mommy.make(Event)
+        user = mommy.make(User)
+        mommy.make(Attendee, event=event, user=user.profile, status=Attendee.MAYBE)
+        mommy.make(Attendee, event=event, status=Attendee.YES)
+        c = Client()
+
+        response = c.get(event.get_absolute_url())
+        assert response.context["attendee_count"] == 1
+        assert not response.context["is_attending"]
+
+        c.force_login(user)
+        response = c.get(event.get_absolute_url())
+        assert response.context["attendee_count"] == 1
+        assert response.context["is_attending"]
+
     def test_private_team_event_hidden_for_non_members(self):
         team = mommy.make(Team, slug="private_team")
         team.access = Team.PRIVATE
@@ -0,0 +1,159 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from model_mommy import mommy
+
+from accounts.models import BadgeGrant
+from events.fragments import EVENT, ORG, TEAM, get_version
+from events.models import Attendee, Event, Member, Organization, Sponsor, Team
+
+
+@override_settings(FRAGMENT_CACHE_ALIAS="default")
+class FragmentVersionTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.org = mommy.make(Organization)
+        self.team = mommy.make(Team, organization=self.org)
+        self.event = mommy.make(Event, team=self.team)
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_version_is_stable(self):
+        assert get_version(EVENT, self.event.id) == get_version(EVENT, self.event.id)
+
+    def test_member_bumps_team_and_org(self):
+        team_version = get_version(TEAM, self.team.id)
+        org_version = get_version(ORG, self.org.id)
+        event_version = get_version(EVENT, self.event.id)
+
+        member = mommy.make(Member, team=self.team)
+        assert get_version(TEAM, self.team.id) != team_version
+        assert get_version(ORG, self.org.id) != org_version
+        assert get_version(EVENT, self.event.id) == event_version
+
+        team_version = get_version(TEAM, self.team.id)
+        member.delete()
+        assert get_version(TEAM, self.team.id) != team_version
+
+    def test_attendee_bumps_event(self):
+        event_version = get_version(EVENT, self.event.id)
+        team_version = get_version(TEAM, self.team.id)
+
+        mommy.make(Attendee, event=self.event)
+        assert get_version(EVENT, self.event.id) != event_version
+        assert get_version(TEAM, self.team.id) == team_version
+
+    def test_sponsor_bumps_its_events(self):
+        sponsor = mommy.make(Sponsor, logo="")
+        self.event.sponsors.add(sponsor)
+        other_event = mommy.make(Event, team=self.team)
+        event_version = get_version(EVENT, self.event.id)
+        other_version = get_version(EVENT, other_event.id)
+
+        sponsor.name = "Renamed"
+        sponsor.save()
+        assert get_version(EVENT, self.event.id) != event_version
+        assert get_version(EVENT, other_event.id) == other_version
+
+        event_version = get_version(EVENT, self.event.id)
+        sponsor.delete()
+        assert get_version(EVENT, self.event.id) != event_version
+
+    def test_profile_and_badges_bump_their_events_and_teams(self):
+        user = mommy.make(User)
+        mommy.make(Attendee, event=self.event, user=user.profile)
+        mommy.make(Member, team=self.team, user=user.profile)
+
+        for change in ("profile", "grant", "badge"):
+            event_version = get_version(EVENT, self.event.id)
+            team_version = get_version(TEAM, self.team.id)
+            if change == "profile":
+                user.profile.realname = "Renamed"
+                user.profile.save()
+            elif change == "grant":
+                grant = mommy.make(BadgeGrant, account=user.account)
+            else:
+                grant.badge.name = "Renamed"
+                grant.badge.save()
+            assert get_version(EVENT, self.event.id) != event_version, change
+            assert get_version(TEAM, self.team.id) != team_version, change
+
+    def test_event_bumps_team(self):
+        team_version = get_version(TEAM, self.team.id)
+        self.event.name = "Renamed"
+        self.event.save()
+        assert get_version(TEAM, self.team.id) != team_version
+
+
+@override_settings(FRAGMENT_CACHE_ALIAS="default")
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.team = mommy.make(Team)
+        self.event = mommy.make(Event, team=self.team)
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_team_members_update(self):
+        c = Client()
+        response = c.get(self.team.get_absolute_url())
+        assert response.status_code == 200
+
+        user = mommy.make(User, first_name="Fragment", last_name="Tester")
+        mommy.make(Member, team=self.team, user=user.profile)
+        response = c.get(self.team.get_absolute_url())
+        self.assertContains(response, str(user.profile))
+
+    def test_event_attendees_update(self):
+        c = Client()
+        response = c.get(self.event.get_absolute_url())
+        assert response.status_code == 200
+
+        user = mommy.make(User, first_name="Fragment", last_name="Tester")
+        mommy.make(Attendee, event=self.event, user=user.profile, status=Attendee.YES)
+        response = c.get(self.event.get_absolute_url())
+        self.assertContains(response, str(user.profile))
+
+    def test_sponsors_update(self):
+        sponsor = mommy.make(Sponsor, name="Old Sponsor", logo="")
+        self.event.sponsors.add(sponsor)
+        c = Client()
+        self.assertContains(c.get(self.event.get_absolute_url()), "Old Sponsor")
+
+        sponsor.name = "New Sponsor"
+        sponsor.save()
+        self.assertContains(c.get(self.event.get_absolute_url()), "New Sponsor")
+
+    def test_fragments_vary_on_language(self):
+        mommy.make(Attendee, event=self.event, status=Attendee.YES)
+        c = Client()
+        c.get(self.event.get_absolute_url(), HTTP_ACCEPT_LANGUAGE="en")
+
+        attendees = 'FROM "%s"' % Attendee._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            c.get(self.event.get_absolute_url(), HTTP_ACCEPT_LANGUAGE="en")
+        assert not any(attendees in query["sql"] for query in queries)
+        with CaptureQueriesContext(connection) as queries:
+            c.get(self.event.get_absolute_url(), HTTP_ACCEPT_LANGUAGE="fr")
+        assert any(attendees in query["sql"] for query in queries)
+
+    @override_settings(FRAGMENT_CACHE_ALIAS=None)
+    def test_nothing_cached_without_shared_cache(self):
+        mommy.make(Attendee, event=self.event, status=Attendee.YES)
+        c = Client()
+        c.get(self.event.get_absolute_url())
+
+        attendees = 'FROM "%s"' % Attendee._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            c.get(self.event.get_absolute_url())
+        assert any(attendees in query["sql"] for query in queries)
+        assert get_version(EVENT, self.event.id) is None
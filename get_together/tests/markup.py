@@ -0,0 +1,33 @@
+from django.template import Context, Template
+from django.test import TestCase
+
+import markdown as md
+import mock
+
+from get_together.templatetags import markup
+
+
+class MarkdownFilterTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        markup.RENDERED.clear()
+
+    def test_matches_markdown(self):
+        text = (
+            "# Title\n\nSome *text* with a [link](https://example.com)\n\n* one\n* two"
+        )
+        rendered = Template("{% load markup %}{{ text|markdown }}").render(
+            Context({"text": text})
+        )
+        assert rendered == md.markdown(text)
+        assert markup.render_markdown("") == md.markdown("")
+
+    def test_rendered_once(self):
+        with mock.patch.object(
+            markup._markdown, "convert", wraps=markup._markdown.convert
+        ) as convert:
+            first = markup.render_markdown("Some **text**")
+            assert markup.render_markdown("Some **text**") == first
+            assert convert.call_count == 1
+            markup.render_markdown("Other **text**")
+            assert convert.call_count == 2
@@ -1,9 +1,10 @@
 import datetime
+import tempfile
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.shortcuts import resolve_url
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -49,3 +50,25 @@ class UserCreationTests(TestCase):
         c.force_login(user)
         response = c.get(email_confirmation_url)
         assert response.status_code == 302
+
+    def test_blocked_subdomains(self):
+        settings.EMAIL_BLOCKLIST = ["Blocked.Example.net"]
+        assert is_blocked_email("user@blocked.example.net")
+        assert is_blocked_email("user@mail.BLOCKED.example.net")
+        assert not is_blocked_email("user@example.net")
+        assert not is_blocked_email("user@notblocked.example.net")
+        assert is_blocked_email("user@yopmail.com")
+
+        settings.EMAIL_ALLOWLIST = ["user@yopmail.com", "good.blocked.example.net"]
+        assert not is_blocked_email("user@yopmail.com")
+        assert is_blocked_email("other@yopmail.com")
+        assert not is_blocked_email("user@good.blocked.example.net")
+
+    def test_blocklist_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as blocklist_file:
+            blocklist_file.write("# Disposable domains\n\nfromfile.example.net\n")
+            blocklist_file.flush()
+            assert not is_blocked_email("user@fromfile.example.net")
+            with override_settings(EMAIL_BLOCKLIST_FILE=blocklist_file.name):
+                assert is_blocked_email("user@fromfile.example.net")
+            assert not is_blocked_email("user@fromfile.example.net")
@@ -1,5 +1,4 @@
 import datetime
-import math
 import traceback
 
 from django.conf import settings
@@ -14,7 +13,7 @@ import geocoder
 import simple_ga as ga
 import simplejson
 from accounts.decorators import setup_wanted
-from events import location
+from events import geoindex, location
 from events.forms import SearchForm, SearchTeamsByName
 from events.models.events import Attendee, Event, Place
 from events.models.locale import City
@@ -32,8 +31,6 @@ from .teams import *
 from .user import *
 from .utils import *
 
-KM_PER_DEGREE_LAT = 110.574
-KM_PER_DEGREE_LNG = 111.320  # At the equator
 DEFAULT_NEAR_DISTANCE = 100  # kilometeres
 # Create your views here.
 
@@ -80,31 +77,7 @@ def home(request, *args, **kwards):
                 context["geoip_lookup"] = True
 
                 try:
-                    city_distance = 1  # km
-                    while city is None and city_distance < 100:
-                        minlat = ll[0] - (city_distance / KM_PER_DEGREE_LAT)
-                        maxlat = ll[0] + (city_distance / KM_PER_DEGREE_LAT)
-                        minlng = ll[1] - (
-                            city_distance
-                            / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
-                        )
-                        maxlng = ll[1] + (
-                            city_distance
-                            / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
-                        )
-                        nearby_cities = City.objects.filter(
-                            latitude__gte=minlat,
-                            latitude__lte=maxlat,
-                            longitude__gte=minlng,
-                            longitude__lte=maxlng,
-                        )
-                        if len(nearby_cities) == 0:
-                            city_distance += 1
-                        else:
-                            city = sorted(
-                                nearby_cities,
-                                key=lambda city: location.city_distance_from(ll, city),
-                            )[0]
+                    city = location.get_nearest_city(ll)
 
                     if (
                         request.user.is_authenticated
@@ -128,69 +101,47 @@ def home(request, *args, **kwards):
         context["latitude"] = ll[0]
         context["longitude"] = ll[1]
         try:
-            minlat = ll[0] - (near_distance / KM_PER_DEGREE_LAT)
-            maxlat = ll[0] + (near_distance / KM_PER_DEGREE_LAT)
-            minlng = ll[1] - (
-                near_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
-            )
-            maxlng = ll[1] + (
-                near_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(ll[0])))
+            minlat, maxlat, minlng, maxlng = location.get_bounding_box(
+                ll, near_distance
             )
             context["minlat"] = minlat
             context["maxlat"] = maxlat
             context["minlng"] = minlng
             context["maxlng"] = maxlng
 
-            near_events = Searchable.objects.filter(
-                latitude__gte=minlat,
-                latitude__lte=maxlat,
-                longitude__gte=minlng,
-                longitude__lte=maxlng,
-                end_time__gte=datetime.datetime.now(),
+            upcoming_events = Searchable.objects.filter(
+                end_time__gte=datetime.datetime.now()
             )
+            near_events = upcoming_events
             if context["name"]:
                 near_events = near_events.filter(
                     Q(event_title__icontains=context["name"])
                     | Q(group_name__icontains=context["name"])
                 )
-            context["near_events"] = sorted(
-                near_events,
-                key=lambda searchable: location.searchable_distance_from(
-                    ll, searchable
-                ),
+            context["near_events"] = geoindex.nearest(
+                near_events, ll, radius=near_distance
             )
 
             #            # If there aren't any teams in the user's geoip area, show them the closest ones
-            if context["geoip_lookup"] and len(near_events) < 1:
-                context["closest_events"] = sorted(
-                    Searchable.objects.filter(end_time__gte=datetime.datetime.now()),
-                    key=lambda searchable: location.searchable_distance_from(
-                        ll, searchable
-                    ),
-                )[:3]
+            if context["geoip_lookup"] and len(context["near_events"]) < 1:
+                context["closest_events"] = geoindex.nearest(upcoming_events, ll, k=3)
 
             near_teams = Team.objects.filter(
-                city__latitude__gte=minlat,
-                city__latitude__lte=maxlat,
-                city__longitude__gte=minlng,
-                city__longitude__lte=maxlng,
-            ).filter(
                 Q(access=Team.PUBLIC)
                 | Q(access=Team.PRIVATE, members=request.user.profile)
             )
             if context["name"]:
                 near_teams = near_teams.filter(name__icontains=context["name"])
             near_teams = near_teams.distinct()
-            context["near_teams"] = sorted(
-                near_teams, key=lambda team: location.team_distance_from(ll, team)
+            context["near_teams"] = geoindex.nearest(
+                near_teams, ll, radius=near_distance, prefix="city__"
             )
 
             #            # If there aren't any teams in the user's geoip area, show them the closest ones
-            if context["geoip_lookup"] and len(near_teams) < 1:
-                context["closest_teams"] = sorted(
-                    Team.public_objects.all(),
-                    key=lambda team: location.team_distance_from(ll, team),
-                )[:3]
+            if context["geoip_lookup"] and len(context["near_teams"]) < 1:
+                context["closest_teams"] = geoindex.nearest(
+                    Team.public_objects.all(), ll, k=3, prefix="city__"
+                )
         except Exception as err:
             print("Error looking up nearby teams and events", err)
             traceback.print_exc()
@@ -4,9 +4,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.template.loader import get_template, render_to_string
@@ -17,7 +15,8 @@ from django.utils.translation import ugettext_lazy as _
 
 import simple_ga as ga
 import simplejson
-from accounts.models import EmailRecord
+from accounts.models import prefetch_accounts
+from accounts.outbox import queue_bulk_mail, queue_mail
 from events import location
 from events.forms import (
     CancelEventForm,
@@ -49,6 +48,7 @@ from events.models.events import (
 from events.models.profiles import Member, Organization, Sponsor, Team, UserProfile
 from events.models.search import delete_event_searchable, update_event_searchable
 from events.models.speakers import Presentation, Speaker, SpeakerRequest, Talk
+from events.site import get_site
 from events.utils import verify_csrf
 
 
@@ -88,34 +88,73 @@ def events_list_all(request, *args, **kwargs):
 
 
 def show_event(request, event_id, event_slug):
-    event = get_object_or_404(Event, id=event_id)
-    if event.team.access == Team.PRIVATE and not request.user.profile.is_in_team(
-        event.team
-    ):
+    profile = request.user.profile
+    events = Event.objects.select_related(
+        "team", "team__owner_profile", "place", "parent", "series"
+    ).annotate(
+        attendee_count=Count(
+            "attendee", filter=Q(attendee__status=Attendee.YES), distinct=True
+        ),
+        sponsor_count=Count("sponsors", distinct=True),
+    )
+    if profile.id is not None:
+        events = events.annotate(
+            attending_count=Count(
+                "attendee", filter=Q(attendee__user=profile), distinct=True
+            )
+        )
+    event = get_object_or_404(events, id=event_id)
+    if event.team.access == Team.PRIVATE and not profile.is_in_team(event.team):
         raise Http404()
-    comment_form = EventCommentForm()
+    can_edit_event = profile.can_edit_event(event)
+
+    # The attendee, presentation and sponsor lists are only loaded when their
+    # cached fragments have to be rendered again
+    attendee_list = (
+        Attendee.objects.filter(event=event)
+        .select_related("user", "user__user", "user__user__account")
+        .prefetch_related("user__user__account__badges")
+        .order_by("-role", "-status")
+    )
+    presentation_list = []
+    pending_presentations = 0
+    if event.enable_presentations:
+        presentation_list = (
+            event.presentations.filter(status=Presentation.ACCEPTED)
+            .select_related("talk", "talk__speaker", "talk__speaker__user__user")
+            .order_by("start_time")
+        )
+        if can_edit_event:
+            pending_presentations = event.presentations.filter(
+                status=Presentation.PROPOSED
+            ).count()
+    comment_list = []
+    if event.enable_comments:
+        comment_list = list(
+            event.comments.select_related(
+                "author", "author__user", "author__user__account"
+            )
+            .prefetch_related("author__user__account__badges")
+            .order_by("tree_id", "lft")
+        )
+        for comment in comment_list:
+            comment.event = event
+
     context = {
         "team": event.team,
         "event": event,
-        "comment_form": comment_form,
-        "sponsor_count": event.sponsors.count(),
+        "comment_form": EventCommentForm(),
+        "comment_list": comment_list,
+        "sponsor_count": event.sponsor_count,
         "sponsor_list": event.sponsors.all(),
-        "is_attending": request.user.profile in event.attendees.all(),
-        "attendee_list": Attendee.objects.filter(event=event).order_by(
-            "-role", "-status"
-        ),
-        "attendee_count": Attendee.objects.filter(
-            event=event, status=Attendee.YES
-        ).count(),
-        "presentation_list": event.presentations.filter(
-            status=Presentation.ACCEPTED
-        ).order_by("start_time"),
-        "pending_presentations": event.presentations.filter(
-            status=Presentation.PROPOSED
-        ).count(),
-        "can_edit_event": request.user.profile.can_edit_event(event),
-        "can_edit_team": request.user.profile.can_edit_team(event.team),
-        "is_in_team": request.user.profile.is_in_team(event.team),
+        "is_attending": getattr(event, "attending_count", 0) > 0,
+        "attendee_list": attendee_list,
+        "attendee_count": event.attendee_count,
+        "presentation_list": presentation_list,
+        "pending_presentations": pending_presentations,
+        "can_edit_event": can_edit_event,
+        "can_edit_team": profile.can_edit_team(event.team),
+        "is_in_team": profile.is_in_team(event.team),
         "is_email_confirmed": request.user.account.is_email_confirmed,
     }
     return render(request, "get_together/events/show_event.html", context)
@@ -306,9 +345,12 @@ def manage_attendees(request, event_id):
             message=_("You can not manage this event's attendees."),
         )
         return redirect(event.get_absolute_url())
-    attendees = Attendee.objects.filter(event=event).order_by(
-        "-actual", "-status", "user__realname"
+    attendees = list(
+        Attendee.objects.filter(event=event)
+        .select_related("user", "user__user")
+        .order_by("-actual", "-status", "user__realname")
     )
+    prefetch_accounts([attendee.user.user for attendee in attendees])
 
     attendee_choices = [
         (attendee.id, attendee.user)
@@ -337,58 +379,52 @@ def manage_attendees(request, event_id):
                     message=_("You can not contact this events's attendees."),
                 )
                 return redirect(event.get_absolute_url())
+            recipients = event.contactable_attendees()
             if to == "all":
-                count = 0
-                for attendee in Attendee.objects.filter(event=event):
-                    if attendee.user.user.account.is_email_confirmed:
-                        contact_attendee(attendee, body, request.user.profile)
-                        count += 1
+                count = contact_attendees(event, recipients, body, request.user.profile)
                 messages.add_message(
                     request, messages.SUCCESS, message=_("Emailed %s attendees" % count)
                 )
             elif to == "hosts":
-                count = 0
-                for attendee in Attendee.objects.filter(
-                    event=event, role=Attendee.HOST
-                ):
-                    if attendee.user.user.account.is_email_confirmed:
-                        contact_attendee(attendee, body, request.user.profile)
-                        count += 1
+                count = contact_attendees(
+                    event,
+                    recipients.filter(role=Attendee.HOST),
+                    body,
+                    request.user.profile,
+                )
                 messages.add_message(
                     request, messages.SUCCESS, message=_("Emailed %s attendees" % count)
                 )
             elif to == "attending":
-                count = 0
-                for attendee in Attendee.objects.filter(
-                    event=event, status=Attendee.YES
-                ):
-                    if attendee.user.user.account.is_email_confirmed:
-                        contact_attendee(attendee, body, request.user.profile)
-                        count += 1
+                count = contact_attendees(
+                    event,
+                    recipients.filter(status=Attendee.YES),
+                    body,
+                    request.user.profile,
+                )
                 messages.add_message(
                     request, messages.SUCCESS, message=_("Emailed %s attendees" % count)
                 )
             elif to == "attended":
-                count = 0
-                for attendee in Attendee.objects.filter(
-                    event=event, actual=Attendee.YES
-                ):
-                    if attendee.user.user.account.is_email_confirmed:
-                        contact_attendee(attendee, body, request.user.profile)
-                        count += 1
+                count = contact_attendees(
+                    event,
+                    recipients.filter(actual=Attendee.YES),
+                    body,
+                    request.user.profile,
+                )
                 messages.add_message(
                     request, messages.SUCCESS, message=_("Emailed %s attendees" % count)
                 )
             else:
                 try:
-                    attendee = Attendee.objects.get(id=to)
+                    attendee = Attendee.objects.get(id=to, event=event)
                     contact_attendee(attendee, body, request.user.profile)
                     messages.add_message(
                         request,
                         messages.SUCCESS,
                         message=_("Emailed %s" % attendee.user),
                     )
-                except Member.DoesNotExist:
+                except Attendee.DoesNotExist:
                     messages.add_message(
                         request,
                         messages.ERROR,
@@ -417,16 +453,8 @@ def manage_attendees(request, event_id):
 @login_required
 def invite_attendees(request, event_id):
     event = get_object_or_404(Event, id=event_id)
-    attendee_userids = [
-        attendee.user.id for attendee in Attendee.objects.filter(event=event)
-    ]
-    members = Member.objects.filter(team=event.team).order_by("user__realname")
-    member_choices = [
-        (member.id, member.user)
-        for member in members
-        if member.user.user.account.is_email_confirmed
-        and member.user.id not in attendee_userids
-    ]
+    members = list(event.invitable_members().order_by("user__realname"))
+    member_choices = [(member.id, member.user) for member in members]
     default_choices = [("all", "All Members (%s)" % len(member_choices))]
 
     if request.method == "POST" and request.POST.get("form", None) == "email":
@@ -454,8 +482,9 @@ def invite_attendees(request, event_id):
                     ),
                 )
                 return redirect("invite-attendees", event_id=event_id)
-            for email in to:
-                invite_attendee(email, event, request.user)
+            invite_attendees_by_email(
+                [(email, None) for email in to], event, request.user
+            )
             messages.add_message(
                 request, messages.SUCCESS, message=_("Sent %s invites" % len(to))
             )
@@ -468,28 +497,22 @@ def invite_attendees(request, event_id):
         if team_form.is_valid():
             to = team_form.cleaned_data["member"]
             if to == "all":
-                for (member_id, user) in member_choices:
-                    try:
-                        attendee = Attendee.objects.get(event=event, user=user)
-                    except:
-                        # No attendee record found, so send the invite
-                        invite_attendee(user.user, event, request.user)
+                count = invite_attendees_by_email(
+                    [(member.user.user.email, member.user.user) for member in members],
+                    event,
+                    request.user,
+                )
                 messages.add_message(
-                    request,
-                    messages.SUCCESS,
-                    message=_("Sent %s invites" % len(member_choices)),
+                    request, messages.SUCCESS, message=_("Sent %s invites" % count)
                 )
                 return redirect(event.get_absolute_url())
             else:
-                member = get_object_or_404(Member, id=to)
-                try:
-                    attendee = Attendee.objects.get(event=event, user=member.user)
-                except:
-                    # No attendee record found, so send the invite
-                    invite_attendee(member.user.user, event, request.user)
-                    messages.add_message(
-                        request, messages.SUCCESS, message=_("Invited %s" % member.user)
-                    )
+                # Only members who haven't responded yet are valid choices
+                member = next(member for member in members if str(member.id) == to)
+                invite_attendee(member.user.user, event, request.user)
+                messages.add_message(
+                    request, messages.SUCCESS, message=_("Invited %s" % member.user)
+                )
                 return redirect(event.get_absolute_url())
         email_form = EventInviteEmailForm()
     else:
@@ -508,18 +531,13 @@ def invite_attendees(request, event_id):
     return render(request, "get_together/events/invite_attendees.html", context)
 
 
-def invite_attendee(email, event, sender):
+def render_invite(event, sender):
     context = {
         "sender": sender.profile,
         "team": event.team,
         "event": event,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
-    recipient = None
-    if type(email) == User:
-        recipient = email
-        email = recipient.email
-
     email_subject = "Invitation to attend: %s" % event.name
     email_body_text = render_to_string(
         "get_together/emails/events/attendee_invite.txt", context
@@ -527,63 +545,104 @@ def invite_attendee(email, event, sender):
     email_body_html = render_to_string(
         "get_together/emails/events/attendee_invite.html", context
     )
-    email_recipients = [email]
+    return email_subject, email_body_text, email_body_html
+
+
+def invite_attendee(email, event, sender):
+    recipient = None
+    if type(email) == User:
+        recipient = email
+        email = recipient.email
+
+    email_subject, email_body_text, email_body_html = render_invite(event, sender)
     email_from = getattr(
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
 
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
-        subject=email_subject,
-        fail_silently=True,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=sender,
         recipient=recipient,
         email=email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
 
 
-def contact_attendee(attendee, body, sender):
-    context = {
-        "sender": sender,
-        "event": attendee.event,
-        "body": body,
-        "site": Site.objects.get(id=1),
-    }
-    email_subject = "A message about: %s" % attendee.event.name
+def invite_attendees_by_email(recipients, event, sender):
+    """
+    Queues the same invitation for every (email, user) in ``recipients``,
+    rendering it only once. Returns the number of invitations sent.
+    """
+    email_subject, email_body_text, email_body_html = render_invite(event, sender)
+    email_from = getattr(
+        settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
+    )
+    return queue_bulk_mail(
+        recipients,
+        sender=sender,
+        subject=email_subject,
+        body=email_body_text,
+        html_body=email_body_html,
+        from_email=email_from,
+    )
+
+
+def render_attendee_contact(event, body, sender):
+    context = {"sender": sender, "event": event, "body": body, "site": get_site()}
+    email_subject = "A message about: %s" % event.name
     email_body_text = render_to_string(
         "get_together/emails/events/attendee_contact.txt", context
     )
     email_body_html = render_to_string(
         "get_together/emails/events/attendee_contact.html", context
     )
-    email_recipients = [attendee.user.user.email]
+    return email_subject, email_body_text, email_body_html
+
+
+def contact_attendee(attendee, body, sender):
+    email_subject, email_body_text, email_body_html = render_attendee_contact(
+        attendee.event, body, sender
+    )
     email_from = getattr(
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
 
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
-        subject=email_subject,
-        fail_silently=True,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=sender.user,
         recipient=attendee.user.user,
         email=attendee.user.user.email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
+    )
+
+
+def contact_attendees(event, attendees, body, sender):
+    """
+    Queues the same message for all ``attendees`` of ``event``, rendering it
+    only once. Returns the number of attendees emailed.
+    """
+    recipients = [
+        (attendee.user.user.email, attendee.user.user) for attendee in attendees
+    ]
+    if not recipients:
+        return 0
+    email_subject, email_body_text, email_body_html = render_attendee_contact(
+        event, body, sender
+    )
+    email_from = getattr(
+        settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
+    )
+    return queue_bulk_mail(
+        recipients,
+        sender=sender.user,
+        subject=email_subject,
+        body=email_body_text,
+        html_body=email_body_html,
+        from_email=email_from,
     )
 
 
@@ -777,7 +836,7 @@ def delete_comment(request, comment_id):
 
 
 def send_comment_emails(comment):
-    context = {"comment": comment, "site": Site.objects.get(id=1)}
+    context = {"comment": comment, "site": get_site()}
     email_subject = "New comment on: %s" % comment.event.name
     email_body_text = render_to_string(
         "get_together/emails/events/event_comment.txt", context
@@ -792,21 +851,14 @@ def send_comment_emails(comment):
     for attendee in comment.event.attendees.filter(
         user__account__is_email_confirmed=True
     ):
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=[attendee.user.email],
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=comment.author.user,
             recipient=attendee.user,
             email=attendee.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -1099,7 +1151,7 @@ def send_cancellation_emails(event, reason, canceled_by):
         "event": event,
         "reason": reason,
         "by": canceled_by.profile,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Event canceled: %s" % event.name
     email_body_text = render_to_string(
@@ -1113,21 +1165,14 @@ def send_cancellation_emails(event, reason, canceled_by):
     )
 
     for attendee in event.attendees.filter(user__account__is_email_confirmed=True):
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=[attendee.user.email],
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=canceled_by,
             recipient=attendee.user,
             email=attendee.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -3,8 +3,6 @@ import datetime
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.shortcuts import redirect, render
 from django.template.loader import get_template, render_to_string
 from django.urls import reverse
@@ -13,10 +11,11 @@ from django.utils.translation import ugettext_lazy as _
 import simple_ga as ga
 import simplejson
 from accounts.email_lists import is_blocked_email
-from accounts.models import EmailRecord
+from accounts.outbox import queue_mail
 from events.forms import ConfirmProfileForm, SendNotificationsForm, UserForm
 from events.models.events import Attendee, Event, Place
 from events.models.profiles import Category, Member, Team, UserProfile
+from events.site import full_url
 
 from .utils import get_nearby_teams
 
@@ -173,10 +172,8 @@ def user_send_confirmation_email(request):
         return redirect("edit-profile")
 
     confirmation_request = request.user.account.new_confirmation_request()
-    site = Site.objects.get(id=1)
-    confirmation_url = "https://%s%s" % (
-        site.domain,
-        reverse("confirm-email", kwargs={"confirmation_key": confirmation_request.key}),
+    confirmation_url = full_url(
+        reverse("confirm-email", kwargs={"confirmation_key": confirmation_request.key})
     )
 
     context = {
@@ -190,24 +187,17 @@ def user_send_confirmation_email(request):
     email_body_html = render_to_string(
         "get_together/emails/users/confirm_email.html", context, request
     )
-    email_recipients = [request.user.email]
     email_from = getattr(
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
-    success = send_mail(
-        subject=email_subject,
-        message=email_body_text,
-        from_email=email_from,
-        recipient_list=email_recipients,
-        html_message=email_body_html,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=request.user,
         recipient=request.user,
         email=request.user.email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
     return render(
         request, "get_together/new_user/sent_email_confirmation.html", context
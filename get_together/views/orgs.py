@@ -4,8 +4,6 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout as logout_user
 from django.contrib.auth.decorators import login_required
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.template.loader import get_template, render_to_string
@@ -13,7 +11,7 @@ from django.utils.translation import ugettext_lazy as _
 
 import simplejson
 
-from accounts.models import EmailRecord
+from accounts.outbox import queue_mail
 from events import location
 from events.forms import (
     AcceptInviteToJoinOrgForm,
@@ -32,6 +30,7 @@ from events.models.profiles import (
     Team,
     UserProfile,
 )
+from events.site import get_site
 from events.utils import slugify, verify_csrf
 
 
@@ -145,7 +144,7 @@ def send_org_request(req):
         "req": req,
         "org": req.organization,
         "team": req.team,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Request to join: %s" % req.team.name
     email_body_text = render_to_string(
@@ -159,21 +158,14 @@ def send_org_request(req):
     )
 
     admin = req.organization.owner_profile
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=[admin.user.email],
-        subject=email_subject,
-        fail_silently=True,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=req.requested_by.user,
         recipient=admin.user,
         email=admin.user.email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
 
 
@@ -246,7 +238,7 @@ def send_org_invite(req):
         "req": req,
         "org": req.organization,
         "team": req.team,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Invitation to join: %s" % req.organization.name
     email_body_text = render_to_string(
@@ -262,21 +254,14 @@ def send_org_invite(req):
     for admin in Member.objects.filter(
         team=req.team, role=Member.ADMIN, user__user__account__is_email_confirmed=True
     ):
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=[admin.user.user.email],
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=req.requested_by.user,
             recipient=admin.user.user,
             email=admin.user.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -461,7 +446,7 @@ def contact_team(team, org, body, sender):
         "team": team,
         "org": org,
         "body": body,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "A message from: %s" % org.name
     email_body_text = render_to_string(
@@ -475,22 +460,14 @@ def contact_team(team, org, body, sender):
     )
 
     for member in Member.objects.filter(team=team, role=Member.ADMIN):
-        email_recipients = [member.user.user.email]
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=email_recipients,
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=sender.user,
             recipient=member.user.user,
             email=member.user.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -544,7 +521,7 @@ def send_common_event_invite(event):
         "sender": event.created_by,
         "org": event.organization,
         "event": event,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Participate in our event: %s" % event.name
     email_from = getattr(
@@ -569,21 +546,14 @@ def send_common_event_invite(event):
         email_body_html = render_to_string(
             "get_together/emails/orgs/invite_to_common_event.html", context
         )
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=[admin.user.user.email],
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=event.created_by.user,
             recipient=admin.user.user,
             email=admin.user.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -3,8 +3,6 @@ import datetime
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import get_template, render_to_string
 from django.utils.safestring import mark_safe
@@ -12,6 +10,7 @@ from django.utils.translation import ugettext_lazy as _
 
 import simplejson
 
+from accounts.outbox import queue_mail
 from events.forms import (
     DeleteSpeakerForm,
     DeleteTalkForm,
@@ -22,6 +21,7 @@ from events.forms import (
 from events.models.events import Event
 from events.models.profiles import UserProfile
 from events.models.speakers import Presentation, Speaker, SpeakerRequest, Talk
+from events.site import get_site
 from resume import resume_or_redirect, set_resume
 
 from .events import *
@@ -272,7 +272,7 @@ def send_talk_proposed_emails(proposal):
         "proposal": proposal,
         "event": proposal.event,
         "talk": proposal.talk,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Talk proposal for: %s" % proposal.event.name
     email_body_text = render_to_string(
@@ -290,21 +290,14 @@ def send_talk_proposed_emails(proposal):
         role=Attendee.HOST,
         user__user__account__is_email_confirmed=True,
     ):
-        success = send_mail(
-            from_email=email_from,
-            html_message=email_body_html,
-            message=email_body_text,
-            recipient_list=[host.user.user.email],
-            subject=email_subject,
-            fail_silently=True,
-        )
-        EmailRecord.objects.create(
+        queue_mail(
             sender=proposal.talk.speaker.user.user,
             recipient=host.user.user,
             email=host.user.user.email,
             subject=email_subject,
             body=email_body_text,
-            ok=success,
+            html_body=email_body_html,
+            from_email=email_from,
         )
 
 
@@ -353,7 +346,7 @@ def send_talk_acceptance_emails(proposal, reviewer):
         "event": proposal.event,
         "talk": proposal.talk,
         "reviewer": reviewer,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "About your talk proposal: %s" % proposal.event.name
     email_body_text = render_to_string(
@@ -366,19 +359,12 @@ def send_talk_acceptance_emails(proposal, reviewer):
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
 
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=[proposal.talk.speaker.user.user.email],
-        subject=email_subject,
-        fail_silently=True,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=reviewer,
         recipient=proposal.talk.speaker.user.user,
         email=proposal.talk.speaker.user.user.email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
@@ -4,8 +4,6 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout as logout_user
 from django.contrib.auth.decorators import login_required
-from django.contrib.sites.models import Site
-from django.core.mail import send_mail
 from django.db.models import Q
 from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -14,7 +12,7 @@ from django.utils.translation import ugettext_lazy as _
 
 import simplejson
 
-from accounts.models import EmailRecord
+from accounts.outbox import queue_mail
 from events import location
 from events.forms import (
     AcceptInviteToJoinTeamForm,
@@ -41,6 +39,7 @@ from events.models.profiles import (
     TeamMembershipRequest,
     UserProfile,
 )
+from events.site import get_site
 from events.utils import slugify, verify_csrf
 
 
@@ -425,7 +424,7 @@ def invite_member(invitation):
         "sender": sender,
         "team": team,
         "invite_key": invitation.request_key,
-        "site": Site.objects.get(id=1),
+        "site": get_site(),
     }
     email_subject = "Invitation to join: %s" % team
     email_body_text = render_to_string(
@@ -434,27 +433,18 @@ def invite_member(invitation):
     email_body_html = render_to_string(
         "get_together/emails/teams/member_invite.html", context
     )
-    email_recipients = [email]
     email_from = getattr(
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
 
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
-        subject=email_subject,
-        fail_silently=True,
-    )
-
-    EmailRecord.objects.create(
+    queue_mail(
         sender=sender.user,
         recipient=None,
         email=email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
 
 
@@ -559,12 +549,7 @@ def accept_request_to_join_team(request, invite):
 
 
 def contact_member(member, body, sender):
-    context = {
-        "sender": sender,
-        "team": member.team,
-        "body": body,
-        "site": Site.objects.get(id=1),
-    }
+    context = {"sender": sender, "team": member.team, "body": body, "site": get_site()}
     email_subject = "A message from: %s" % member.team
     email_body_text = render_to_string(
         "get_together/emails/teams/member_contact.txt", context
@@ -572,26 +557,18 @@ def contact_member(member, body, sender):
     email_body_html = render_to_string(
         "get_together/emails/teams/member_contact.html", context
     )
-    email_recipients = [member.user.user.email]
     email_from = getattr(
         settings, "DEFAULT_FROM_EMAIL", "noreply@gettogether.community"
     )
 
-    success = send_mail(
-        from_email=email_from,
-        html_message=email_body_html,
-        message=email_body_text,
-        recipient_list=email_recipients,
-        subject=email_subject,
-        fail_silently=True,
-    )
-    EmailRecord.objects.create(
+    queue_mail(
         sender=sender.user,
         recipient=member.user.user,
         email=member.user.user.email,
         subject=email_subject,
         body=email_body_text,
-        ok=success,
+        html_body=email_body_html,
+        from_email=email_from,
     )
 
 
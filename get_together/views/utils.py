@@ -1,13 +1,10 @@
-import math
-
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
+from events import geoindex
 from events.location import get_client_ip, get_geoip
 from events.models import Team
 
-KM_PER_DEGREE_LAT = 110.574
-KM_PER_DEGREE_LNG = 111.320  # At the equator
 DEFAULT_NEAR_DISTANCE = 100  # kilometeres
 
 
@@ -17,22 +14,9 @@ def get_nearby_teams(request, near_distance=DEFAULT_NEAR_DISTANCE):
         print("Could not identify latlng from geoip")
         return Team.objects.none()
     try:
-        minlat = g.latlng[0] - (near_distance / KM_PER_DEGREE_LAT)
-        maxlat = g.latlng[0] + (near_distance / KM_PER_DEGREE_LAT)
-        minlng = g.latlng[1] - (
-            near_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(g.latlng[0])))
-        )
-        maxlng = g.latlng[1] + (
-            near_distance / (KM_PER_DEGREE_LNG * math.cos(math.radians(g.latlng[0])))
-        )
-
-        near_teams = Team.public_objects.filter(
-            city__latitude__gte=minlat,
-            city__latitude__lte=maxlat,
-            city__longitude__gte=minlng,
-            city__longitude__lte=maxlng,
+        return geoindex.within(
+            Team.public_objects.all(), g.latlng, near_distance, prefix="city__"
         )
-        return near_teams
     except Exception as e:
         print("Error looking for local teams: ", e)
         return Team.objects.none()